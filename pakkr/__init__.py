@@ -2,3 +2,9 @@ from pakkr.pipeline import Pipeline  # noqa: F401
 from pakkr.returns.returns import returns  # noqa: F401
 from pakkr.cmd_args.cmd_args import cmd_args  # noqa: F401
 from pakkr.cmd_args.argument import argument  # noqa: F401
+from pakkr.deadline import Deadline, timeout  # noqa: F401
+from pakkr.hedge import hedged  # noqa: F401
+from pakkr.batching import batched  # noqa: F401
+from pakkr.single_flight import single_flight  # noqa: F401
+from pakkr.branching import Switch, When  # noqa: F401
+from pakkr.resources import ResourceScheduler, resources  # noqa: F401
@@ -0,0 +1,39 @@
+from functools import partial
+from typing import Callable
+
+from pakkr.pipeline import _get_pakkr_depth, _run_as_step, Pipeline
+
+
+class _StepWrapper:
+    """
+    Base class of step decorators that change how a step is executed but not what
+    it accepts or returns. Attributes such as __pakkr_returns__ or __pakkr_cmd_args__
+    are looked up on the wrapped step and `inspect.signature` follows `__wrapped__`,
+    so a Pipeline treats the wrapper exactly like the step it wraps.
+    """
+
+    def __init__(self, step: Callable) -> None:
+        assert callable(step), f"{type(step)} is not a Callable"
+        self.__wrapped__ = step
+
+    def __getattr__(self, name):
+        try:
+            step = self.__dict__['__wrapped__']
+        except KeyError:
+            raise AttributeError(name)
+        return getattr(step, name)
+
+    def _bind(self) -> Callable:
+        """
+        Return a Callable executing the wrapped step which can be called from any thread.
+        Must be called from the wrapper's `__call__` so a wrapped Pipeline still knows
+        whether it is executed as a step and at which depth.
+        """
+        step = self.__wrapped__
+        if not isinstance(step, Pipeline):
+            return step
+
+        depth, used_as_step = _get_pakkr_depth(self)
+        if not used_as_step:
+            return step
+        return partial(_run_as_step, step, depth)
@@ -0,0 +1,33 @@
+import pytest
+from pakkr import Pipeline, returns
+from pakkr._wrapper import _StepWrapper
+
+
+class _Wrapper(_StepWrapper):
+    def __call__(self, *args, **kwargs):
+        return self._bind()(*args, **kwargs)
+
+
+def test_wrapper_attributes():
+    @returns(int)
+    def step(x):
+        return x + 1
+
+    wrapper = _Wrapper(step)
+    assert wrapper.__name__ == "step"
+    assert wrapper.__pakkr_returns__ is step.__pakkr_returns__
+    assert Pipeline(wrapper)(1) == 2
+
+    with pytest.raises(AttributeError):
+        _Wrapper.__new__(_Wrapper).__name__
+
+
+def test_wrapper_pipeline_as_step():
+    inner = Pipeline(returns(int, y=int)(lambda x: (x, {'y': x * 2})))
+    nested = Pipeline(Pipeline(inner))
+    assert Pipeline(_Wrapper(nested), lambda x, y: x + y)(1) == 3
+
+
+def test_wrapper_pipeline_as_callable():
+    inner = Pipeline(returns(int, y=int)(lambda x: (x, {'y': x * 2})))
+    assert _Wrapper(inner)(1) == 1
@@ -0,0 +1,220 @@
+import queue
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence
+
+from pakkr.exception import exception_context, PakkrError
+from pakkr.pipeline import Pipeline, _identifier, _returned
+
+_DONE = object()
+_POLL = 0.05
+
+
+class Stage(NamedTuple):
+    """A group of consecutive steps of an assembly line, executed by `workers` threads."""
+    steps: int = 1
+    workers: int = 1
+
+
+class _StageState:
+    """Queue feeding a stage and what the stage's workers did."""
+
+    def __init__(self, stage: Stage, steps: Sequence, queue_size: int) -> None:
+        self.stage = stage
+        self.steps = steps
+        self.inbox: queue.Queue = queue.Queue(queue_size)
+        self.lock = threading.Lock()
+        self.processed = 0
+        self.busy = 0.0
+        self.max_depth = 0
+        self.running = stage.workers
+
+    def stats(self, elapsed: float) -> Dict[str, Any]:
+        with self.lock:
+            return {'steps': [_identifier(step) for step in self.steps], 'workers': self.stage.workers,
+                    'queue_depth': self.inbox.qsize(), 'max_queue_depth': self.max_depth,
+                    'processed': self.processed, 'busy_seconds': self.busy,
+                    'utilisation': self.busy / (self.stage.workers * elapsed) if elapsed > 0 else 0.0}
+
+
+class AssemblyLine:
+    """
+    Executes a Pipeline over a stream of records as an assembly line: consecutive steps are
+    grouped into stages, each executed by its own worker threads and fed by a bounded queue,
+    so that different records are at different steps at the same time and a slow stage
+    holds back the ones before it rather than letting records pile up in memory.
+
+    Every record is given to the first step as its only positional input, and gets its own
+    copy of the meta, which the steps update following their `@returns` as in a run.
+    Results are yielded in the order of the records. Run level options of the Pipeline,
+    e.g. `_timeout` or `_journal`, are not applied.
+
+    Parameters
+    ----------
+    pipeline : Pipeline
+        Pipeline executing its steps in sequence, i.e. not a Switch
+    stages : Sequence[Stage]
+        the number of steps and workers of every stage, one single worker stage per step by
+        default
+    queue_size : int
+        number of records waiting in front of every stage before the stage feeding it blocks,
+        and of records read but not yielded yet before reading the next one blocks, so that
+        records done out of order while an earlier one is slow do not pile up
+    """
+
+    def __init__(self, pipeline: Pipeline, stages: Optional[Sequence[Stage]]=None, queue_size: int=8) -> None:
+        if type(pipeline)._run_steps is not Pipeline._run_steps:
+            raise RuntimeError("Only Pipelines executing their steps in sequence can be assembly lines.")
+        if not pipeline._plan:
+            raise RuntimeError("An assembly line needs at least one step.")
+        stages = list(stages) if stages is not None else [Stage()] * len(pipeline._plan)
+        if sum(stage.steps for stage in stages) != len(pipeline._plan):
+            raise RuntimeError("Stages should group the {} steps of the Pipeline, got {} steps."
+                               .format(len(pipeline._plan), sum(stage.steps for stage in stages)))
+        if any(stage.steps < 1 or stage.workers < 1 for stage in stages):
+            raise RuntimeError("Stages should have at least one step and one worker, got {}.".format(stages))
+        if queue_size < 1:
+            raise RuntimeError("Queue size should be at least 1, got {}.".format(queue_size))
+
+        self.pipeline = pipeline
+        self.stages = stages
+        self.queue_size = queue_size
+        self._states: List[_StageState] = []
+        self._started = time.perf_counter()
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Per stage of the current or last call: identifiers of its steps, number of workers,
+        number of records queued in front of it now and at most, number of records processed,
+        seconds its workers were busy and the share of the time they were."""
+        elapsed = time.perf_counter() - self._started
+        return [state.stats(elapsed) for state in self._states]
+
+    def __call__(self, records: Iterable, **meta) -> Iterator[Any]:
+        """
+        Execute the Pipeline for every record, yielding the results in the order of the
+        records.
+
+        Raises
+        ------
+        PakkrError
+            when a step failed for a record, once the results of the records before it have
+            been yielded; the records after it are dropped
+        """
+        states = []
+        position = 0
+        for stage in self.stages:
+            states.append(_StageState(stage, self.pipeline._plan[position:position + stage.steps], self.queue_size))
+            position += stage.steps
+        outbox: queue.Queue = queue.Queue(self.queue_size)
+        self._states, self._started = states, time.perf_counter()
+        stopped = threading.Event()
+        in_flight = threading.Semaphore(self.queue_size)
+
+        threads = [threading.Thread(target=self._feed, args=(records, meta, states[0], in_flight, stopped),
+                                    daemon=True)]
+        for index, state in enumerate(states):
+            following = states[index + 1] if index + 1 < len(states) else None
+            threads.extend(threading.Thread(target=self._work, args=(state, following, outbox, stopped), daemon=True)
+                           for _ in range(state.stage.workers))
+        for thread in threads:
+            thread.start()
+
+        try:
+            done: Dict[int, Any] = {}
+            expected = 0
+            while True:
+                item = _get(outbox, stopped)
+                if item is _DONE:
+                    break
+                done[item[0]] = item
+                while expected in done:
+                    _, args_meta, produced, error = done.pop(expected)
+                    if error is not None:
+                        raise error
+                    new_arg, new_meta = self.pipeline._filter_results((args_meta[0], produced))
+                    in_flight.release()
+                    yield _returned(new_arg, new_meta, False)
+                    expected += 1
+        finally:
+            stopped.set()
+
+    def _feed(self, records: Iterable, meta: Dict, first: _StageState, in_flight: threading.Semaphore,
+              stopped: threading.Event) -> None:
+        sequence = 0
+        try:
+            for record in records:
+                if not _acquire(in_flight, stopped) \
+                        or not _put(first, (sequence, ((record,), dict(meta)), {}, None), stopped):
+                    return
+                sequence += 1
+        except Exception as e:
+            _put(first, (sequence, None, None, e), stopped)
+        for _ in range(first.stage.workers):
+            _put(first, _DONE, stopped)
+
+    def _work(self, state: _StageState, following: Optional[_StageState], outbox: queue.Queue,
+              stopped: threading.Event) -> None:
+        pipeline = self.pipeline
+        while True:
+            item = _get(state.inbox, stopped)
+            if item is _DONE:
+                break
+            sequence, args_meta, produced, error = item
+            if error is None:
+                started = time.perf_counter()
+                pipeline._meta = produced
+                try:
+                    for step in state.steps:
+                        args_meta = pipeline._run_step(args_meta, step, indent=1)
+                except PakkrError as e:
+                    error = e.append_stack(exception_context(_identifier(pipeline), args_meta[0], args_meta[1], None))
+                except Exception as e:  # e.g. a RuntimeError of @returns, not wrapped by the Pipeline
+                    error = PakkrError(str(e), exception_context(_identifier(pipeline), args_meta[0], args_meta[1],
+                                                                 None))
+                    error.__cause__ = e
+                with state.lock:
+                    state.processed += 1
+                    state.busy += time.perf_counter() - started
+
+            target = following if following is not None else outbox
+            if not _put(target, (sequence, args_meta, produced, error), stopped):
+                return
+
+        with state.lock:
+            state.running -= 1
+            last = not state.running
+        if last:
+            for _ in range(following.stage.workers if following is not None else 1):
+                _put(following if following is not None else outbox, _DONE, stopped)
+
+
+def _put(target: Any, item: Any, stopped: threading.Event) -> bool:
+    """Put an item in front of a stage, or in the outbox, waiting for room unless stopped."""
+    inbox = target.inbox if isinstance(target, _StageState) else target
+    while not stopped.is_set():
+        try:
+            inbox.put(item, timeout=_POLL)
+        except queue.Full:
+            continue
+        if isinstance(target, _StageState):
+            with target.lock:
+                target.max_depth = max(target.max_depth, inbox.qsize())
+        return True
+    return False
+
+
+def _acquire(in_flight: threading.Semaphore, stopped: threading.Event) -> bool:
+    """Wait until fewer records than the queue size are read but not yielded, unless stopped."""
+    while not stopped.is_set():
+        if in_flight.acquire(timeout=_POLL):
+            return True
+    return False
+
+
+def _get(inbox: queue.Queue, stopped: threading.Event) -> Any:
+    while not stopped.is_set():
+        try:
+            return inbox.get(timeout=_POLL)
+        except queue.Empty:
+            continue
+    return _DONE
@@ -0,0 +1,195 @@
+import queue
+import threading
+import time
+import pytest
+from pakkr import Pipeline, returns, Switch
+from pakkr.assembly import AssemblyLine, Stage, _put
+from pakkr.exception import PakkrError
+
+
+@returns(int, parity=str)
+def parse(record):
+    return int(record), {'parity': 'even' if int(record) % 2 == 0 else 'odd'}
+
+
+@returns(str)
+def label(value, parity, prefix):
+    return '{}{}:{}'.format(prefix, value, parity)
+
+
+def test_assembly_line():
+    line = AssemblyLine(Pipeline(parse, label), queue_size=2)
+    assert list(line(['1', '2', '3'], prefix='#')) == ['#1:odd', '#2:even', '#3:odd']
+
+    stats = line.stats()
+    assert [stage['steps'] for stage in stats] == [['"parse"<function>'], ['"label"<function>']]
+    assert [stage['processed'] for stage in stats] == [3, 3]
+    assert all(stage['queue_depth'] == 0 and 1 <= stage['max_queue_depth'] <= 2 for stage in stats)
+    assert all(0 <= stage['utilisation'] <= 1 and stage['busy_seconds'] >= 0 for stage in stats)
+
+    assert list(line([], prefix='#')) == []
+
+
+def test_assembly_line_overlaps_stages():
+    # the second record enters the first stage while the first record is in the second one
+    first_in_second_stage = threading.Event()
+    overlapped = threading.Event()
+
+    def first(record):
+        if record == 1:
+            overlapped.set() if first_in_second_stage.wait(1) else None
+        return record
+
+    def second(record):
+        if record == 0:
+            first_in_second_stage.set()
+            overlapped.wait(1)
+        return record * 10
+
+    line = AssemblyLine(Pipeline(first, second))
+    assert list(line(range(3))) == [0, 10, 20]
+    assert overlapped.is_set()
+
+
+def test_assembly_line_preserves_order():
+    def slow_first(record):
+        time.sleep(0.05 if record == 0 else 0)
+        return record
+
+    line = AssemblyLine(Pipeline(slow_first, lambda record: record * 2), stages=[Stage(2, workers=4)])
+    assert list(line(range(8))) == [0, 2, 4, 6, 8, 10, 12, 14]
+    assert line.stats()[0]['workers'] == 4
+    assert line.stats()[0]['steps'] == ['"slow_first"<function>', '"<lambda>"<function>']
+
+
+def test_assembly_line_backpressure():
+    pulled = []
+
+    def records():
+        for record in range(100):
+            pulled.append(record)
+            yield record
+
+    def slow(record):
+        time.sleep(0.06)
+        return record
+
+    line = AssemblyLine(Pipeline(lambda record: record, slow), queue_size=1)
+    results = line(records())
+    assert next(results) == 0
+    time.sleep(0.1)
+    # besides the result yielded, one record in each of the three queues, one in each
+    # worker and one held by the feeder at most, rather than the whole source
+    assert len(pulled) <= 7
+    assert line.stats()[1]['max_queue_depth'] == 1
+    results.close()
+
+
+def test_assembly_line_bounds_records_in_flight():
+    # records done while the first one is slow wait to be yielded, but only queue_size of them
+    pulled = []
+    release = threading.Event()
+
+    def records():
+        for record in range(100):
+            pulled.append(record)
+            yield record
+
+    def slow_first(record):
+        if record == 0:
+            release.wait(1)
+        return record
+
+    line = AssemblyLine(Pipeline(slow_first), stages=[Stage(1, workers=4)], queue_size=2)
+    results = line(records())
+    first = threading.Thread(target=next, args=(results,))
+    first.start()
+    time.sleep(0.1)
+    # the records read but not yielded, plus the one held by the feeder
+    assert len(pulled) == 3
+    release.set()
+    first.join()
+    assert list(results) == list(range(1, 100))
+
+
+def test_assembly_line_errors():
+    def fail_on_two(record):
+        if record == 2:
+            raise ValueError("two")
+        return record
+
+    line = AssemblyLine(Pipeline(fail_on_two, lambda record: record), stages=[Stage(1, 2), Stage(1, 1)])
+    results = line(range(100))
+    assert [next(results), next(results)] == [0, 1]
+    with pytest.raises(PakkrError) as e:
+        next(results)
+    assert str(e.value).startswith("two")
+
+    # errors the Pipeline does not wrap stop the line as well rather than a worker
+    line = AssemblyLine(Pipeline(returns(int)(lambda record: record if record != 2 else 'bad')), queue_size=2)
+    results = line(range(100))
+    assert [next(results), next(results)] == [0, 1]
+    with pytest.raises(PakkrError) as e:
+        next(results)
+    assert isinstance(e.value.__cause__, RuntimeError)
+
+    def records():
+        yield 1
+        raise IOError("source")
+
+    with pytest.raises(IOError):
+        list(line(records()))
+
+    # stopping early stops the workers, including those waiting for records
+    def slow_records():
+        yield 0
+        time.sleep(0.3)
+        yield 1
+
+    results = line(slow_records())
+    assert next(results) == 0
+    results.close()
+    time.sleep(0.15)
+
+    # and those in the middle of a step drop its result
+    closed = threading.Event()
+
+    def blocked_on_one(record):
+        if record == 1:
+            closed.wait(1)
+        return record
+
+    results = AssemblyLine(Pipeline(blocked_on_one), stages=[Stage(1, workers=2)])(range(2))
+    assert next(results) == 0
+    results.close()
+    closed.set()
+    time.sleep(0.1)
+
+    # as well as those waiting for room in a queue
+    full = queue.Queue(1)
+    full.put(0)
+    stopped = threading.Event()
+    threading.Timer(0.1, stopped.set).start()
+    assert not _put(full, 1, stopped)
+
+
+def test_assembly_line_options():
+    with pytest.raises(RuntimeError) as e:
+        AssemblyLine(Pipeline(parse, label), stages=[Stage(1)])
+    assert str(e.value) == "Stages should group the 2 steps of the Pipeline, got 1 steps."
+
+    with pytest.raises(RuntimeError) as e:
+        AssemblyLine(Pipeline(parse, label), stages=[Stage(2, 0)])
+    assert str(e.value) == "Stages should have at least one step and one worker, got [Stage(steps=2, workers=0)]."
+
+    with pytest.raises(RuntimeError) as e:
+        AssemblyLine(Pipeline(parse), queue_size=0)
+    assert str(e.value) == "Queue size should be at least 1, got 0."
+
+    with pytest.raises(RuntimeError) as e:
+        AssemblyLine(Pipeline())
+    assert str(e.value) == "An assembly line needs at least one step."
+
+    with pytest.raises(RuntimeError) as e:
+        AssemblyLine(Switch(lambda: 'a', {'a': parse}))
+    assert str(e.value) == "Only Pipelines executing their steps in sequence can be assembly lines."
@@ -0,0 +1,206 @@
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from pakkr._wrapper import _StepWrapper
+from pakkr.deadline import Deadline, DEADLINE_KEY
+from pakkr.exception import PakkrError, PakkrTimeoutError
+from pakkr.pipeline import _identifier
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+_PER_RUN = ('logger', DEADLINE_KEY)
+
+_local = threading.local()
+
+
+class _Cohort:
+    """Runs released together, e.g. by a Coalescer: once all of them have reached a batched
+    step, the batch holding the last one is executed without waiting for `max_wait`."""
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self._arrived: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def arrive(self, step: Any) -> bool:
+        """Count a run of the cohort reaching `step`; whether it is the last one to."""
+        with self._lock:
+            arrived = self._arrived[id(step)] = self._arrived.get(id(step), 0) + 1
+        return arrived >= self.size
+
+
+def _run_in_cohort(cohort: _Cohort, pipeline: Callable, args: tuple, meta: Dict) -> Any:
+    """Execute a run of a cohort on this thread."""
+    previous = getattr(_local, 'cohort', None)
+    _local.cohort = cohort
+    try:
+        return pipeline(*args, **meta)
+    finally:
+        _local.cohort = previous
+
+
+class _Batch:
+    """Items gathered for one execution of a batched step."""
+
+    def __init__(self, kwargs: Dict) -> None:
+        self.kwargs = kwargs
+        self.items: List[tuple] = []
+        self.closed = False
+        self.done = threading.Event()
+        self.results: List[Any] = []
+        self.error: Optional[BaseException] = None
+
+    def accepts(self, kwargs: Dict) -> bool:
+        """Whether an item executed with `kwargs` can join this batch, i.e. is given the same
+        meta apart from the logger and deadline of its run."""
+        if self.closed or self.kwargs.keys() != kwargs.keys():
+            return False
+        return all(k in _PER_RUN or _same(v, kwargs[k]) for k, v in self.kwargs.items())
+
+
+def _same(a: Any, b: Any) -> bool:
+    if a is b:
+        return True
+    try:
+        return bool(a == b)
+    except Exception:
+        return False
+
+
+class _Batched(_StepWrapper):
+    """
+    Step wrapper gathering the items concurrent runs execute the step with into batches,
+    executing the step once per batch and handing each run the result for its item.
+    """
+
+    def __init__(self, step: Callable, max_size: int, max_wait: float, stack: bool) -> None:
+        super().__init__(step)
+        self._max_size = max_size
+        self._max_wait = max_wait
+        self._stack = stack
+        self._open: List[_Batch] = []
+        self._condition = threading.Condition()
+        self._stats = {'batches': 0, 'items': 0}
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Number of batches executed and of items they contained."""
+        with self._condition:
+            return dict(self._stats)
+
+    def __call__(self, *args, **kwargs):
+        with self._condition:
+            batch = next((b for b in self._open if b.accepts(kwargs)), None)
+            leader = batch is None
+            if leader:
+                batch = _Batch(kwargs)
+                self._open.append(batch)
+            index = len(batch.items)
+            batch.items.append(args)
+            cohort = getattr(_local, 'cohort', None)
+            last_of_cohort = cohort is not None and cohort.arrive(self)
+            if len(batch.items) >= self._max_size or last_of_cohort:
+                self._close(batch)
+
+        deadline = kwargs.get(DEADLINE_KEY)
+        deadline = deadline if isinstance(deadline, Deadline) else None
+        if leader:
+            self._gather(batch, deadline)
+            self._execute(batch)
+        elif not batch.done.wait(None if deadline is None else deadline.remaining()):
+            deadline.check(_identifier(self))  # type: ignore
+            batch.done.wait()  # pragma: no cover
+
+        if batch.error is not None:
+            raise self._run_error(batch) from batch.error
+        return batch.results[index]
+
+    def _run_error(self, batch: _Batch) -> PakkrError:
+        """The error one run of a failed batch raises: every run raises its own, chained from
+        the batch's, as they raise them concurrently and each adds its own context."""
+        error = batch.error
+        context = '\twhen executing {} in a batch of {} items'.format(_identifier(self), len(batch.items))
+        if isinstance(error, PakkrTimeoutError):
+            return PakkrTimeoutError(error.identifier, error.budget, error.elapsed, context)
+        return PakkrError(error._message if isinstance(error, PakkrError) else str(error), context)
+
+    def _close(self, batch: _Batch) -> None:
+        batch.closed = True
+        self._open.remove(batch)
+        self._condition.notify_all()
+
+    def _gather(self, batch: _Batch, deadline: Optional[Deadline]) -> None:
+        """Wait for the batch to fill up, for at most `max_wait` or what is left of the deadline."""
+        wait_until = time.monotonic() + self._max_wait
+        if deadline is not None:
+            wait_until = min(wait_until, deadline.expires_at)
+        with self._condition:
+            while not batch.closed:
+                remaining = wait_until - time.monotonic()
+                if remaining <= 0:
+                    self._close(batch)
+                    break
+                self._condition.wait(remaining)
+
+    def _execute(self, batch: _Batch) -> None:
+        try:
+            columns = [self._column(values) for values in zip(*batch.items)]
+            results = self._bind()(*columns, **batch.kwargs)
+            results = list(results) if results is not None else []
+            if len(results) != len(batch.items):
+                msg = "Batched step returned {} results for {} items."
+                raise RuntimeError(msg.format(len(results), len(batch.items)))
+            batch.results = results
+        except BaseException as e:
+            batch.error = e
+        finally:
+            with self._condition:
+                self._stats['batches'] += 1
+                self._stats['items'] += len(batch.items)
+            batch.done.set()
+
+    def _column(self, values: tuple) -> Any:
+        if self._stack and np is not None and all(isinstance(v, np.ndarray) for v in values):
+            return np.stack(values)
+        return list(values)
+
+
+def batched(max_size: int=32, max_wait: float=0.005, stack: bool=False):
+    """
+    Decorator to execute a per item step in batches when a Pipeline is executed over many
+    items concurrently, e.g. with `Pipeline.map`. Runs reaching the step join a pending
+    batch given the same meta (apart from `logger` and `deadline`); the batch is executed
+    once it holds `max_size` items or `max_wait` seconds after its first item arrived, or
+    as soon as every run released together by a `Coalescer` has reached the step.
+
+    The step is written for batches: each positional parameter is given a list of the
+    items' values, or a stacked array when `stack` is set and every value is an array,
+    and the keyword parameters the meta shared by the items, with the `logger` and
+    `deadline` of the run which started the batch. It must return a sequence of one
+    result per item, in order, each as declared by `@returns` for a single item; the
+    results, and therefore the meta, are handed back to each item's run.
+
+    Parameters
+    ----------
+    max_size : int
+        maximum number of items in a batch
+    max_wait : float
+        seconds to wait for a batch to fill up, the latency added for a lone item
+    stack : bool
+        whether to pass arrays to the step as one array stacked along a new first axis
+
+    Returns
+    -------
+    Callable
+        decorator returning the batched step; its `stats` reports the batches executed
+    """
+    if max_size < 1:
+        raise RuntimeError("Batch size should be at least 1, got {}.".format(max_size))
+
+    def decorated(step):
+        return _Batched(step, max_size, max_wait, stack)
+    return decorated
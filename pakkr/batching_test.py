@@ -0,0 +1,124 @@
+import threading
+import numpy as np
+import pytest
+from pakkr import batched, Pipeline, returns
+from pakkr.batching import _Batch
+from pakkr.deadline import Deadline
+from pakkr.exception import PakkrError, PakkrTimeoutError
+
+
+def test_batched():
+    batches = []
+
+    @batched(max_size=4, max_wait=1)
+    @returns(int, batch_size=int)
+    def infer(rows, scale):
+        batches.append(rows)
+        return [(row * scale, {'batch_size': len(rows)}) for row in rows]
+
+    pipeline = Pipeline(lambda x: x + 1, infer, lambda y, batch_size: (y, batch_size))
+    assert pipeline.map(range(8), scale=10, _max_workers=8) == [(10 * (x + 1), 4) for x in range(8)]
+    assert sorted(len(b) for b in batches) == [4, 4]
+    assert infer.stats == {'batches': 2, 'items': 8}
+
+
+def test_batched_lone_item():
+    infer = batched(max_size=4, max_wait=0.01)(lambda rows: [r * 2 for r in rows])
+    assert Pipeline(infer)(3) == 6
+    assert infer.stats == {'batches': 1, 'items': 1}
+
+
+def test_batched_stack():
+    @batched(max_size=3, max_wait=1, stack=True)
+    def infer(rows):
+        assert rows.shape == (3, 2)
+        return rows.sum(axis=1)
+
+    results = Pipeline(infer).map([np.ones(2) * i for i in range(3)], _max_workers=3)
+    assert results == [0.0, 2.0, 4.0]
+
+
+def test_batched_groups_by_meta():
+    batches = []
+
+    @batched(max_size=2, max_wait=1)
+    def infer(rows, model):
+        batches.append((model, len(rows)))
+        return rows
+
+    pipeline = Pipeline(returns(int, model=str)(lambda x: (x, {'model': 'ab'[x % 2]})), infer)
+    assert pipeline.map(range(4), _max_workers=4) == [0, 1, 2, 3]
+    assert sorted(batches) == [('a', 2), ('b', 2)]
+
+
+def test_batched_errors():
+    infer = batched(max_size=2, max_wait=1)(lambda rows: rows[:1])
+    with pytest.raises(PakkrError) as e:
+        Pipeline(infer).map(range(2), _max_workers=2)
+    assert str(e.value).startswith("Batched step returned 1 results for 2 items.")
+
+    @batched(max_size=2, max_wait=1)
+    def fail(rows):
+        raise ValueError("failed")
+
+    with pytest.raises(PakkrError) as e:
+        Pipeline(fail).map(range(2), _max_workers=2)
+    assert str(e.value).startswith("failed")
+    assert 'when executing "fail"<_Batched> in a batch of 2 items' in str(e.value)
+
+    # each run raises its own error, chained from the batch's
+    errors = []
+
+    def run(item):
+        try:
+            Pipeline(fail)(item)
+        except PakkrError as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=run, args=(item,)) for item in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(errors) == 2 and errors[0] is not errors[1]
+    assert errors[0].__cause__ is errors[1].__cause__
+    assert isinstance(errors[0].__cause__, ValueError)
+
+    @batched(max_size=1)
+    def expire(rows):
+        raise PakkrTimeoutError('"model"<function>', 1.0, 1.5)
+
+    with pytest.raises(PakkrTimeoutError) as e:
+        Pipeline(expire)(1)
+    assert (e.value.identifier, e.value.budget) == ('"model"<function>', 1.0)
+
+    with pytest.raises(RuntimeError) as e:
+        batched(max_size=0)
+    assert str(e.value) == "Batch size should be at least 1, got 0."
+
+
+def test_batched_deadline():
+    release = threading.Event()
+
+    @batched(max_size=2, max_wait=10)
+    def slow(rows, deadline):
+        release.wait()
+        return rows
+
+    leader = threading.Thread(target=Pipeline(slow), args=(1,), kwargs={'deadline': Deadline(10)})
+    leader.start()
+    leader.join(0.1)
+    assert slow._open
+    with pytest.raises(PakkrTimeoutError):
+        Pipeline(slow)(2, deadline=Deadline(0.05))
+    release.set()
+    leader.join()
+
+
+def test_batch_accepts():
+    features = np.ones(3)
+    batch = _Batch({'features': features, 'logger': 1})
+    assert batch.accepts({'features': features, 'logger': 2})
+    assert not batch.accepts({'features': np.ones(3), 'logger': 1})
+    assert not batch.accepts({'features': features})
+    assert _Batch({'model': 'a'}).accepts({'model': 'a'})
@@ -0,0 +1,94 @@
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from pakkr.exception import exception_context, PakkrError
+from pakkr.pipeline import (_ARGS_META,
+                            _FILTERED_ARGS_META,
+                            _identifier,
+                            _step_options,
+                            ATTR_RETURNS,
+                            Pipeline)
+from pakkr.returns.returns import intersect, _Meta, _NoReturn, _Return, _ReturnType
+
+
+class Switch(Pipeline):
+    """Switch executes exactly one of its branches, chosen by the `selector` from the meta
+    available when the Switch is executed; the other branches are never executed.
+
+    The selector is a Callable whose parameters are injected from meta like any step's
+    and which returns the key of the branch to execute, falling back to `default` for
+    unknown keys. The Switch returns what all of its branches are declared to return,
+    i.e. the same return values and the meta common to every branch."""
+
+    def __init__(self,
+                 selector: Callable[..., Hashable],
+                 branches: Dict[Hashable, Callable],
+                 default: Optional[Callable]=None,
+                 **kwargs) -> None:
+        assert callable(selector), f"{type(selector)} is not a Callable"
+        self._selector = selector
+        self._branches = dict(branches)
+        self._default = default
+        steps = list(self._branches.values()) + ([default] if default is not None else [])
+        super().__init__(*steps, **kwargs)
+
+    def _collect_steps_returns(self) -> _ReturnType:
+        return intersect(getattr(step, ATTR_RETURNS) if hasattr(step, ATTR_RETURNS) else Any
+                         for step in self._steps)
+
+    def _filter_results(self, results: _ARGS_META) -> _FILTERED_ARGS_META:
+        returns = self.__pakkr_returns__
+        if returns == _Return([Any]):
+            return results[0], {}
+        return returns.downcast_result(results)
+
+    def _run_steps(self, args_meta: _ARGS_META, indent: int) -> _ARGS_META:
+        args, meta = args_meta
+        key = self._select(meta)
+        keys = list(self._branches)
+        position = keys.index(key) if key in self._branches else len(keys)
+        if position == len(self._steps):
+            msg = "No branch for key {} and no default branch.".format(repr(key))
+            context = '\twhen selecting a branch of {}'.format(_identifier(self))
+            raise PakkrError(msg, context) from RuntimeError(msg)
+
+        return self._run_step(args_meta, self._steps[position], indent, position=position)
+
+    def _select(self, meta: Dict) -> Hashable:
+        opts = _step_options(self._selector, (), meta)
+        try:
+            return self._selector(**opts)
+        except Exception as e:
+            context = exception_context(_identifier(self._selector), (), opts, meta)
+            raise PakkrError(str(e), context) from e
+
+
+class When(Switch):
+    """When executes `step` only if the `predicate`, whose parameters are injected from
+    meta, returns a truthy value. Otherwise the step is skipped and its positional inputs
+    are forwarded as the outputs, so a When returns the values the step is declared to
+    return but none of its meta."""
+
+    def __init__(self, predicate: Callable[..., Any], step: Callable, **kwargs) -> None:
+        super().__init__(predicate, {True: step}, **kwargs)
+
+    def _collect_steps_returns(self) -> _ReturnType:
+        step_returns = getattr(self._steps[0], ATTR_RETURNS, Any)
+        return intersect([step_returns, _skipped_returns(step_returns)])
+
+    def _run_steps(self, args_meta: _ARGS_META, indent: int) -> _ARGS_META:
+        args, meta = args_meta
+        if self._select(meta):
+            return self._run_step(args_meta, self._steps[0], indent, position=0)
+
+        if isinstance(self.__pakkr_returns__, (_Meta, _NoReturn)):
+            return (), meta
+        return args, meta
+
+
+def _skipped_returns(returns: Any) -> Any:
+    """What a skipped step returns: its positional inputs in place of its declared values."""
+    if isinstance(returns, _Return):
+        return _Return(returns.values)
+    elif isinstance(returns, _Meta):
+        return _NoReturn()
+    return returns
@@ -0,0 +1,142 @@
+import pytest
+from mock import MagicMock
+from pakkr import Pipeline, returns
+from pakkr.branching import Switch, When
+from pakkr.cmd_args.argument import argument
+from pakkr.cmd_args.cmd_args import cmd_args
+from pakkr.exception import PakkrError
+from pakkr.returns._meta import _Meta
+from pakkr.returns._no_return import _NoReturn
+from pakkr.returns._return import _Return
+
+
+def test_switch():
+    @returns(str, unit=str, factor=int)
+    def to_km(x):
+        return str(x / 1000), {'unit': 'km', 'factor': 1000}
+
+    @returns(str, unit=str)
+    def to_m(x):
+        return str(x), {'unit': 'm'}
+
+    @returns(str, unit=str)
+    def never_called(x):
+        raise Exception("should not be executed")  # pragma: no cover
+
+    switch = Switch(lambda scale: scale, {'km': to_km, 'm': to_m, 'cm': never_called},
+                    default=to_m, _name="convert")
+    pipeline = Pipeline(switch, lambda x, unit: x + unit)
+
+    assert pipeline(1500, scale='km') == '1.5km'
+    assert pipeline(1500, scale='m') == '1500m'
+    assert pipeline(1500, scale='mm') == '1500m'
+
+
+def test_switch_returns():
+    km = returns(str, unit=str, factor=int)(lambda x: None)
+    m = returns(str, unit=str)(lambda x: None)
+    assert Switch(lambda: 'km', {'km': km, 'm': m}).__pakkr_returns__ == _Return([str], _Meta(unit=str))
+    assert Switch(lambda: 'km', {'km': km}).__pakkr_returns__ == _Return([str], _Meta(unit=str, factor=int))
+
+    with pytest.raises(RuntimeError) as e:
+        Switch(lambda: 'km', {'km': km, 'm': returns(int, unit=str)(lambda x: None)})
+    assert str(e.value) == "Return values are not the same '(<class 'str'>,)' vs '(<class 'int'>,)'."
+
+
+def test_switch_drops_meta_not_in_every_branch():
+    @returns(unit=str, factor=int)
+    def km():
+        return {'unit': 'km', 'factor': 1000}
+
+    @returns(unit=str)
+    def m():
+        return {'unit': 'm'}  # pragma: no cover
+
+    def use_factor(unit, factor=1):
+        return unit, factor
+
+    pipeline = Pipeline(Switch(lambda scale: scale, {'km': km, 'm': m}), use_factor)
+    assert pipeline(scale='km') == ('km', 1)
+
+
+def test_switch_untyped_branch():
+    pipeline = Pipeline(Switch(lambda: 'a', {'a': lambda x: x + 1,
+                                             'b': returns(int, y=int)(lambda x: (x, {'y': 1}))}),
+                        lambda x, y=None: (x, y))
+    assert pipeline(1) == (2, None)
+
+
+def test_switch_missing_branch():
+    pipeline = Pipeline(Switch(lambda: 'c', {'a': lambda: 1}, _name="switch"))
+    with pytest.raises(PakkrError) as e:
+        pipeline()
+    assert str(e.value).startswith("No branch for key 'c' and no default branch.")
+    assert 'when selecting a branch of "switch"<Switch>' in str(e.value)
+
+
+def test_switch_selector_errors():
+    def selector(missing):
+        return missing  # pragma: no cover
+
+    with pytest.raises(PakkrError) as e:
+        Pipeline(Switch(selector, {'a': lambda: 1}))()
+    assert str(e.value).startswith("'missing' is required but not available.")
+
+    def failing_selector():
+        raise Exception("cannot select")
+
+    with pytest.raises(PakkrError) as e:
+        Pipeline(Switch(failing_selector, {'a': lambda: 1}))()
+    assert str(e.value).startswith("cannot select")
+    assert 'inside "failing_selector"<function>' in str(e.value)
+
+
+def test_switch_cmd_args():
+    @cmd_args(argument('--config'))
+    def step(config):
+        return config  # pragma: no cover
+
+    mock_parser = MagicMock()
+    Switch(lambda: 'a', {'a': step}).add_arguments(mock_parser)
+    mock_parser.add_argument.assert_called_once_with('--config')
+
+
+def test_when():
+    @returns(int, doubled=bool)
+    def double(x):
+        return x * 2, {'doubled': True}
+
+    when = When(lambda enabled: enabled, double)
+    assert when.__pakkr_returns__ == _Return([int])
+
+    pipeline = Pipeline(when, lambda x, doubled=False: (x, doubled))
+    assert pipeline(3, enabled=True) == (6, False)
+    assert pipeline(3, enabled=False) == (3, False)
+
+
+def test_when_meta_only_step():
+    @returns(stats=dict)
+    def compute_stats(x):
+        return {'stats': {'max': x}}
+
+    when = When(lambda enabled: enabled, compute_stats)
+    assert when.__pakkr_returns__ == _NoReturn()
+
+    pipeline = Pipeline(when, lambda: 'done')
+    assert pipeline(3, enabled=True) == 'done'
+    assert pipeline(3, enabled=False) == 'done'
+
+
+def test_when_untyped_step():
+    pipeline = Pipeline(When(lambda enabled: enabled, lambda x: x + 1), lambda x: x)
+    assert pipeline(3, enabled=True) == 4
+    assert pipeline(3, enabled=False) == 3
+
+
+def test_when_custom_returns():
+    @returns(int, doubled=bool)
+    def double(x):
+        return x * 2, {'doubled': True}  # pragma: no cover
+
+    when = returns()(When(lambda enabled: enabled, double))
+    assert Pipeline(when, lambda: 'done')(3, enabled=False) == 'done'
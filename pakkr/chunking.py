@@ -0,0 +1,202 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from pakkr._wrapper import _StepWrapper
+from pakkr.deadline import Deadline, DEADLINE_KEY
+from pakkr.pipeline import _identifier
+from pakkr.returns._meta import _Meta
+from pakkr.returns._return import _Return
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+
+def _same_meta(chunks: List[Dict]) -> Dict:
+    """Meta returned by all chunks, which should agree on its values."""
+    meta = dict(chunks[0])
+    differing = sorted(key for key, value in meta.items()
+                       if any(not _equal(value, chunk[key]) for chunk in chunks[1:]))
+    if differing:
+        raise RuntimeError("Chunks returned different values for meta keys {}, give chunked a reducer."
+                           .format(differing))
+    return meta
+
+
+def _equal(a: Any, b: Any) -> bool:
+    if a is b:
+        return True
+    try:
+        return bool(a == b)
+    except Exception:
+        return False
+
+
+def _bounds(length: int, n_chunks: int) -> List[slice]:
+    """Contiguous, non empty slices covering `length` items, as even as possible."""
+    n_chunks = max(1, min(n_chunks, length))
+    size, extra = divmod(length, n_chunks)
+    bounds, start = [], 0
+    for index in range(n_chunks):
+        stop = start + size + (index < extra)
+        bounds.append(slice(start, stop))
+        start = stop
+    return bounds
+
+
+def _with_deadline(step: Callable, remaining: float, *args, **kwargs) -> Any:
+    """Executed by an executor of other processes: the step gets a new Deadline with the time
+    remaining when its chunk was submitted."""
+    kwargs[DEADLINE_KEY] = Deadline(remaining)
+    return step(*args, **kwargs)
+
+
+class _Chunked(_StepWrapper):
+    """Step wrapper executing the step on chunks of one of its positional inputs in parallel
+    and reassembling the outputs."""
+
+    def __init__(self, step: Callable, axis: int, n_chunks: Optional[int], executor: Optional[Any],
+                 arg: int, reducer: Optional[Callable[[List[Dict]], Dict]],
+                 concat: Optional[Callable[[List], Any]]) -> None:
+        super().__init__(step)
+        self._axis = axis
+        self._n_chunks = n_chunks if n_chunks is not None else (os.cpu_count() or 1)
+        self._executor = executor
+        self._arg = arg
+        self._reducer = reducer if reducer is not None else _same_meta
+        self._concat = concat
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> Any:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self._n_chunks)
+            return self._executor
+
+    def __call__(self, *args, **kwargs):
+        step = self._bind()
+        if len(args) <= self._arg:
+            raise RuntimeError("{} is chunked along positional input {} but was given {} positional inputs."
+                               .format(_identifier(self), self._arg, len(args)))
+        chunks = self._split(args[self._arg])
+        if len(chunks) == 1:
+            return step(*args, **kwargs)
+
+        deadline = kwargs.get(DEADLINE_KEY)
+        deadline = deadline if isinstance(deadline, Deadline) else None
+        executor = self.executor
+        if deadline is not None and not isinstance(executor, ThreadPoolExecutor):
+            # a Deadline cannot be pickled, the chunks are given the remaining time instead
+            kwargs = {key: value for key, value in kwargs.items() if key != DEADLINE_KEY}
+            step = partial(_with_deadline, step, deadline.remaining())
+        futures = [executor.submit(step, *args[:self._arg], chunk, *args[self._arg + 1:], **kwargs)
+                   for chunk in chunks]
+        try:
+            results = [future.result(timeout=None if deadline is None else deadline.remaining())
+                       for future in futures]
+        except TimeoutError:
+            deadline.check(_identifier(self))  # type: ignore
+            raise  # pragma: no cover
+        finally:
+            for future in futures:
+                future.cancel()
+        return self._join(results)
+
+    def _split(self, value: Any) -> List[Any]:
+        if np is not None and isinstance(value, np.ndarray):
+            if value.ndim <= self._axis:
+                raise RuntimeError("{} is chunked along axis {} of an array with {} dimensions."
+                                   .format(_identifier(self), self._axis, value.ndim))
+            return [value[(slice(None),) * self._axis + (bounds,)]
+                    for bounds in _bounds(value.shape[self._axis], self._n_chunks)]
+        if self._axis != 0:
+            raise RuntimeError("{} is chunked along axis {} but only arrays can be split along another axis than 0."
+                               .format(_identifier(self), self._axis))
+        return [value[bounds] for bounds in _bounds(len(value), self._n_chunks)]
+
+    def _join(self, results: List[Any]) -> Any:
+        """Reassemble the outputs of the chunks following the step's `@returns`: values are
+        concatenated and meta reduced."""
+        returns = getattr(self, '__pakkr_returns__', None)
+        if isinstance(returns, _Meta):
+            return self._reducer(results)
+        if not isinstance(returns, _Return):
+            return self._concatenate(results)
+        if len(returns._types) == 1:
+            return self._concatenate(results)
+
+        joined = [self._concatenate([result[index] for result in results]) for index in range(len(returns.values))]
+        if returns.meta:
+            joined.append(self._reducer([result[-1] for result in results]))
+        return tuple(joined)
+
+    def _concatenate(self, values: Sequence) -> Any:
+        if self._concat is not None:
+            return self._concat(list(values))
+        if np is not None and all(isinstance(value, np.ndarray) for value in values):
+            return np.concatenate(values, axis=self._axis)
+        if all(isinstance(value, list) for value in values):
+            return [item for value in values for item in value]
+        if all(isinstance(value, tuple) for value in values):
+            return tuple(item for value in values for item in value)
+        if all(isinstance(value, str) for value in values):
+            return ''.join(values)
+        raise RuntimeError("Cannot concatenate the outputs of {} of types {}, give chunked a concat function."
+                           .format(_identifier(self), sorted({type(value).__name__ for value in values})))
+
+
+def chunked(axis: int=0,
+            n_chunks: Optional[int]=None,
+            executor: Optional[Any]=None,
+            arg: int=0,
+            reducer: Optional[Callable[[List[Dict]], Dict]]=None,
+            concat: Optional[Callable[[List], Any]]=None):
+    """
+    Decorator to execute a row-wise step, e.g. a transform of a large numpy array, on
+    chunks of one of its positional inputs in parallel: the input is split in `n_chunks`
+    contiguous chunks along `axis`, the step is executed once per chunk with the same
+    other inputs and meta, and its outputs are reassembled in order before the `@returns`
+    of the step are checked against them.
+
+    Every value the step returns is concatenated along `axis`: arrays with
+    `np.concatenate`, lists, tuples and strings one after the other, or with `concat`, e.g.
+    `pandas.concat` for DataFrames, which are split by slicing along their rows. The meta
+    returned by the chunks is merged by `reducer`, given the list of the chunks' meta
+    dictionaries; by default the chunks should all return the same meta values.
+
+    Threads suit steps releasing the GIL, as most numpy operations do; a process pool can
+    be given as `executor` for others, the step then has to be picklable and its chunks get
+    a new `deadline` with the time remaining when they were submitted.
+
+    Parameters
+    ----------
+    axis : int
+        axis along which arrays are split and outputs concatenated
+    n_chunks : int
+        number of chunks, the number of CPUs by default; smaller inputs are split into as
+        many chunks as they have items
+    executor : concurrent.futures.Executor
+        executor running the chunks, a pool of `n_chunks` threads is created otherwise
+    arg : int
+        position of the positional input to split
+    reducer : Callable[[List[Dict]], Dict]
+        merges the meta returned by the chunks
+    concat : Callable[[List], Any]
+        reassembles the values returned by the chunks
+
+    Returns
+    -------
+    Callable
+        decorator returning the chunked step
+    """
+    if n_chunks is not None and n_chunks < 1:
+        raise RuntimeError("Number of chunks should be at least 1, got {}.".format(n_chunks))
+
+    def decorated(step):
+        return _Chunked(step, axis, n_chunks, executor, arg, reducer, concat)
+    return decorated
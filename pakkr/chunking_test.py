@@ -0,0 +1,174 @@
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import numpy as np
+import pytest
+from pakkr import Pipeline, returns
+from pakkr.chunking import chunked, _with_deadline
+from pakkr.deadline import Deadline
+from pakkr.exception import PakkrError, PakkrTimeoutError
+
+
+def test_chunked_array():
+    threads = set()
+
+    @chunked(n_chunks=3)
+    @returns(np.ndarray)
+    def scale(rows, factor):
+        threads.add(threading.get_ident())
+        time.sleep(0.05)
+        return rows * factor
+
+    rows = np.arange(20).reshape(10, 2)
+    assert np.array_equal(Pipeline(scale)(rows, factor=2), rows * 2)
+    assert len(threads) > 1
+
+    @chunked(axis=1, n_chunks=4)
+    def normalise(rows):
+        assert rows.shape[1] == 1
+        return rows / rows.sum(axis=0)
+
+    assert np.allclose(Pipeline(normalise)(np.ones((3, 2))), np.ones((3, 2)) / 3)
+
+
+def test_chunked_values_and_meta():
+    executor = ThreadPoolExecutor(2)
+
+    @chunked(n_chunks=2, executor=executor, arg=1,
+             reducer=lambda chunks: {'total': sum(chunk['total'] for chunk in chunks), 'unit': chunks[0]['unit']})
+    @returns(list, tuple, total=int, unit=str)
+    def tokenise(prefix, lines, unit='word'):
+        words = [prefix + word for line in lines for word in line.split()]
+        return words, tuple(len(line) for line in lines), {'total': len(words), 'unit': unit}
+
+    pipeline = Pipeline(tokenise, lambda words, lengths, total, unit: (words, lengths, total, unit))
+    assert pipeline('#', ['a b', 'c', 'd e f']) == (['#a', '#b', '#c', '#d', '#e', '#f'], (3, 1, 5), 6, 'word')
+    assert tokenise._executor is executor
+
+    @chunked(n_chunks=2)
+    @returns(lines=int)
+    def count(lines):
+        return {'lines': len(lines)}
+
+    with pytest.raises(PakkrError) as e:
+        Pipeline(count)(['a', 'b', 'c'])
+    assert str(e.value).startswith("Chunks returned different values for meta keys ['lines'], give chunked a reducer.")
+
+    @chunked(n_chunks=4)
+    @returns(unit=str)
+    def unit(lines):
+        return {'unit': 'line'}
+
+    assert Pipeline(unit, lambda unit: unit)(['a', 'b']) == 'line'
+
+    @chunked(n_chunks=2)
+    @returns(weights=np.ndarray)
+    def weights(lines):
+        return {'weights': np.ones(2)}
+
+    with pytest.raises(PakkrError) as e:
+        Pipeline(weights)(['a', 'b'])
+    assert str(e.value).startswith("Chunks returned different values for meta keys ['weights']")
+
+    # @returns are checked against the reassembled outputs
+    @chunked(n_chunks=2)
+    @returns(list)
+    def first(lines):
+        return lines[0]
+
+    with pytest.raises(RuntimeError) as e:
+        Pipeline(first)(['a', 'b'])
+    assert str(e.value).startswith("Values error: 'ab' is not of type <class 'list'>.")
+
+
+def test_chunked_small_inputs():
+    calls = []
+
+    @chunked(n_chunks=8)
+    def double(values):
+        calls.append(values)
+        return values * 2
+
+    assert Pipeline(double)('ab') == 'aabb'
+    assert calls == ['a', 'b']
+    calls.clear()
+    assert Pipeline(double)([]) == []
+    assert calls == [[]]
+
+
+def test_chunked_concat():
+    class Frame:
+        def __init__(self, rows):
+            self.rows = rows
+
+        def __len__(self):
+            return len(self.rows)
+
+        def __getitem__(self, rows):
+            return Frame(self.rows[rows])
+
+    @chunked(n_chunks=2)
+    def rows(frame):
+        return frame
+
+    with pytest.raises(PakkrError) as e:
+        Pipeline(rows)(Frame([1, 2, 3]))
+    assert str(e.value).startswith("Cannot concatenate the outputs of \"rows\"<_Chunked> of types ['Frame'], "
+                                   "give chunked a concat function.")
+
+    concat = chunked(n_chunks=2, concat=lambda frames: Frame([r for f in frames for r in f.rows]))
+    assert Pipeline(concat(rows.__wrapped__))(Frame([1, 2, 3])).rows == [1, 2, 3]
+
+
+def test_chunked_deadline():
+    @chunked(n_chunks=2)
+    def slow(values, deadline):
+        time.sleep(0.3)
+        return values
+
+    with pytest.raises(PakkrTimeoutError):
+        Pipeline(slow)([1, 2], deadline=Deadline(0.1))
+    assert Pipeline(slow)([1, 2], deadline=Deadline(10)) == [1, 2]
+
+
+def sleep_values(values, deadline):
+    time.sleep(values[0])
+    return values, deadline.remaining()
+
+
+def test_chunked_deadline_in_processes():
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        step = chunked(n_chunks=2, executor=executor, concat=list)(sleep_values)
+        (first, remaining), (second, _) = Pipeline(step)([0, 0], deadline=Deadline(10))
+        assert first == second == [0]
+        assert 0 < remaining <= 10
+
+        with pytest.raises(PakkrTimeoutError):
+            Pipeline(step)([0.3, 0.3], deadline=Deadline(0.1))
+
+
+def test_with_deadline():
+    values, remaining = _with_deadline(sleep_values, 5, [0])
+    assert values == [0] and 0 < remaining <= 5
+
+
+def test_chunked_errors():
+    with pytest.raises(RuntimeError) as e:
+        chunked(n_chunks=0)
+    assert str(e.value) == "Number of chunks should be at least 1, got 0."
+
+    @chunked(axis=1, n_chunks=2, arg=1)
+    def step(*args):
+        return args[0]  # pragma: no cover
+
+    with pytest.raises(PakkrError) as e:
+        Pipeline(step)(np.zeros(3))
+    assert str(e.value).startswith('"step"<_Chunked> is chunked along positional input 1 but was given 1 positional'
+                                   ' inputs.')
+    with pytest.raises(PakkrError) as e:
+        Pipeline(step)(0, np.zeros(3))
+    assert str(e.value).startswith('"step"<_Chunked> is chunked along axis 1 of an array with 1 dimensions.')
+    with pytest.raises(PakkrError) as e:
+        Pipeline(step)(0, [1, 2])
+    assert str(e.value).startswith('"step"<_Chunked> is chunked along axis 1 but only arrays can be split along '
+                                   'another axis than 0.')
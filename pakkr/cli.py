@@ -0,0 +1,88 @@
+import importlib
+import os
+import sys
+from argparse import ArgumentParser
+from typing import List, Optional
+
+from pakkr.history import explain, RunHistory
+from pakkr.pipeline import Pipeline, pakkr_logger
+from pakkr.replay import replay, StepRecorder
+from pakkr.serve import make_server, PipelineService
+
+
+def load_pipeline(reference: str) -> Pipeline:
+    """Import the Pipeline referred to as `module:attribute`; an attribute which is not a
+    Pipeline is called, without arguments, to construct one."""
+    module_name, _, attribute = reference.partition(':')
+    if not module_name or not attribute:
+        raise RuntimeError("Pipeline should be given as module:attribute, got '{}'.".format(reference))
+
+    obj = importlib.import_module(module_name)
+    for name in attribute.split('.'):
+        obj = getattr(obj, name)
+    if not isinstance(obj, Pipeline):
+        obj = obj()
+    if not isinstance(obj, Pipeline):
+        raise RuntimeError("'{}' is not a Pipeline.".format(reference))
+    return obj
+
+
+def _parser() -> ArgumentParser:
+    parser = ArgumentParser(prog='pakkr')
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+
+    serve = commands.add_parser('serve', help="keep a Pipeline loaded and execute requests sent to it",
+                                description="Arguments following the options are parsed with the "
+                                            "Pipeline's cmd_args and given to every run as meta.")
+    serve.add_argument('pipeline', help="Pipeline to serve, as module:attribute")
+    listen = serve.add_mutually_exclusive_group(required=True)
+    listen.add_argument('--socket', help="path of the Unix domain socket to listen on")
+    listen.add_argument('--port', type=int, help="localhost HTTP port to listen on")
+    serve.add_argument('--host', default='127.0.0.1', help="address to listen on with --port")
+    serve.add_argument('--max-concurrency', type=int, default=os.cpu_count() or 1,
+                       help="number of requests executed at the same time")
+    serve.add_argument('--queue-timeout', type=float, default=None,
+                       help="seconds a request may wait for a free slot before being rejected")
+
+    report = commands.add_parser('explain', help="report where the time of a Pipeline's recorded runs goes")
+    report.add_argument('pipeline', help="Pipeline to explain, as module:attribute")
+    report.add_argument('--history', help="directory of the recorded runs, the Pipeline's _history by default")
+
+    bench = commands.add_parser('replay', help="time steps of a Pipeline against their captured inputs")
+    bench.add_argument('pipeline', help="Pipeline whose steps to replay, as module:attribute")
+    bench.add_argument('start', type=int, help="position of the first step to replay")
+    bench.add_argument('stop', type=int, nargs='?', help="position after the last step to replay")
+    bench.add_argument('--captures', help="directory of the captured inputs, the Pipeline's _recorder by default")
+    bench.add_argument('--repeat', type=int, default=10, help="number of timed executions")
+    bench.add_argument('--warmup', type=int, default=1, help="number of executions before the timed ones")
+    return parser
+
+
+def main(argv: Optional[List[str]]=None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    parser = _parser()
+    args, pipeline_argv = parser.parse_known_args(argv)
+    if args.command != 'serve':  # only served Pipelines are given arguments of their own
+        args = parser.parse_args(argv)
+
+    pipeline = load_pipeline(args.pipeline)
+    if args.command == 'explain':
+        print(explain(pipeline, RunHistory(args.history) if args.history else None))
+        return
+    if args.command == 'replay':
+        print(replay(pipeline, args.start, args.stop, args.repeat, args.warmup,
+                     StepRecorder(args.captures) if args.captures else None))
+        return
+
+    meta = vars(pipeline.add_arguments(ArgumentParser(prog=args.pipeline)).parse_args(pipeline_argv))
+    service = PipelineService(pipeline, args.max_concurrency, args.queue_timeout, meta)
+    server = make_server(service, args.socket, args.host, args.port)
+
+    pakkr_logger.info("serving %s on %s", args.pipeline, args.socket or '{}:{}'.format(args.host, args.port))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,73 @@
+import pytest
+from mock import patch
+from pakkr import Pipeline
+from pakkr.cli import load_pipeline, main
+from pakkr.cmd_args.argument import argument
+from pakkr.cmd_args.cmd_args import cmd_args
+from pakkr.history import RunHistory
+from pakkr.replay import StepRecorder
+
+
+@cmd_args(argument('--factor', type=int, default=1))
+def scale(x, factor):
+    return x * factor  # pragma: no cover
+
+
+pipeline = Pipeline(scale)
+
+
+def build():
+    return Pipeline(scale, _name="built")
+
+
+def test_load_pipeline():
+    assert load_pipeline('pakkr.cli_test:pipeline') is pipeline
+    assert load_pipeline('pakkr.cli_test:build')._name == "built"
+
+    with pytest.raises(RuntimeError) as e:
+        load_pipeline('pakkr.cli_test')
+    assert str(e.value) == "Pipeline should be given as module:attribute, got 'pakkr.cli_test'."
+
+    with pytest.raises(RuntimeError) as e:
+        load_pipeline('pakkr.cli_test:scale.__name__.upper')
+    assert str(e.value) == "'pakkr.cli_test:scale.__name__.upper' is not a Pipeline."
+
+
+@patch('pakkr.cli.make_server')
+def test_main_serve(make_server, tmpdir):
+    make_server.return_value.serve_forever.side_effect = KeyboardInterrupt
+    path = str(tmpdir.join('pakkr.sock'))
+    main(['serve', 'pakkr.cli_test:pipeline', '--socket', path, '--max-concurrency', '2', '--factor', '3'])
+
+    service, socket_path, host, port = make_server.call_args[0]
+    assert service.pipeline is pipeline
+    assert service.meta == {'factor': 3}
+    assert (socket_path, host, port) == (path, '127.0.0.1', None)
+    make_server.return_value.server_close.assert_called_once_with()
+
+
+def test_main_requires_an_address():
+    with pytest.raises(SystemExit):
+        main(['serve', 'pakkr.cli_test:pipeline'])
+
+
+def test_main_explain(tmpdir, capsys):
+    history = RunHistory(str(tmpdir))
+    Pipeline(scale, _name="built", _history=history)(2, factor=3)
+    main(['explain', 'pakkr.cli_test:build', '--history', str(tmpdir)])
+    assert capsys.readouterr().out.startswith('Pipeline "built": 1 recorded runs')
+
+
+def test_main_replay(tmpdir, capsys):
+    recorder = StepRecorder(str(tmpdir))
+    Pipeline(scale, _name="built", _recorder=recorder)(2, factor=3)
+    main(['replay', 'pakkr.cli_test:build', '0', '--captures', str(tmpdir), '--repeat', '2'])
+    assert capsys.readouterr().out.startswith('"scale"<function>: 2 runs, mean ')
+
+
+def test_main_rejects_unknown_options(capsys):
+    with pytest.raises(SystemExit):
+        main(['explain', 'pakkr.cli_test:build', '--histroy', 'runs'])
+    with pytest.raises(SystemExit):
+        main(['replay', 'pakkr.cli_test:build', '0', '--repaet', '2'])
+    assert capsys.readouterr().err.count('unrecognized arguments') == 2
@@ -0,0 +1,95 @@
+import asyncio
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from pakkr.batching import _Batched, _Cohort, _run_in_cohort
+from pakkr.pipeline import _identifier, Pipeline
+
+
+class Coalescer:
+    """
+    asyncio front end to a Pipeline for online serving. Concurrent calls are held for up
+    to `window` seconds, or until `max_size` of them are pending, and then released
+    through the Pipeline together as one batch, so that steps decorated with `@batched`
+    execute once for the whole batch. Each caller is resolved with the result, or the
+    error, of its own run; the latency added to a call is at most `window`, as a batched
+    step executes as soon as every run of the batch has reached it rather than waiting
+    for its own `max_wait`.
+
+    Coalescing only pays off through `@batched` steps, so the Pipeline should have some,
+    possibly in nested Pipelines or branches.
+
+    Parameters
+    ----------
+    pipeline : Pipeline
+        Pipeline executed once per call, on the executor's threads
+    max_size : int
+        number of pending calls releasing a batch before the window ends
+    window : float
+        seconds a call is held to be coalesced with the following ones
+    executor : concurrent.futures.Executor
+        executor running the Pipeline, a pool of `max_size` threads by default; it should
+        have at least `max_size` workers so a whole batch can reach `@batched` steps
+    """
+
+    def __init__(self,
+                 pipeline: Pipeline,
+                 max_size: int=32,
+                 window: float=0.005,
+                 executor: Optional[Executor]=None) -> None:
+        if max_size < 1:
+            raise RuntimeError("Batch size should be at least 1, got {}.".format(max_size))
+        if not _has_batched_steps(pipeline):
+            raise RuntimeError("{} has no @batched steps, coalescing its calls would only add latency."
+                               .format(_identifier(pipeline)))
+        self.pipeline = pipeline
+        self._max_size = max_size
+        self._window = window
+        self._executor = executor if executor is not None else ThreadPoolExecutor(max_workers=max_size)
+        self._pending: List[Tuple[asyncio.Future, Tuple, Dict]] = []
+        self._timer: Optional[asyncio.Handle] = None
+        self._stats = {'calls': 0, 'batches': 0}
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Number of calls and of batches they were released in."""
+        return dict(self._stats)
+
+    async def __call__(self, *args, **meta) -> Any:
+        loop = asyncio.get_event_loop()
+        released = loop.create_future()
+        self._pending.append((released, args, meta))
+        if len(self._pending) >= self._max_size:
+            self._release()
+        elif self._timer is None:
+            self._timer = loop.call_later(self._window, self._release)
+
+        return await asyncio.wrap_future(await released)
+
+    def _release(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch = [call for call in self._pending if not call[0].cancelled()]
+        self._pending = []
+        if not batch:
+            return
+
+        self._stats['calls'] += len(batch)
+        self._stats['batches'] += 1
+        cohort = _Cohort(len(batch))
+        for released, args, meta in batch:
+            released.set_result(self._executor.submit(_run_in_cohort, cohort, self.pipeline, args, meta))
+
+
+def _has_batched_steps(step: Any) -> bool:
+    """Whether a step is, wraps or, for a Pipeline, contains a `@batched` step."""
+    while True:
+        if isinstance(step, _Batched):
+            return True
+        if isinstance(step, Pipeline):
+            return any(_has_batched_steps(nested) for nested in step._steps)
+        if '__wrapped__' not in getattr(step, '__dict__', {}):
+            return False
+        step = step.__wrapped__
@@ -0,0 +1,115 @@
+import asyncio
+import time
+import pytest
+from pakkr import batched, hedged, Pipeline
+from pakkr.branching import When
+from pakkr.coalescing import Coalescer
+from pakkr.exception import PakkrError
+
+
+def _run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+def test_coalescer():
+    batches = []
+
+    @batched(max_size=4, max_wait=1)
+    def infer(rows):
+        batches.append(len(rows))
+        return [r * 2 for r in rows]
+
+    coalescer = Coalescer(Pipeline(infer), max_size=4, window=1)
+
+    async def calls():
+        return await asyncio.gather(*(coalescer(x) for x in range(8)))
+
+    assert _run(calls()) == [0, 2, 4, 6, 8, 10, 12, 14]
+    assert batches == [4, 4]
+    assert coalescer.stats == {'calls': 8, 'batches': 2}
+
+
+def test_coalescer_window():
+    @batched(max_wait=10)
+    def add(rows, offset):
+        return [row + offset for row in rows]
+
+    coalescer = Coalescer(Pipeline(add), max_size=100, window=0.01)
+
+    async def calls():
+        first = await asyncio.gather(coalescer(1, offset=1), coalescer(2, offset=1))
+        second = await coalescer(3, offset=3)
+        return first, second
+
+    started = time.monotonic()
+    assert _run(calls()) == ([2, 3], 6)
+    assert time.monotonic() - started < 1  # batched steps do not wait for their own max_wait
+    assert coalescer.stats == {'calls': 3, 'batches': 2}
+    assert add.stats == {'batches': 2, 'items': 3}
+
+
+def test_coalescer_larger_than_batches():
+    @batched(max_size=2, max_wait=10)
+    def double(rows):
+        return [row * 2 for row in rows]
+
+    coalescer = Coalescer(Pipeline(double), max_size=5, window=0.01)
+
+    async def calls():
+        return await asyncio.gather(*(coalescer(x) for x in range(5)))
+
+    started = time.monotonic()
+    assert _run(calls()) == [0, 2, 4, 6, 8]
+    assert time.monotonic() - started < 1
+    assert double.stats == {'batches': 3, 'items': 5}
+
+
+def test_coalescer_errors_are_per_call():
+    @batched()
+    def fail_on_two(rows):
+        return [ValueError("two") if row == 2 else row for row in rows]
+
+    def raise_errors(x):
+        if isinstance(x, Exception):
+            raise x
+        return x
+
+    coalescer = Coalescer(Pipeline(fail_on_two, raise_errors), window=0.01)
+
+    async def calls():
+        return await asyncio.gather(coalescer(1), coalescer(2), return_exceptions=True)
+
+    one, two = _run(calls())
+    assert one == 1
+    assert isinstance(two, PakkrError) and str(two).startswith("two")
+
+    with pytest.raises(RuntimeError) as e:
+        Coalescer(Pipeline(fail_on_two), max_size=0)
+    assert str(e.value) == "Batch size should be at least 1, got 0."
+
+
+def test_coalescer_needs_batched_steps():
+    with pytest.raises(RuntimeError) as e:
+        Coalescer(Pipeline(lambda x: x, Pipeline(hedged()(lambda x: x)), _name="plain"))
+    assert str(e.value) == '"plain"<Pipeline> has no @batched steps, coalescing its calls would only add latency.'
+
+    nested = batched()(lambda rows: rows)
+    Coalescer(Pipeline(lambda x: x, When(lambda: True, hedged()(nested))))
+
+
+def test_coalescer_cancelled_call():
+    coalescer = Coalescer(Pipeline(batched()(lambda rows: rows)), window=0.01)
+
+    async def calls():
+        cancelled = asyncio.ensure_future(coalescer(1))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        await asyncio.sleep(0.02)
+        return await coalescer(2)
+
+    assert _run(calls()) == 2
+    assert coalescer.stats == {'calls': 1, 'batches': 1}
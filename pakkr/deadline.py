@@ -0,0 +1,131 @@
+import threading
+import time
+from typing import Callable, List, Optional
+
+from pakkr.exception import PakkrTimeoutError
+
+ATTR_TIMEOUT = "__pakkr_timeout__"
+DEADLINE_KEY = "deadline"
+
+
+class Deadline:
+    """
+    A time budget shared by a run, a nested Pipeline or a single step.
+
+    A Deadline is injected as the `deadline` meta value so steps can inspect the
+    remaining budget, stop early with `check()` or register a callback to cancel
+    any work they have handed off to workers.
+
+    Preemption is cooperative only: a step is never interrupted, so a slow step ignoring
+    its deadline keeps its thread until it returns and the run only fails then.
+    """
+
+    def __init__(self, seconds: float, parent: Optional["Deadline"]=None) -> None:
+        if seconds < 0:
+            raise RuntimeError("Deadline budget should not be negative, got {}.".format(seconds))
+
+        self.budget = seconds
+        self.started_at = time.monotonic()
+        self.expires_at = self.started_at + seconds
+        if parent is not None and parent.expires_at < self.expires_at:
+            self.expires_at = parent.expires_at
+
+        self._cancelled = threading.Event()
+        self._callbacks: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+        self._parent = parent
+        if parent is not None:
+            parent.add_cancel_callback(self.cancel)
+
+    def remaining(self) -> float:
+        """Seconds left before this deadline expires, never negative."""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    @property
+    def expired(self) -> bool:
+        return self.cancelled or self.remaining() <= 0
+
+    def add_cancel_callback(self, fn: Callable[[], None]) -> None:
+        """Call `fn` once this deadline is cancelled; immediately if it already is."""
+        with self._lock:
+            if not self.cancelled:
+                self._callbacks.append(fn)
+                return
+        fn()
+
+    def remove_cancel_callback(self, fn: Callable[[], None]) -> None:
+        """Stop calling `fn` once this deadline is cancelled, e.g. once the work it would
+        cancel is finished."""
+        with self._lock:
+            if fn in self._callbacks:
+                self._callbacks.remove(fn)
+
+    def detach(self) -> None:
+        """Stop being cancelled with the parent deadline, once the run or step this deadline
+        bounds is finished, so that a long-lived parent does not keep every child alive."""
+        if self._parent is not None:
+            self._parent.remove_cancel_callback(self.cancel)
+            self._parent = None
+
+    def cancel(self) -> None:
+        """Mark this deadline as cancelled and notify every registered callback."""
+        with self._lock:
+            if self.cancelled:
+                return
+            self._cancelled.set()
+            callbacks, self._callbacks = self._callbacks, []
+
+        self.detach()
+        for fn in callbacks:
+            fn()
+
+    def check(self, identifier: str="step") -> None:
+        """
+        Raise if this deadline has expired or been cancelled.
+
+        Raises
+        ------
+        PakkrTimeoutError
+            when there is no budget left
+        """
+        if self.expired:
+            self.cancel()
+            raise PakkrTimeoutError(identifier, self.budget, self.elapsed())
+
+    def __repr__(self):
+        return "Deadline(budget={:.3f}s, remaining={:.3f}s)".format(self.budget, self.remaining())
+
+
+def timeout(seconds: float):
+    """
+    Decorator to add the __pakkr_timeout__ attribute to the object being decorated, giving
+    a step or a nested Pipeline at most `seconds`, or what is left of the run's budget.
+
+    The budget is enforced cooperatively: it is checked before and after the step, which
+    can check its `deadline` itself, but the step is not interrupted. A step ignoring its
+    deadline keeps running, and keeps its thread, after `PakkrTimeoutError` is raised;
+    likewise an `in_process` step already started keeps its worker process busy until it
+    returns, only its result is ignored.
+    """
+    if seconds < 0:
+        raise RuntimeError("Timeout should not be negative, got {}.".format(seconds))
+
+    def decorated(obj):
+        setattr(obj, ATTR_TIMEOUT, seconds)
+        return obj
+    return decorated
+
+
+def step_deadline(step, parent: Optional[Deadline]) -> Optional[Deadline]:
+    """Derive the Deadline a step runs under from its declared timeout and the parent's budget."""
+    seconds = getattr(step, ATTR_TIMEOUT, None)
+    if seconds is None:
+        return parent
+    return Deadline(seconds, parent=parent)
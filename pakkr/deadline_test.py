@@ -0,0 +1,109 @@
+import pytest
+from mock import MagicMock, patch
+from pakkr.deadline import ATTR_TIMEOUT, Deadline, step_deadline, timeout
+from pakkr.exception import PakkrTimeoutError
+
+
+@patch('pakkr.deadline.time')
+def test_deadline_remaining(mock_time):
+    mock_time.monotonic.side_effect = [10.0, 12.5, 13.0, 16.0]
+    deadline = Deadline(5)
+
+    assert deadline.budget == 5
+    assert deadline.remaining() == 2.5
+    assert deadline.elapsed() == 3.0
+    assert deadline.remaining() == 0.0
+
+
+def test_deadline_negative():
+    with pytest.raises(RuntimeError) as e:
+        Deadline(-1)
+    assert str(e.value) == "Deadline budget should not be negative, got -1."
+
+
+def test_deadline_bounded_by_parent():
+    parent = Deadline(1)
+    child = Deadline(100, parent=parent)
+    assert child.expires_at == parent.expires_at
+
+    child = Deadline(0.5, parent=parent)
+    assert child.expires_at < parent.expires_at
+
+
+def test_deadline_cancel():
+    callback = MagicMock()
+    deadline = Deadline(100)
+    deadline.add_cancel_callback(callback)
+    assert not deadline.expired
+
+    deadline.cancel()
+    deadline.cancel()
+    assert deadline.cancelled
+    assert deadline.expired
+    callback.assert_called_once_with()
+
+    late_callback = MagicMock()
+    deadline.add_cancel_callback(late_callback)
+    late_callback.assert_called_once_with()
+
+
+def test_deadline_cancel_propagates_to_child():
+    parent = Deadline(100)
+    child = Deadline(100, parent=parent)
+    parent.cancel()
+    assert child.cancelled
+
+
+def test_deadline_detach():
+    callback = MagicMock()
+    parent = Deadline(100)
+    parent.add_cancel_callback(callback)
+    parent.remove_cancel_callback(callback)
+    parent.remove_cancel_callback(callback)
+
+    child = Deadline(100, parent=parent)
+    cancelled = Deadline(100, parent=parent)
+    cancelled.cancel()
+    assert parent._callbacks == [child.cancel]
+
+    child.detach()
+    child.detach()
+    assert parent._callbacks == []
+    parent.cancel()
+    assert not child.cancelled
+    callback.assert_not_called()
+
+
+def test_deadline_check():
+    Deadline(100).check()
+
+    deadline = Deadline(0)
+    with pytest.raises(PakkrTimeoutError) as e:
+        deadline.check('"some_step"<function>')
+    assert e.value.identifier == '"some_step"<function>'
+    assert e.value.budget == 0
+    assert str(e.value).startswith('Deadline of 0.000s exceeded by "some_step"<function> after ')
+    assert deadline.cancelled
+
+
+def test_deadline_repr():
+    assert repr(Deadline(0)) == "Deadline(budget=0.000s, remaining=0.000s)"
+
+
+def test_timeout_deco():
+    decorated = timeout(1.5)(lambda: 1)
+    assert getattr(decorated, ATTR_TIMEOUT) == 1.5
+
+    with pytest.raises(RuntimeError) as e:
+        timeout(-1)
+    assert str(e.value) == "Timeout should not be negative, got -1."
+
+
+def test_step_deadline():
+    parent = Deadline(100)
+    assert step_deadline(lambda: 1, None) is None
+    assert step_deadline(lambda: 1, parent) is parent
+
+    deadline = step_deadline(timeout(1)(lambda: 1), parent)
+    assert deadline.budget == 1
+    assert deadline is not parent
@@ -40,6 +40,20 @@ class PakkrError(Exception):
         return '\n'.join(self._stacks)
 
 
+class PakkrTimeoutError(PakkrError):
+    """Raised when a run, a nested Pipeline or a step used up its time budget."""
+
+    def __init__(self, identifier, budget, elapsed, stack=None):
+        self.identifier = identifier
+        self.budget = budget
+        self.elapsed = elapsed
+        message = 'Deadline of {:.3f}s exceeded by {} after {:.3f}s.'.format(budget, identifier, elapsed)
+        super(PakkrTimeoutError, self).__init__(message, stack)
+
+    def __reduce__(self):
+        return type(self), (self.identifier, self.budget, self.elapsed), self.__dict__
+
+
 def exception_context(identifier, arg, opts, meta):
     called_with = ', '.join(chain([str(type(v)) for v in arg],
                                   ['{}={}'.format(k, type(v)) for k, v in opts.items()]))
@@ -1,8 +1,10 @@
+import pickle
 import sys
 from collections import OrderedDict
 from pakkr.exception import (exception_context,
                              exception_handler,
                              PakkrError,
+                             PakkrTimeoutError,
                              pakkr_exchandler,
                              summarise_dictionary)
 from mock import DEFAULT, patch, MagicMock, PropertyMock
@@ -64,3 +66,16 @@ def test_pakkr_error():
     error.append_stack("stack #2")
 
     assert str(error) == "some error\nstack #1\nstack #2"
+
+
+def test_pakkr_timeout_error():
+    error = PakkrTimeoutError('"slow"<function>', 1.0, 2.5, "stack #1")
+
+    assert isinstance(error, PakkrError)
+    assert error.identifier == '"slow"<function>'
+    assert error.budget == 1.0
+    assert error.elapsed == 2.5
+    assert str(error) == 'Deadline of 1.000s exceeded by "slow"<function> after 2.500s.\nstack #1'
+
+    unpickled = pickle.loads(pickle.dumps(error))
+    assert str(unpickled) == str(error)
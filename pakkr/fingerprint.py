@@ -0,0 +1,144 @@
+import hashlib
+import pickle
+import sys
+import threading
+import weakref
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from pakkr.deadline import DEADLINE_KEY
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+try:
+    import xxhash
+except ImportError:  # pragma: no cover
+    xxhash = None  # install the xxhash extra for a faster hash
+
+ATTR_FINGERPRINT = "__pakkr_fingerprint__"
+
+_NOT_FINGERPRINTED = ('logger', DEADLINE_KEY)
+_PROTOCOL = 4
+
+_memo: Dict[int, Tuple[Any, str]] = {}
+_memo_lock = threading.Lock()
+
+
+def _hasher() -> Any:
+    """xxh3, a fast non-cryptographic hash, when xxhash is installed, otherwise sha256, which
+    OpenSSL accelerates in hardware on most CPUs; fingerprints are only ever compared with
+    fingerprints computed with the same hash."""
+    if xxhash is not None:
+        return xxhash.xxh3_128()
+    return hashlib.sha256()
+
+
+class _HashWriter:
+    """File-like object feeding what is written to it to a hash."""
+
+    def __init__(self) -> None:
+        self.hasher = _hasher()
+        self.write: Callable[[Any], Any] = self.hasher.update
+
+
+class _Pickler(pickle.Pickler):
+    """Pickles an object into a hash, replacing the values which have a faster or more
+    stable fingerprint than their pickle by it."""
+
+    def persistent_id(self, obj: Any) -> Optional[Tuple[str, str]]:
+        kind = type(obj)
+        if kind in _SCALARS:
+            return None
+        if np is not None and kind in (np.ndarray, np.memmap):
+            digest = _array_fingerprint(obj)
+            return None if digest is None else ('ndarray', digest)
+        method = getattr(kind, ATTR_FINGERPRINT, None)
+        if method is not None:
+            return (kind.__module__ + '.' + kind.__qualname__, _fingerprint(method(obj)))
+        if kind in (set, frozenset):  # iteration order depends on the hash seed of the process
+            return (kind.__name__, repr(sorted(_fingerprint(item) for item in obj)))
+        return _pandas_fingerprint(obj) if kind.__module__.split('.')[0] == 'pandas' else None
+
+
+_SCALARS = frozenset((type(None), bool, int, float, complex, str, bytes, tuple, list, dict))
+
+
+def _fingerprint(obj: Any) -> str:
+    writer = _HashWriter()
+    _Pickler(writer, protocol=_PROTOCOL).dump(obj)
+    return writer.hasher.hexdigest()
+
+
+def fingerprint(obj: Any) -> Optional[str]:
+    """
+    Content fingerprint of an object; None if it cannot be fingerprinted, i.e. pickled.
+
+    numpy arrays and pandas objects are hashed from their buffers rather than pickled, and
+    the fingerprints of arrays whose memory cannot change, i.e. held by a bytes object as
+    with `np.frombuffer(data)`, are remembered for as long as the arrays live, so
+    fingerprinting the same large input again is free. Objects of types
+    defining `__pakkr_fingerprint__(self)` are fingerprinted by what it returns, e.g. a
+    version or a digest the type maintains; sets are fingerprinted regardless of their
+    iteration order.
+    """
+    try:
+        return _fingerprint(obj)
+    except Exception:
+        return None
+
+
+def inputs_fingerprint(args: Tuple, kwargs: Dict) -> Optional[str]:
+    """Fingerprint of a step's inputs, ignoring the logger and deadline of the run."""
+    inputs = {k: v for k, v in kwargs.items() if k not in _NOT_FINGERPRINTED}
+    return fingerprint((args, sorted(inputs.items())))
+
+
+def _frozen(array: Any) -> bool:
+    """Whether the memory of an array can never change: it is ultimately held by an immutable
+    bytes object, e.g. for arrays from `np.frombuffer(bytes)`, which numpy refuses to make
+    writeable again, unlike arrays merely flagged read-only."""
+    while isinstance(array, np.ndarray):
+        array = array.base
+    return isinstance(array, bytes)
+
+
+def _array_fingerprint(array: Any) -> Optional[str]:
+    if array.dtype.hasobject:
+        return None
+    frozen = _frozen(array)
+    if frozen:
+        with _memo_lock:
+            found = _memo.get(id(array))
+        if found is not None and found[0]() is array:
+            return found[1]
+
+    hasher = _hasher()
+    hasher.update(repr((array.dtype.descr, array.shape)).encode())
+    # viewed as bytes, as memoryviews do not support e.g. datetime64 and timedelta64 arrays
+    hasher.update(memoryview(np.ascontiguousarray(array).reshape(-1).view(np.uint8)))
+    digest = hasher.hexdigest()
+
+    if frozen:
+        key = id(array)
+        with _memo_lock:
+            _memo[key] = (weakref.ref(array, lambda _: _forget(key)), digest)
+    return digest
+
+
+def _forget(key: int) -> None:
+    with _memo_lock:
+        _memo.pop(key, None)
+
+
+def _pandas_fingerprint(obj: Any) -> Optional[Tuple[str, str]]:
+    """DataFrames, Series and Indexes hashed row by row by pandas, with their labels and
+    dtypes; pandas is not a dependency, so this is only used for pandas objects."""
+    pandas = sys.modules['pandas']
+    if not isinstance(obj, (pandas.DataFrame, pandas.Series, pandas.Index)):
+        return None
+    rows = pandas.util.hash_pandas_object(obj, index=True).to_numpy()
+    labels = list(obj.columns) if isinstance(obj, pandas.DataFrame) else [getattr(obj, 'name', None)]
+    dtypes = [str(dtype) for dtype in (obj.dtypes if isinstance(obj, pandas.DataFrame) else [obj.dtype])]
+    return (type(obj).__name__, _fingerprint((rows, labels, dtypes)))
@@ -0,0 +1,142 @@
+import subprocess
+import sys
+import numpy as np
+import pytest
+from mock import MagicMock, patch
+from pakkr import fingerprint as fingerprinting
+from pakkr.fingerprint import fingerprint, inputs_fingerprint
+
+
+class Model:
+    def __init__(self, version, weights):
+        self.version = version
+        self.weights = weights
+
+    def __pakkr_fingerprint__(self):
+        return self.version
+
+
+def test_fingerprint():
+    assert fingerprint([1, 2]) == fingerprint([1, 2])
+    assert fingerprint([1, 2]) != fingerprint([2, 1])
+    assert fingerprint(1) != fingerprint(1.0) != fingerprint('1')
+    assert fingerprint({'a': 1}) != fingerprint({'a': 2})
+    assert fingerprint(MagicMock()) is None
+    assert fingerprint({1, 2, 3}) == fingerprint({3, 2, 1}) != fingerprint(frozenset({1, 2, 3}))
+    assert fingerprint({MagicMock()}) is None
+
+    # user types fingerprint themselves
+    assert fingerprint(Model('v1', [1])) == fingerprint(Model('v1', [2])) != fingerprint(Model('v2', [1]))
+    assert fingerprint(Model('v1', [1])) != fingerprint('v1')
+
+    assert inputs_fingerprint((1,), {'x': 2, 'logger': object(), 'deadline': object()}) == \
+        inputs_fingerprint((1,), {'x': 2})
+
+
+def test_fingerprint_stable_across_processes():
+    code = "from pakkr.fingerprint import fingerprint; print(fingerprint(({'a', 'b', 'c'}, [1.5, 'x'])))"
+    outputs = {subprocess.run([sys.executable, '-c', code], stdout=subprocess.PIPE, check=True,
+                              env={'PYTHONHASHSEED': str(seed)}).stdout for seed in (1, 2)}
+    assert len(outputs) == 1
+
+
+def test_fingerprint_arrays():
+    array = np.arange(12, dtype=np.float64).reshape(3, 4)
+    assert fingerprint(array) == fingerprint(array.copy())
+    assert fingerprint(array) != fingerprint(array.astype(np.float32))
+    assert fingerprint(array) != fingerprint(array.reshape(4, 3))
+    assert fingerprint(array.T) == fingerprint(np.ascontiguousarray(array.T))
+    assert fingerprint([array, {'x': array}]) == fingerprint([array.copy(), {'x': array.copy()}])
+    assert fingerprint(np.array([None, 1])) == fingerprint(np.array([None, 1]))
+
+    changed = array.copy()
+    digest = fingerprint(changed)
+    changed[0, 0] = 1
+    assert fingerprint(changed) != digest
+
+    dates = np.array(['2020-01-01', '2020-01-02'], dtype='datetime64[D]')
+    assert fingerprint(dates) == fingerprint(dates.copy()) is not None
+    assert fingerprint(dates) != fingerprint(dates.astype('datetime64[s]'))
+    assert fingerprint(dates) != fingerprint(dates.view(np.int64))
+    assert fingerprint(dates[::-1]) != fingerprint(dates)
+    assert fingerprint(np.diff(dates)) == fingerprint(np.array([1], dtype='timedelta64[D]')) is not None
+    assert fingerprint(np.array(1.5)) == fingerprint(np.array(1.5)) != fingerprint(np.array([1.5]))
+
+
+def test_fingerprint_hashes():
+    digest = fingerprint([np.arange(4), 'x'])
+    assert digest == fingerprint([np.arange(4), 'x'])
+    with patch.object(fingerprinting, 'xxhash', None):
+        assert fingerprint([np.arange(4), 'x']) == fingerprint([np.arange(4), 'x']) != digest
+        assert len(fingerprint(1)) == 64  # sha256
+
+
+def test_fingerprint_xxhash():
+    pytest.importorskip('xxhash')
+    assert len(fingerprint(1)) == 32  # xxh3_128
+
+
+def test_fingerprint_memoised():
+    array = np.arange(1000)
+    hashed = []
+    original = fingerprinting._hasher
+
+    def hasher():
+        hashed.append(1)
+        return original()
+
+    with patch.object(fingerprinting, '_hasher', hasher):
+        fingerprint(array)
+        fingerprint(array)
+        assert len(hashed) == 4  # writeable arrays are hashed every time
+
+        # neither are read-only arrays, which can be made writeable again
+        array.flags.writeable = False
+        digest = fingerprint(array)
+        assert id(array) not in fingerprinting._memo
+        array.flags.writeable = True
+        array[0] = 5
+        array.flags.writeable = False
+        assert fingerprint(array) != digest
+
+        # views of writeable memory are not remembered either
+        base = np.arange(10)
+        view = base[:5]
+        view.flags.writeable = False
+        fingerprint(view)
+        base[0] = 5
+        assert fingerprint(view) != fingerprint(np.arange(5))
+
+        hashed.clear()
+        frozen = np.frombuffer(b'\x00' * 64, dtype=np.uint8)
+        view = frozen[10:]
+        digest = fingerprint(view)
+        assert fingerprint(view) == digest
+        assert fingerprint([view, view]) != digest
+        assert len(hashed) == 4
+        assert id(view) in fingerprinting._memo
+
+    key = id(view)
+    del view
+    assert key not in fingerprinting._memo
+
+
+def test_fingerprint_pandas():
+    pandas = pytest.importorskip('pandas')
+    frame = pandas.DataFrame({'a': [1, 2], 'b': ['x', 'y']})
+    assert fingerprint(frame) == fingerprint(frame.copy()) is not None
+    assert fingerprint(frame) != fingerprint(frame.rename(columns={'b': 'c'}))
+    assert fingerprint(frame) != fingerprint(frame.astype({'a': float}))
+    assert fingerprint(frame) != fingerprint(frame.set_axis([1, 0]))
+    changed = frame.copy()
+    changed.loc[0, 'a'] = 3
+    assert fingerprint(changed) != fingerprint(frame)
+
+    series = pandas.Series([1.5, 2.5], name='s')
+    assert fingerprint(series) == fingerprint(series.copy()) != fingerprint(series.rename('t'))
+    index = pandas.Index([1, 2])
+    assert fingerprint(index) == fingerprint(index.copy()) != fingerprint(index[::-1])
+    assert fingerprint({'frame': frame}) == fingerprint({'frame': frame.copy()})
+
+    # other pandas objects are pickled
+    assert fingerprint(pandas.Timestamp('2020-01-01')) == fingerprint(pandas.Timestamp('2020-01-01'))
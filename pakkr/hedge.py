@@ -0,0 +1,170 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Optional
+
+from pakkr._wrapper import _StepWrapper
+from pakkr.deadline import Deadline, DEADLINE_KEY
+from pakkr.pipeline import _identifier
+
+
+class _Hedged(_StepWrapper):
+    """
+    Step wrapper that issues a duplicate execution of the step when the first attempt
+    has not finished after the given percentile of the step's observed latency, and
+    takes whichever attempt completes first.
+    """
+
+    def __init__(self,
+                 step: Callable,
+                 percentile: float,
+                 min_samples: int,
+                 window: int,
+                 max_workers: Optional[int],
+                 executor: Optional[Any]=None) -> None:
+        super().__init__(step)
+        self._percentile = percentile
+        self._min_samples = min_samples
+        self._latencies: deque = deque(maxlen=window)
+        self._max_workers = max_workers
+        self._executor = executor
+        self._owns_executor = executor is None
+        self._lock = threading.Lock()
+        self._stats = {'calls': 0, 'hedges': 0, 'primary_wins': 0, 'hedged_wins': 0}
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Number of calls, of duplicate executions issued and which attempt won."""
+        with self._lock:
+            return dict(self._stats)
+
+    @property
+    def executor(self) -> Any:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self._max_workers)
+            return self._executor
+
+    def close(self) -> None:
+        """Shut down the pool of threads created to execute the attempts, once running
+        attempts finish; a pool given as `executor` is left to its owner. The pool is
+        created again if the step is executed after."""
+        with self._lock:
+            if not self._owns_executor or self._executor is None:
+                return
+            executor, self._executor = self._executor, None
+        executor.shutdown(wait=True)
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait for the first attempt before issuing a duplicate one; None until
+        enough latencies have been observed."""
+        latencies = sorted(self._latencies)
+        if not latencies or len(latencies) < self._min_samples:
+            return None
+        index = min(len(latencies) - 1, int(len(latencies) * self._percentile / 100.0))
+        return latencies[index]
+
+    def __call__(self, *args, **kwargs):
+        step = self._bind()
+        deadline = kwargs.get(DEADLINE_KEY)
+        deadline = deadline if isinstance(deadline, Deadline) else None
+        delay = self.hedge_delay()
+
+        attempts: Dict[Future, Optional[Deadline]] = {}
+        primary = self._submit(attempts, step, args, kwargs, deadline)
+        done, _ = wait([primary], timeout=_bounded(delay, deadline))
+        if not done and not (deadline and deadline.expired):
+            self._submit(attempts, step, args, kwargs, deadline)
+
+        try:
+            winner = self._first_successful(primary, attempts, deadline)
+        finally:
+            for attempt, attempt_deadline in attempts.items():
+                if not attempt.done():
+                    attempt.cancel()
+                    if attempt_deadline is not None:
+                        attempt_deadline.cancel()
+                elif attempt_deadline is not None:
+                    attempt_deadline.detach()
+
+        with self._lock:
+            self._stats['calls'] += 1
+            self._stats['hedges'] += len(attempts) - 1
+            if winner.exception() is None:
+                self._stats['primary_wins' if winner is primary else 'hedged_wins'] += 1
+
+        return winner.result()
+
+    def _submit(self, attempts: Dict, step: Callable, args, kwargs, deadline: Optional[Deadline]) -> Future:
+        attempt_deadline = None
+        if deadline is not None:
+            attempt_deadline = Deadline(deadline.remaining(), parent=deadline)
+            kwargs = dict(kwargs, **{DEADLINE_KEY: attempt_deadline})
+
+        attempt = self.executor.submit(self._timed, step, args, kwargs)
+        attempts[attempt] = attempt_deadline
+        return attempt
+
+    def _timed(self, step: Callable, args, kwargs):
+        start_time = time.monotonic()
+        result = step(*args, **kwargs)
+        self._latencies.append(time.monotonic() - start_time)
+        return result
+
+    def _first_successful(self, primary: Future, attempts: Dict, deadline: Optional[Deadline]) -> Future:
+        """The first attempt to complete without an error, otherwise the primary attempt."""
+        pending = set(attempts)
+        while pending:
+            done, pending = wait(pending, timeout=_bounded(None, deadline), return_when=FIRST_COMPLETED)
+            if not done:
+                deadline.check(_identifier(self))  # type: ignore
+            for attempt in attempts:
+                if attempt in done and attempt.exception() is None:
+                    return attempt
+        return primary
+
+
+def _bounded(seconds: Optional[float], deadline: Optional[Deadline]) -> Optional[float]:
+    if deadline is None:
+        return seconds
+    if seconds is None:
+        return deadline.remaining()
+    return min(seconds, deadline.remaining())
+
+
+def hedged(percentile: float=95.0, min_samples: int=20, window: int=100, max_workers: Optional[int]=None,
+           executor: Optional[Any]=None):
+    """
+    Decorator to execute a step with hedging: when an attempt has not finished after the
+    `percentile` of the latencies observed over the last `window` executions, a duplicate
+    attempt is issued and whichever completes first is used. The loser's result (and
+    hence its meta) is ignored; it is cancelled if it has not started yet and its
+    `deadline`, when the step accepts one, is cancelled.
+
+    Parameters
+    ----------
+    percentile : float
+        percentile of the observed latencies after which a duplicate attempt is issued
+    min_samples : int
+        number of latencies to observe before hedging starts
+    window : int
+        number of most recent latencies to keep
+    max_workers : int
+        maximum number of threads executing attempts
+    executor : concurrent.futures.Executor
+        executor running the attempts, e.g. shared by several hedged steps; a pool of
+        `max_workers` threads is created otherwise, which `close()` shuts down
+
+    Returns
+    -------
+    Callable
+        decorator returning the hedged step; its `stats` reports the win counts of the
+        calls which succeeded
+    """
+    if not 0 < percentile <= 100:
+        raise RuntimeError("Percentile should be in (0, 100], got {}.".format(percentile))
+
+    def decorated(step):
+        return _Hedged(step, percentile, min_samples, window, max_workers, executor)
+    return decorated
@@ -0,0 +1,147 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from pakkr import Pipeline, returns
+from pakkr.deadline import Deadline
+from pakkr.exception import PakkrError, PakkrTimeoutError
+from pakkr.hedge import hedged
+
+
+def _step_blocking_first_attempt_of(blocked_call):
+    """A step which blocks on the first attempt of the `blocked_call`-th call."""
+    lock = threading.Lock()
+    attempts = []
+    release = threading.Event()
+
+    @returns(str, attempt=int)
+    def step(x):
+        with lock:
+            attempts.append(x)
+            attempt = len(attempts)
+        if attempt == blocked_call:
+            release.wait(5)
+        return x.upper(), {'attempt': attempt}
+    return step, release
+
+
+def test_hedged_without_enough_samples():
+    step, _ = _step_blocking_first_attempt_of(0)
+    hedged_step = hedged(min_samples=10)(step)
+
+    pipeline = Pipeline(hedged_step, lambda s, attempt: (s, attempt))
+    assert pipeline("hello") == ("HELLO", 1)
+    assert hedged_step.hedge_delay() is None
+    assert hedged_step.stats == {'calls': 1, 'hedges': 0, 'primary_wins': 1, 'hedged_wins': 0}
+
+
+def test_hedged_win():
+    step, release = _step_blocking_first_attempt_of(3)
+    hedged_step = hedged(percentile=50, min_samples=2)(step)
+    pipeline = Pipeline(hedged_step, lambda s, attempt: (s, attempt))
+
+    assert pipeline("a") == ("A", 1)
+    assert pipeline("b") == ("B", 2)
+    assert hedged_step.hedge_delay() is not None
+
+    assert pipeline("c") == ("C", 4)
+    release.set()
+    assert hedged_step.stats == {'calls': 3, 'hedges': 1, 'primary_wins': 2, 'hedged_wins': 1}
+
+
+def test_hedged_keeps_step_attributes():
+    @returns(int, x=str)
+    def step(a, b=1):
+        return a + b, {'x': 'hello'}  # pragma: no cover
+
+    hedged_step = hedged()(step)
+    assert hedged_step.__pakkr_returns__ is step.__pakkr_returns__
+    assert hedged_step.__name__ == "step"
+
+    with pytest.raises(AttributeError):
+        hedged_step.not_an_attribute
+
+
+def test_hedged_pipeline():
+    inner = Pipeline(returns(str, x=int)(lambda s: (s * 2, {'x': len(s)})), _name="inner")
+    pipeline = Pipeline(hedged()(inner), lambda s, x: (s, x))
+    assert pipeline("ab") == ("abab", 2)
+
+
+def test_hedged_primary_error():
+    calls = []
+
+    def fail_once(x):
+        calls.append(x)
+        if len(calls) == 1:
+            time.sleep(0.05)
+            raise Exception("first attempt failed")
+        return x
+
+    hedged_step = hedged(min_samples=0)(fail_once)
+    hedged_step._latencies.append(0.001)
+    assert Pipeline(hedged_step)(1) == 1
+    assert hedged_step.stats['hedged_wins'] == 1
+
+    def always_fail():
+        raise Exception("every attempt failed")
+
+    failing = hedged(min_samples=0)(always_fail)
+    failing._latencies.append(0.001)
+    with pytest.raises(PakkrError) as e:
+        Pipeline(failing)()
+    assert str(e.value).startswith("every attempt failed")
+    assert failing.stats['calls'] == 1
+    assert failing.stats['primary_wins'] == failing.stats['hedged_wins'] == 0
+
+
+def test_hedged_executor():
+    hedged_step = hedged()(lambda x: x)
+    assert Pipeline(hedged_step)(1) == 1
+    executor = hedged_step.executor
+    hedged_step.close()
+    hedged_step.close()
+    with pytest.raises(RuntimeError):
+        executor.submit(print)
+    assert Pipeline(hedged_step)(2) == 2
+    assert hedged_step.executor is not executor
+
+    shared = ThreadPoolExecutor(1)
+    hedged_step = hedged(executor=shared)(lambda x: x)
+    assert Pipeline(hedged_step)(3) == 3
+    hedged_step.close()
+    assert hedged_step.executor is shared
+    assert shared.submit(lambda: 4).result() == 4
+    shared.shutdown()
+
+
+def test_hedged_deadline():
+    cancelled = threading.Event()
+
+    def slow(deadline):
+        deadline.add_cancel_callback(cancelled.set)
+        cancelled.wait(1)
+
+    with pytest.raises(PakkrTimeoutError):
+        Pipeline(hedged()(slow))(deadline=Deadline(0.1))
+    assert cancelled.wait(1)
+
+    def fast(deadline):
+        return deadline.remaining()
+
+    deadline = Deadline(1)
+    assert 0 < Pipeline(hedged()(fast))(deadline=deadline) <= 1
+    assert deadline._callbacks == []
+
+
+def test_hedged_invalid_percentile():
+    with pytest.raises(RuntimeError) as e:
+        hedged(percentile=0)
+    assert str(e.value) == "Percentile should be in (0, 100], got 0."
+
+
+def test_hedged_deadline_bounds_hedge_delay():
+    hedged_step = hedged(min_samples=1)(lambda deadline: 1)
+    hedged_step._latencies.append(10.0)
+    assert Pipeline(hedged_step)(deadline=Deadline(1)) == 1
+    assert hedged_step.stats['hedges'] == 0
@@ -0,0 +1,229 @@
+import json
+import os
+import re
+import statistics
+import threading
+import time
+from inspect import Parameter as iParameter, signature
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from pakkr.deadline import DEADLINE_KEY
+from pakkr.pipeline import ATTR_RETURNS, Pipeline, _identifier
+from pakkr.returns._meta import _Meta
+from pakkr.returns._no_return import _NoReturn
+from pakkr.returns._return import _Return
+
+_RECORDED_STEP = Tuple[str, Optional[float]]
+_NOT_DEPENDENCIES = ('logger', DEADLINE_KEY)
+
+
+class RunHistory:
+    """
+    Durations of the steps of the runs of named Pipelines, kept as a JSON lines file per
+    Pipeline in a local directory so they accumulate across processes. Only the last
+    `max_runs` runs of a Pipeline are used; older ones are dropped from the file as it
+    grows.
+    """
+
+    def __init__(self, directory: str, max_runs: int=100) -> None:
+        if max_runs < 1:
+            raise RuntimeError("Number of runs kept should be at least 1, got {}.".format(max_runs))
+        self.directory = directory
+        self.max_runs = max_runs
+        self._lines: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, pipeline: str) -> str:
+        return os.path.join(self.directory, re.sub(r'[^A-Za-z0-9_.-]+', '_', pipeline) + '.jsonl')
+
+    def record(self, pipeline: str, steps: Sequence[_RECORDED_STEP], total: float) -> None:
+        """Append a run, the identifier and duration in seconds of every step in order, or
+        None for steps which were not executed, and the duration of the whole run."""
+        line = json.dumps({'pipeline': pipeline, 'finished': time.time(), 'total': total, 'steps': list(steps)})
+        path = self._path(pipeline)
+        with self._lock:
+            if pipeline not in self._lines:
+                self._lines[pipeline] = len(self._read(path))
+            with open(path, 'a') as f:
+                f.write(line + '\n')
+            self._lines[pipeline] += 1
+
+            if self._lines[pipeline] >= 2 * self.max_runs:
+                runs = self._read(path)[-self.max_runs:]
+                with open(path + '.tmp', 'w') as f:
+                    f.writelines(json.dumps(run) + '\n' for run in runs)
+                os.replace(path + '.tmp', path)
+                self._lines[pipeline] = len(runs)
+
+    def runs(self, pipeline: str) -> List[Dict]:
+        """The last `max_runs` runs of a Pipeline, oldest first."""
+        with self._lock:
+            return self._read(self._path(pipeline))[-self.max_runs:]
+
+    @staticmethod
+    def _read(path: str) -> List[Dict]:
+        try:
+            with open(path) as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return []
+
+        runs = []
+        for line in lines:
+            try:
+                runs.append(json.loads(line))
+            except ValueError:  # a line partially written by a process that was killed
+                continue
+        return runs
+
+
+class StepEstimate(NamedTuple):
+    """Expected duration of a step of a Pipeline, the positions of the steps whose outputs
+    it consumes and whether it is on the critical path."""
+    position: int
+    identifier: str
+    duration: float
+    depends_on: Tuple[int, ...]
+    critical: bool
+
+
+class Explanation(NamedTuple):
+    """
+    Where the time of a Pipeline's runs goes, from its recorded history.
+
+    `expected` is the median duration of the recorded runs. Steps are executed in
+    sequence, but each only waits for the steps producing the values and meta it consumes;
+    `critical_time` is the duration of the longest chain of such dependencies, i.e. the
+    runtime if independent steps were overlapped, and `critical_path` the steps forming it.
+    """
+    pipeline: str
+    runs: int
+    expected: float
+    steps: Tuple[StepEstimate, ...]
+    critical_path: Tuple[int, ...]
+    critical_time: float
+
+    def speedup(self, position: int, factor: float=2.0) -> Tuple[float, float]:
+        """
+        Seconds saved by making a step `factor` times faster, `float('inf')` meaning
+        removing its cost altogether.
+
+        Returns
+        -------
+        Tuple[float, float]
+            return[0]: saving on the expected runtime, executing steps in sequence
+            return[1]: saving on the critical path, which is less when the step is not on it
+                       or when another chain of steps becomes the longest
+        """
+        durations = [step.duration for step in self.steps]
+        saved = durations[position] - durations[position] / factor
+        durations[position] -= saved
+        return saved, self.critical_time - _critical_path(durations, [s.depends_on for s in self.steps])[1]
+
+    def __str__(self) -> str:
+        lines = ['Pipeline "{}": {} recorded runs, expected runtime {:.6f}s, critical path {:.6f}s'
+                 .format(self.pipeline, self.runs, self.expected, self.critical_time),
+                 '{:>4}  {:<40} {:>12} {:>7} {:>9} {:>24}'
+                 .format('#', 'step', 'median (s)', 'share', 'critical', 'saved if 2x faster (s)')]
+        total = sum(step.duration for step in self.steps) or 1.0
+        for step in self.steps:
+            sequential, critical = self.speedup(step.position)
+            lines.append('{:>4}  {:<40} {:>12.6f} {:>6.1%} {:>9} {:>11.6f} /{:>11.6f}'
+                         .format(step.position, step.identifier[:40], step.duration, step.duration / total,
+                                 '*' if step.critical else '', sequential, critical))
+        return '\n'.join(lines)
+
+
+def explain(pipeline: Any, history: Optional[RunHistory]=None) -> Explanation:
+    """
+    Explain where the time of a Pipeline's runs goes, from the runs recorded in `history`,
+    the Pipeline's own `_history` by default. Runs recorded while the Pipeline had other
+    steps are ignored.
+
+    Raises
+    ------
+    RuntimeError
+        when the Pipeline is not executed in sequence, e.g. a Switch, or has no recorded run
+    """
+    if type(pipeline)._run_steps is not Pipeline._run_steps:
+        raise RuntimeError("Only Pipelines executing their steps in sequence can be explained.")
+    history = history if history is not None else pipeline._history
+    if history is None:
+        raise RuntimeError("No history to explain {} from.".format(_identifier(pipeline)))
+
+    identifiers = [_identifier(step) for step in pipeline._steps]
+    runs = [run for run in history.runs(pipeline._name)
+            if [identifier for identifier, _ in run['steps']] == identifiers]
+    if not runs:
+        raise RuntimeError("No run of {} with its current steps was recorded.".format(_identifier(pipeline)))
+
+    durations = []
+    for position in range(len(identifiers)):
+        recorded = [run['steps'][position][1] for run in runs if run['steps'][position][1] is not None]
+        durations.append(statistics.median(recorded) if recorded else 0.0)
+
+    returns = [getattr(step, ATTR_RETURNS, Any) for step in pipeline._steps]
+    dependencies = [_dependencies(step, returns[:position]) for position, step in enumerate(pipeline._steps)]
+    path, critical_time = _critical_path(durations, dependencies)
+
+    steps = tuple(StepEstimate(position, identifier, duration, dependencies[position], position in path)
+                  for position, (identifier, duration) in enumerate(zip(identifiers, durations)))
+    return Explanation(pipeline._name, len(runs), statistics.median(run['total'] for run in runs),
+                       steps, path, critical_time)
+
+
+def _outputs(returns: Any) -> Tuple[int, Tuple[str, ...]]:
+    """Number of values and keys of meta a step declaring `returns` produces."""
+    if isinstance(returns, _Return):
+        return len(returns.values), tuple(returns.meta or ())
+    if isinstance(returns, _Meta):
+        return 0, tuple(returns)
+    if isinstance(returns, _NoReturn):
+        return 0, ()
+    return 1, ()
+
+
+def _dependencies(step: Callable, previous: List[Any]) -> Tuple[int, ...]:
+    """Positions of the preceding steps whose values or meta a step consumes: the step
+    before it if it produces values, which are given positionally, and the last producer
+    of each meta key the step is injected, or of any key for a step taking **meta."""
+    dependencies = set()
+    positional = _outputs(previous[-1])[0] if previous else 0
+    if positional:
+        dependencies.add(len(previous) - 1)
+
+    producers: Dict[str, int] = {}
+    for position, returns in enumerate(previous):
+        producers.update((key, position) for key in _outputs(returns)[1])
+
+    try:
+        params = tuple(signature(step).parameters.values())
+    except (TypeError, ValueError):  # e.g. some builtins
+        params = ()
+    for param in params[positional:]:
+        if param.kind == iParameter.VAR_KEYWORD and param.name == 'meta':
+            dependencies.update(producers.values())
+        elif param.name in producers and param.name not in _NOT_DEPENDENCIES:
+            dependencies.add(producers[param.name])
+    return tuple(sorted(dependencies))
+
+
+def _critical_path(durations: Sequence[float],
+                   dependencies: Sequence[Tuple[int, ...]]) -> Tuple[Tuple[int, ...], float]:
+    finish: List[float] = []
+    previous: List[Optional[int]] = []
+    for duration, depends_on in zip(durations, dependencies):
+        latest = max(depends_on, key=finish.__getitem__, default=None)
+        finish.append(duration + (finish[latest] if latest is not None else 0.0))
+        previous.append(latest)
+
+    if not finish:
+        return (), 0.0
+    position: Optional[int] = max(range(len(finish)), key=finish.__getitem__)
+    end = finish[position]  # type: ignore
+    path = []
+    while position is not None:
+        path.append(position)
+        position = previous[position]
+    return tuple(reversed(path)), end
@@ -0,0 +1,177 @@
+import json
+import time
+import pytest
+from pakkr import Pipeline, returns, Switch
+from pakkr.history import explain, RunHistory
+
+
+@returns(path=str, rows=int)
+def setup(path):
+    return {'path': path, 'rows': 3}
+
+
+@returns(list)
+def fetch(path):
+    return [1, 2, 3]
+
+
+@returns(stats=dict)
+def describe(data, rows):
+    return {'stats': {'rows': rows, 'sum': sum(data)}}
+
+
+@returns(float)
+def train(rows):
+    return float(rows)
+
+
+def _history(tmpdir, durations, totals=None):
+    """A history of runs of `setup, fetch, describe, train` with the given step durations."""
+    history = RunHistory(str(tmpdir))
+    identifiers = ['"setup"<function>', '"fetch"<function>', '"describe"<function>', '"train"<function>']
+    for run, steps in enumerate(durations):
+        total = totals[run] if totals else sum(steps)
+        history.record('model', list(zip(identifiers, steps)), total)
+    return history
+
+
+def test_record_runs(tmpdir):
+    history = RunHistory(str(tmpdir.join('history')), max_runs=2)
+    pipeline = Pipeline(setup, fetch, describe, train, _name='model', _history=history)
+    assert pipeline('path') == 3.0
+    assert pipeline('path') == 3.0
+
+    runs = history.runs('model')
+    assert len(runs) == 2
+    assert [identifier for identifier, _ in runs[0]['steps']] == \
+        ['"setup"<function>', '"fetch"<function>', '"describe"<function>', '"train"<function>']
+    assert all(seconds >= 0 for run in runs for _, seconds in run['steps'])
+    assert runs[0]['total'] >= sum(seconds for _, seconds in runs[0]['steps'])
+
+    # only the last runs are kept
+    for _ in range(3):
+        pipeline('path')
+    assert len(history.runs('model')) == 2
+    assert len(tmpdir.join('history', 'model.jsonl').readlines()) == 3
+    assert len(RunHistory(str(tmpdir.join('history')), max_runs=10).runs('model')) == 3
+
+    with pytest.raises(RuntimeError) as e:
+        Pipeline(setup, _history=history)
+    assert str(e.value) == "A Pipeline recording its history should be given a _name."
+
+    with pytest.raises(RuntimeError) as e:
+        RunHistory(str(tmpdir), max_runs=0)
+    assert str(e.value) == "Number of runs kept should be at least 1, got 0."
+
+
+def test_record_failed_and_nested_runs(tmpdir):
+    history = RunHistory(str(tmpdir))
+
+    def fail(path):
+        raise ValueError("fail")
+
+    with pytest.raises(Exception):
+        Pipeline(setup, fail, _name='failing', _history=history)('path')
+    assert history.runs('failing') == []
+
+    for flatten in (False, True):
+        pipeline = Pipeline(setup, Pipeline(fetch, describe, _name='inner'), train,
+                            _name='outer', _history=history, _flatten=flatten)
+        assert pipeline('path') == 3.0
+        steps = history.runs('outer')[-1]['steps']
+        assert [identifier for identifier, _ in steps] == ['"setup"<function>', '"inner"<Pipeline>', '"train"<function>']
+        assert all(seconds is not None for _, seconds in steps)
+
+    switch = Switch(lambda branch: branch, {'a': fetch, 'b': returns(list)(lambda path: [])}, _name='switch', _history=history)
+    switch(branch='a', path='path')
+    assert [seconds is None for _, seconds in history.runs('switch')[-1]['steps']] == [False, True]
+
+    tmpdir.join('outer.jsonl').write('{"truncated', mode='a')
+    assert len(history.runs('outer')) == 2
+
+
+def test_record_repeated_steps(tmpdir):
+    history = RunHistory(str(tmpdir))
+
+    def slow(x):
+        time.sleep(0.01)
+        return x
+
+    inner = Pipeline(slow, _name='inner')
+    for flatten in (False, True):
+        name = 'repeated_{}'.format(flatten)
+        Pipeline(slow, slow, inner, slow, _name=name, _history=history, _flatten=flatten)(1)
+        steps = history.runs(name)[-1]['steps']
+        assert [identifier for identifier, _ in steps] == ['"slow"<function>'] * 2 + ['"inner"<Pipeline>',
+                                                                                     '"slow"<function>']
+        assert all(seconds >= 0.01 for _, seconds in steps)
+
+
+def test_explain(tmpdir):
+    history = _history(tmpdir, [[0.1, 0.2, 0.5, 0.3], [0.1, 0.4, 0.5, 0.3], [0.1, 0.3, 0.5, 0.3]],
+                       totals=[1.0, 1.4, 1.2])
+    explanation = explain(Pipeline(setup, fetch, describe, train, _name='model'), history)
+
+    assert explanation.pipeline == 'model'
+    assert explanation.runs == 3
+    assert explanation.expected == 1.2
+    # fetch takes setup's path, describe fetch's values and setup's rows, train setup's rows
+    assert [step.depends_on for step in explanation.steps] == [(), (0,), (0, 1), (0,)]
+    assert [step.duration for step in explanation.steps] == [0.1, 0.3, 0.5, 0.3]
+    assert explanation.critical_path == (0, 1, 2)
+    assert explanation.critical_time == pytest.approx(0.9)
+    assert [step.critical for step in explanation.steps] == [True, True, True, False]
+
+    assert explanation.speedup(3) == pytest.approx((0.15, 0.0))
+    assert explanation.speedup(2) == pytest.approx((0.25, 0.25))
+    # without describe, setup then train becomes as long as setup then fetch
+    assert explanation.speedup(2, float('inf')) == pytest.approx((0.5, 0.5))
+    assert explanation.speedup(1, float('inf')) == pytest.approx((0.3, 0.3))
+
+    report = str(explanation).splitlines()
+    assert report[0] == 'Pipeline "model": 3 recorded runs, expected runtime 1.200000s, critical path 0.900000s'
+    assert len(report) == 6 and '"describe"<function>' in report[4] and '*' in report[4]
+    assert '*' not in report[5]
+
+
+def test_explain_ignores_other_steps(tmpdir):
+    history = _history(tmpdir, [[0.1, 0.2, 0.5, 0.3]])
+    history.record('model', [('"setup"<function>', 0.4)], 0.4)
+    explanation = explain(Pipeline(setup, fetch, describe, train, _name='model', _history=history))
+    assert explanation.runs == 1
+    assert str(explanation).splitlines()[0].startswith('Pipeline "model": 1 recorded runs')
+
+    with pytest.raises(RuntimeError) as e:
+        explain(Pipeline(setup, train, _name='model'), history)
+    assert str(e.value) == 'No run of "model"<Pipeline> with its current steps was recorded.'
+
+    with pytest.raises(RuntimeError) as e:
+        explain(Pipeline(setup, _name='model'))
+    assert str(e.value) == 'No history to explain "model"<Pipeline> from.'
+
+    with pytest.raises(RuntimeError) as e:
+        explain(Switch(lambda: 'a', {'a': setup}, _name='model'), history)
+    assert str(e.value) == "Only Pipelines executing their steps in sequence can be explained."
+
+
+def test_explain_meta_dependencies(tmpdir):
+    def everything(data, **meta):
+        return None  # pragma: no cover
+
+    @returns()
+    def show(data):
+        print(data)  # pragma: no cover
+
+    history = RunHistory(str(tmpdir))
+    pipeline = Pipeline(setup, fetch, everything, show, max, _name='meta', _history=history)
+    history.record('meta', [('"setup"<function>', 0.2), ('"fetch"<function>', 0.1), ('"everything"<function>', None),
+                            ('"show"<function>', 0.1), ('"max"<builtin_function_or_method>', 0.1)],
+                   0.5)
+    explanation = explain(pipeline)
+    # everything takes all meta, max nothing from show which returns nothing
+    assert [step.depends_on for step in explanation.steps] == [(), (0,), (0, 1), (2,), ()]
+    assert explanation.steps[2].duration == 0.0
+    assert json.loads(tmpdir.join('meta.jsonl').read())['pipeline'] == 'meta'
+
+    tmpdir.join('empty.jsonl').write(json.dumps({'pipeline': 'empty', 'total': 0.0, 'steps': []}) + '\n')
+    assert explain(Pipeline(_name='empty'), history).critical_path == ()
@@ -0,0 +1,101 @@
+import copy
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from pakkr._wrapper import _StepWrapper
+from pakkr.fingerprint import inputs_fingerprint
+from pakkr.metrics import count_cache
+
+_RECORD = Tuple[str, Any]
+
+
+class MemoryStore:
+    """Keeps the fingerprint of the inputs and the outputs of every step of the previous
+    run in memory. Outputs are deep copied when stored and when reused, so that steps
+    mutating their inputs in place do not alter the outputs other runs reuse."""
+
+    persistent = False
+
+    def __init__(self) -> None:
+        self._records: Dict[str, _RECORD] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[_RECORD]:
+        with self._lock:
+            record = self._records.get(key)
+        return None if record is None else (record[0], copy.deepcopy(record[1]))
+
+    def put(self, key: str, fingerprint: str, result: Any) -> None:
+        """Remember a record; a result which cannot be copied is simply not remembered."""
+        try:
+            result = copy.deepcopy(result)
+        except Exception:
+            return
+        with self._lock:
+            self._records[key] = (fingerprint, result)
+
+
+class DiskStore:
+    """Keeps the fingerprint of the inputs and the outputs of every step of the previous
+    run as pickle files in a local directory, so they survive the process. Records are
+    keyed by the Pipeline's `_name`, which Pipelines sharing a directory should not share.
+    Every reuse unpickles a fresh copy of the output."""
+
+    persistent = True
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(key.encode()).hexdigest() + '.pkl')
+
+    def get(self, key: str) -> Optional[_RECORD]:
+        try:
+            with open(self._path(key), 'rb') as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, fingerprint: str, result: Any) -> None:
+        """Persist a record; a result which cannot be pickled is simply not remembered."""
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump((fingerprint, result), f, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            os.remove(tmp_path)
+            return
+        os.replace(tmp_path, self._path(key))
+
+
+class _Reusable(_StepWrapper):
+    """
+    Step wrapper that returns the step's output of the previous run, instead of executing
+    it, when the step is given the same inputs as in the previous run.
+    """
+
+    def __init__(self, step: Callable, store: Any, key: str, on_reuse: Callable[[Any], None]) -> None:
+        super().__init__(step)
+        self._store = store
+        self._key = key
+        self._on_reuse = on_reuse
+
+    def __call__(self, *args, **kwargs):
+        inputs_key = inputs_fingerprint(args, kwargs)
+
+        record = self._store.get(self._key) if inputs_key is not None else None
+        if record is not None and record[0] == inputs_key:
+            count_cache(True)
+            self._on_reuse(self.__wrapped__)
+            return record[1]
+
+        result = self._bind()(*args, **kwargs)
+        if inputs_key is not None:
+            count_cache(False)
+            self._store.put(self._key, inputs_key, result)
+        return result
@@ -0,0 +1,141 @@
+import threading
+from functools import wraps
+from mock import MagicMock
+import pytest
+from pakkr import Pipeline, returns
+from pakkr.fingerprint import fingerprint
+from pakkr.incremental import DiskStore, MemoryStore
+
+
+def _counting(fn):
+    calls = []
+
+    @wraps(fn)
+    def step(*args, **kwargs):
+        calls.append(args)
+        return fn(*args, **kwargs)
+    step.calls = calls
+    return step
+
+
+def _pipeline(store):
+    @returns(list, n_rows=int)
+    def load(path):
+        return [1, 2, 3], {'n_rows': 3}
+
+    @returns(list)
+    def scale(rows, factor):
+        return [r * factor for r in rows]
+
+    @returns(int)
+    def total(rows, n_rows):
+        return sum(rows) + n_rows
+
+    steps = [_counting(load), _counting(scale), _counting(total)]
+    return Pipeline(*steps, _name="incremental", _incremental=store), steps
+
+
+def test_incremental():
+    pipeline, (load, scale, total) = _pipeline(True)
+
+    assert pipeline("data.csv", factor=2) == 15
+    assert pipeline.reused_steps == ()
+
+    assert pipeline("data.csv", factor=2) == 15
+    assert len(load.calls) == len(scale.calls) == len(total.calls) == 1
+    assert pipeline.reused_steps == ('"load"<function>', '"scale"<function>', '"total"<function>')
+
+    assert pipeline("data.csv", factor=3) == 21
+    assert len(load.calls) == 1
+    assert len(scale.calls) == len(total.calls) == 2
+    assert pipeline.reused_steps == ('"load"<function>',)
+
+
+def test_incremental_downstream_of_unchanged_output():
+    pipeline, (load, scale, total) = _pipeline(True)
+    pipeline("data.csv", factor=2)
+    pipeline("other.csv", factor=2)
+
+    assert len(load.calls) == 2
+    assert len(scale.calls) == len(total.calls) == 1
+    assert pipeline.reused_steps == ('"scale"<function>', '"total"<function>')
+
+
+def test_incremental_disk_store(tmpdir):
+    pipeline, (load, _, _) = _pipeline(DiskStore(str(tmpdir)))
+    assert pipeline("data.csv", factor=2) == 15
+
+    pipeline, (load, _, _) = _pipeline(DiskStore(str(tmpdir)))
+    assert pipeline("data.csv", factor=2) == 15
+    assert load.calls == []
+    assert len(pipeline.reused_steps) == 3
+
+
+def test_incremental_disk_store_needs_name(tmpdir):
+    with pytest.raises(RuntimeError) as e:
+        Pipeline(lambda: 1, _incremental=DiskStore(str(tmpdir)))
+    assert str(e.value) == "An incremental Pipeline with a persistent store should be given a _name."
+
+
+def test_incremental_reuses_copies():
+    @returns(list)
+    def load():
+        return [1, 2]
+
+    def append(rows):
+        rows.append(3)
+        return rows
+
+    pipeline = Pipeline(load, append, _incremental=True)
+    assert pipeline() == [1, 2, 3]
+    assert pipeline() == [1, 2, 3]
+    assert pipeline.reused_steps == ('"load"<function>', '"append"<function>')
+
+
+def test_incremental_unpicklable_inputs():
+    lock = threading.Lock()
+    step = _counting(lambda lock: 1)
+    pipeline = Pipeline(step, _incremental=True)
+    pipeline(lock=lock)
+    pipeline(lock=lock)
+    assert len(step.calls) == 2
+
+
+def test_incremental_ignores_logger():
+    step = _counting(returns(str)(lambda logger: "logged"))
+    pipeline = Pipeline(step, _incremental=MemoryStore())
+    pipeline()
+    pipeline()
+    assert len(step.calls) == 1
+
+
+def test_disk_store(tmpdir):
+    store = DiskStore(str(tmpdir.join("store")))
+    assert store.get("key") is None
+
+    store.put("key", "abc", [1, 2])
+    assert store.get("key") == ("abc", [1, 2])
+
+    store.put("key", "def", threading.Lock())
+    assert store.get("key") == ("abc", [1, 2])
+    assert len(tmpdir.join("store").listdir()) == 1
+
+
+def test_memory_store():
+    store = MemoryStore()
+    assert store.get("key") is None
+
+    rows = [1, 2]
+    store.put("key", "abc", rows)
+    rows.append(3)
+    store.get("key")[1].append(4)
+    assert store.get("key") == ("abc", [1, 2])
+
+    store.put("key", "def", threading.Lock())
+    assert store.get("key") == ("abc", [1, 2])
+
+
+def test_fingerprint():
+    assert fingerprint([1, 2]) == fingerprint([1, 2])
+    assert fingerprint([1, 2]) != fingerprint([2, 1])
+    assert fingerprint(MagicMock()) is None
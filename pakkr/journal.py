@@ -0,0 +1,165 @@
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import time
+import uuid
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from pakkr.deadline import DEADLINE_KEY
+
+_NOT_RECORDED = ('logger', DEADLINE_KEY)
+
+
+class _State(NamedTuple):
+    """Inputs and meta of the step a run failed at, the keys of the meta produced by the
+    run until then and of the meta which could not be recorded."""
+    position: int
+    args: Tuple
+    meta: Dict[str, Any]
+    produced: Tuple[str, ...]
+    missing: Tuple[str, ...]
+
+
+def _write(path: str, data: bytes) -> None:
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class RunJournal:
+    """
+    Records the state of the runs of Pipelines given this journal as `_journal` in a local
+    directory: before every step, the step's inputs and the meta available to it are
+    persisted, so that a run which failed can be resumed from the failed step with
+    `Pipeline.resume(run_id)`.
+
+    Values are pickled to files named after their content, so a value, e.g. a large array,
+    which stays the same from one step to the next is only written once. Meta values which
+    cannot be pickled are not recorded and should be given again when resuming.
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, run_id: str, *names: str) -> str:
+        return os.path.join(self.directory, run_id, *names)
+
+    def start(self, pipeline: str, steps: List[str], run_id: Optional[str]=None) -> "_JournalRun":
+        """Start recording a new run of a Pipeline with the given step identifiers, or
+        continue recording the resumed run `run_id`."""
+        if run_id is not None:
+            return _JournalRun(self, self.status(run_id))
+
+        run_id = '{}-{}'.format(time.strftime('%Y%m%dT%H%M%S'), uuid.uuid4().hex[:8])
+        os.makedirs(self._path(run_id, 'objects'))
+        return _JournalRun(self, {'run_id': run_id, 'pipeline': pipeline, 'steps': steps, 'status': 'running',
+                                  'position': None, 'error': None, 'missing': []})
+
+    def status(self, run_id: str) -> Dict[str, Any]:
+        """The pipeline, steps, status ('running', 'failed' or 'succeeded'), position of the
+        current or failed step and error of a run."""
+        try:
+            with open(self._path(run_id, 'run.json')) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise RuntimeError("No run {} in journal {}.".format(run_id, self.directory))
+
+    def load(self, run_id: str, pipeline: str, steps: List[str]) -> _State:
+        """
+        The recorded state of a failed run.
+
+        Raises
+        ------
+        RuntimeError
+            when the run is not a failed run of a Pipeline with the given name and steps
+        """
+        record = self.status(run_id)
+        if record['pipeline'] != pipeline or record['steps'] != steps:
+            raise RuntimeError("Run {} was not a run of Pipeline '{}' with its current steps."
+                               .format(run_id, pipeline))
+        if record['status'] != 'failed':
+            raise RuntimeError("Run {} has not failed but is {}.".format(run_id, record['status']))
+        if record['position'] is None:
+            raise RuntimeError("Run {} failed before its state could be recorded.".format(run_id))
+
+        with open(self._path(run_id, 'state.pkl'), 'rb') as f:
+            position, args, meta, produced, missing = pickle.load(f)
+        if args is None:
+            raise RuntimeError("Inputs of step {} of run {} could not be recorded.".format(position, run_id))
+
+        objects: Dict[str, Any] = {}
+        for name in set(meta.values()) | {args}:
+            with open(self._path(run_id, 'objects', name), 'rb') as f:
+                objects[name] = pickle.load(f)
+        meta = {key: objects[name] for key, name in meta.items()}
+        return _State(position, objects[args], meta, tuple(produced), tuple(missing))
+
+    def remove(self, run_id: str) -> None:
+        shutil.rmtree(self._path(run_id), ignore_errors=True)
+
+
+class _JournalRun:
+    """Recorder of the state of one run."""
+
+    def __init__(self, journal: RunJournal, record: Dict[str, Any]) -> None:
+        self._journal = journal
+        self.record = record
+        self.run_id: str = record['run_id']
+        self.resumed_at: int = record['position'] if record['status'] == 'failed' else 0
+
+    def _save_record(self) -> None:
+        _write(self._journal._path(self.run_id, 'run.json'), json.dumps(self.record).encode())
+
+    def _save_object(self, obj: Any, written: Dict[str, bool]) -> str:
+        """Pickle an object to a file named after its content, unless it already exists."""
+        data = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+        name = hashlib.sha256(data).hexdigest() + '.pkl'
+        path = self._journal._path(self.run_id, 'objects', name)
+        if name not in written and not os.path.exists(path):
+            _write(path, data)
+        written[name] = True
+        return name
+
+    def checkpoint(self, position: int, args: Tuple, meta: Dict, produced: Dict) -> None:
+        """Persist the inputs and meta given to the step at `position` of the run."""
+        written: Dict[str, bool] = {}
+        missing = []
+        names: Dict[str, str] = {}
+        for key, value in meta.items():
+            if key in _NOT_RECORDED:
+                continue
+            try:
+                names[key] = self._save_object(value, written)
+            except Exception:
+                missing.append(key)
+        try:
+            args_name: Optional[str] = self._save_object(tuple(args), written)
+        except Exception:
+            args_name = None
+
+        state = (position, args_name, names, list(produced), missing)
+        _write(self._journal._path(self.run_id, 'state.pkl'), pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL))
+        self.record.update(position=position, status='running', missing=missing)
+        self._save_record()
+
+        directory = self._journal._path(self.run_id, 'objects')
+        for name in os.listdir(directory):
+            if name not in written:
+                os.remove(os.path.join(directory, name))
+
+    def failed(self, error: BaseException) -> None:
+        self.record.update(status='failed', error=str(error))
+        self._save_record()
+
+    def succeeded(self) -> None:
+        """Mark the run as succeeded, dropping its recorded state."""
+        self.record.update(status='succeeded', error=None)
+        self._save_record()
+        shutil.rmtree(self._journal._path(self.run_id, 'objects'))
+        if os.path.exists(self._journal._path(self.run_id, 'state.pkl')):
+            os.remove(self._journal._path(self.run_id, 'state.pkl'))
@@ -0,0 +1,152 @@
+import os
+import threading
+import pytest
+from pakkr import Pipeline, returns, Switch
+from pakkr.exception import PakkrError
+from pakkr.journal import RunJournal
+
+
+class _Steps:
+    """Steps of a nightly pipeline, the third of which fails until `fixed`."""
+
+    def __init__(self):
+        self.calls = []
+        self.fixed = False
+
+        @returns(list, rows=int)
+        def load(path):
+            self.calls.append('load')
+            return [1, 2, 3], {'rows': 3}
+
+        @returns(list)
+        def double(data):
+            self.calls.append('double')
+            return [x * 2 for x in data]
+
+        @returns(float, mean=float)
+        def mean(data, rows, lock=None):
+            self.calls.append('mean')
+            if not self.fixed:
+                raise ValueError("not yet")
+            return sum(data) / rows, {'mean': sum(data) / rows}
+
+        self.pipeline = (load, double, mean)
+
+
+def test_resume(tmpdir):
+    steps = _Steps()
+    journal = RunJournal(str(tmpdir))
+    pipeline = Pipeline(*steps.pipeline, _name='nightly', _journal=journal)
+
+    with pytest.raises(PakkrError) as e:
+        pipeline('data.csv')
+    run_id = pipeline.last_run_id
+    assert 'when executing run {} of "nightly"<Pipeline>, which can be resumed'.format(run_id) in str(e.value)
+    assert steps.calls == ['load', 'double', 'mean']
+    status = journal.status(run_id)
+    assert (status['status'], status['position'], status['missing']) == ('failed', 2, [])
+    assert status['error'].startswith('not yet')
+
+    steps.fixed = True
+    assert pipeline.resume(run_id) == 4.0
+    assert steps.calls == ['load', 'double', 'mean', 'mean']
+    assert journal.status(run_id)['status'] == 'succeeded'
+    assert sorted(os.listdir(str(tmpdir.join(run_id)))) == ['run.json']
+
+    with pytest.raises(RuntimeError) as e:
+        pipeline.resume(run_id)
+    assert str(e.value) == "Run {} has not failed but is succeeded.".format(run_id)
+
+    # runs as a nested Pipeline are recorded too
+    assert Pipeline(pipeline)('data.csv') == 4.0
+    assert journal.status(pipeline.last_run_id)['status'] == 'succeeded'
+    journal.remove(pipeline.last_run_id)
+    with pytest.raises(RuntimeError) as e:
+        journal.status(pipeline.last_run_id)
+    assert str(e.value) == "No run {} in journal {}.".format(pipeline.last_run_id, str(tmpdir))
+
+
+def test_resume_fails_again(tmpdir):
+    steps = _Steps()
+    journal = RunJournal(str(tmpdir))
+    pipeline = Pipeline(*steps.pipeline, _name='nightly', _journal=journal)
+
+    with pytest.raises(PakkrError):
+        pipeline('data.csv', lock=threading.Lock())
+    run_id = pipeline.last_run_id
+    assert journal.status(run_id)['missing'] == ['lock']
+
+    with pytest.raises(RuntimeError) as e:
+        pipeline.resume(run_id)
+    assert str(e.value) == "Meta keys ['lock'] of run {} could not be recorded and should be given.".format(run_id)
+
+    with pytest.raises(PakkrError):
+        pipeline.resume(run_id, lock=threading.Lock())
+    assert pipeline.last_run_id == run_id
+    assert steps.calls == ['load', 'double', 'mean', 'mean']
+
+    steps.fixed = True
+    assert pipeline.resume(run_id, lock=None) == 4.0
+    assert steps.calls == ['load', 'double', 'mean', 'mean', 'mean']
+
+    with pytest.raises(RuntimeError) as e:
+        Pipeline(*steps.pipeline[:2], _name='nightly', _journal=journal).resume(run_id)
+    assert str(e.value) == "Run {} was not a run of Pipeline 'nightly' with its current steps.".format(run_id)
+
+
+def test_resume_other_errors(tmpdir):
+    # runs failing with errors other than PakkrErrors are marked failed as well
+    journal = RunJournal(str(tmpdir))
+    fixed = []
+    pipeline = Pipeline(lambda: 1, returns(int)(lambda x: x if fixed else 'bad'), _name='typed', _journal=journal)
+
+    with pytest.raises(RuntimeError):
+        pipeline()
+    run_id = pipeline.last_run_id
+    status = journal.status(run_id)
+    assert (status['status'], status['position']) == ('failed', 1)
+
+    fixed.append(True)
+    assert pipeline.resume(run_id) == 1
+    assert journal.status(run_id)['status'] == 'succeeded'
+
+
+def test_journal_unrecorded_inputs(tmpdir):
+    journal = RunJournal(str(tmpdir))
+
+    def fail(lock):
+        raise ValueError("fail")
+
+    pipeline = Pipeline(fail, _name='locks', _journal=journal)
+    with pytest.raises(PakkrError):
+        pipeline(threading.Lock())
+    with pytest.raises(RuntimeError) as e:
+        pipeline.resume(pipeline.last_run_id)
+    assert str(e.value) == "Inputs of step 0 of run {} could not be recorded.".format(pipeline.last_run_id)
+
+    empty = Pipeline(_name='empty', _journal=journal)
+    assert empty() is None
+    assert journal.status(empty.last_run_id)['status'] == 'succeeded'
+
+    record = journal.start('empty', [])
+    record.failed(ValueError('killed'))
+    with pytest.raises(RuntimeError) as e:
+        empty.resume(record.run_id)
+    assert str(e.value) == "Run {} failed before its state could be recorded.".format(record.run_id)
+
+
+def test_journal_options(tmpdir):
+    journal = RunJournal(str(tmpdir))
+
+    with pytest.raises(RuntimeError) as e:
+        Pipeline(lambda: None).resume('run')
+    assert str(e.value).endswith("has no _journal to resume runs from.")
+    assert Pipeline(lambda: None).last_run_id is None
+
+    with pytest.raises(RuntimeError) as e:
+        Pipeline(lambda: None, _journal=journal, _flatten=True)
+    assert str(e.value) == "A journaled Pipeline cannot be flattened."
+
+    with pytest.raises(RuntimeError) as e:
+        Switch(lambda: 'a', {'a': lambda: None}, _journal=journal)
+    assert str(e.value) == "Only Pipelines executing their steps in sequence can be journaled."
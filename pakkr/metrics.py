@@ -0,0 +1,212 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = tuple(0.0001 * 2 ** i for i in range(21))  # 100us to ~105s
+
+_current = threading.local()
+
+
+class _StepMetrics:
+    """Latency histogram and counters of one step of one Pipeline, or histogram of the
+    queue waits of the runs of one Pipeline with one tenant and priority."""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'errors', 'cache_hits', 'cache_misses', 'lock')
+
+    def __init__(self, buckets: Sequence[float]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.errors = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.lock = threading.Lock()
+
+    def observe(self, seconds: float, error: bool) -> None:
+        index = bisect_left(self.buckets, seconds)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += seconds
+            self.errors += error
+
+    def count_cache(self, hit: bool) -> None:
+        with self.lock:
+            if hit:
+                self.cache_hits += 1
+            else:
+                self.cache_misses += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate of the quantile `q` of the observed latencies, interpolating linearly
+        within the bucket it falls in as Prometheus' histogram_quantile does."""
+        with self.lock:
+            counts = list(self.counts)
+        total = sum(counts)
+        if not total:
+            return None
+
+        rank = q * total
+        cumulative = 0
+        for index, count in enumerate(counts):
+            if cumulative + count >= rank and count:
+                if index == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[index - 1] if index else 0.0
+                return lower + (self.buckets[index] - lower) * (rank - cumulative) / count
+            cumulative += count
+        return None  # pragma: no cover
+
+
+class MetricsRegistry:
+    """
+    Per step latency histograms, error counters and cache counters of the Pipelines given
+    this registry as `_metrics`, and of the Pipelines they execute. Every step completion
+    costs a couple of clock reads, a bisection in the bucket bounds and an uncontended lock,
+    so a registry can be left on in production.
+
+    Steps are labelled with the `_name` of the Pipeline executing them and their pakkr
+    identifier, so Pipelines should be named for the number of series to stay bounded.
+    The runs of Pipelines given this registry also report how long their steps waited for
+    a ResourceScheduler, labelled with the run's tenant and priority.
+
+    Parameters
+    ----------
+    buckets : Sequence[float]
+        upper bounds, in seconds, of the histogram buckets; from 100us to 105s by default
+    """
+
+    def __init__(self, buckets: Sequence[float]=DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self._steps: Dict[Tuple[str, str], _StepMetrics] = {}
+        self._queue_waits: Dict[Tuple[str, str, int], _StepMetrics] = {}
+        self._lock = threading.Lock()
+
+    def _metrics(self, pipeline: str, step: str) -> _StepMetrics:
+        metrics = self._steps.get((pipeline, step))
+        if metrics is None:
+            with self._lock:
+                metrics = self._steps.setdefault((pipeline, step), _StepMetrics(self.buckets))
+        return metrics
+
+    @contextmanager
+    def time(self, pipeline: str, step: str) -> Iterator[None]:
+        """Observe the latency, and any error, of a step executed within the context."""
+        metrics = self._metrics(pipeline, step)
+        previous = getattr(_current, 'step', None)
+        _current.step = (self, metrics)
+        error = True
+        start = time.perf_counter()
+        try:
+            yield
+            error = False
+        finally:
+            metrics.observe(time.perf_counter() - start, error)
+            _current.step = previous
+
+    def quantile(self, pipeline: str, step: str, q: float) -> Optional[float]:
+        return self._metrics(pipeline, step).quantile(q)
+
+    def observe_queue_wait(self, pipeline: str, tenant: Optional[str], priority: int, seconds: float) -> None:
+        """Observe the seconds the steps of a run waited to be admitted by a scheduler."""
+        key = (pipeline, tenant if tenant is not None else '', priority)
+        metrics = self._queue_waits.get(key)
+        if metrics is None:
+            with self._lock:
+                metrics = self._queue_waits.setdefault(key, _StepMetrics(self.buckets))
+        metrics.observe(seconds, False)
+
+    def queue_waits(self) -> Dict[str, Dict[Tuple[str, int], Dict]]:
+        """Count, total and p50/p95/p99 queue waits of runs, keyed by Pipeline name then
+        tenant, '' when not given, and priority."""
+        with self._lock:
+            waits = sorted(self._queue_waits.items())
+
+        snapshot: Dict[str, Dict[Tuple[str, int], Dict]] = {}
+        for (pipeline, tenant, priority), metrics in waits:
+            with metrics.lock:
+                values = {'count': sum(metrics.counts), 'sum': metrics.sum}
+            values.update(('p{}'.format(q), metrics.quantile(q / 100.0)) for q in (50, 95, 99))
+            snapshot.setdefault(pipeline, {})[(tenant, priority)] = values
+        return snapshot
+
+    def snapshot(self) -> Dict[str, Dict[str, Dict]]:
+        """Count, total and p50/p95/p99 latencies, errors and cache lookups of every step,
+        keyed by Pipeline name then step identifier."""
+        with self._lock:
+            steps = sorted(self._steps.items())
+
+        snapshot: Dict[str, Dict[str, Dict]] = {}
+        for (pipeline, step), metrics in steps:
+            with metrics.lock:
+                values = {'count': sum(metrics.counts), 'sum': metrics.sum, 'errors': metrics.errors,
+                          'cache_hits': metrics.cache_hits, 'cache_misses': metrics.cache_misses}
+            values.update(('p{}'.format(q), metrics.quantile(q / 100.0)) for q in (50, 95, 99))
+            snapshot.setdefault(pipeline, {})[step] = values
+        return snapshot
+
+    def render(self) -> str:
+        """The metrics in the Prometheus text exposition format."""
+        with self._lock:
+            steps = sorted(self._steps.items())
+            waits = sorted(self._queue_waits.items())
+
+        histogram: List[str] = []
+        errors: List[str] = []
+        cache: List[str] = []
+        for (pipeline, step), metrics in steps:
+            labels = 'pipeline="{}",step="{}"'.format(_escape(pipeline), _escape(step))
+            with metrics.lock:
+                error_count, hits, misses = metrics.errors, metrics.cache_hits, metrics.cache_misses
+            histogram.extend(self._histogram('pakkr_step_duration_seconds', labels, metrics))
+            errors.append('pakkr_step_errors_total{{{}}} {}'.format(labels, error_count))
+            if hits or misses:
+                cache.append('pakkr_step_cache_total{{{},result="hit"}} {}'.format(labels, hits))
+                cache.append('pakkr_step_cache_total{{{},result="miss"}} {}'.format(labels, misses))
+
+        queue_wait: List[str] = []
+        for (pipeline, tenant, priority), metrics in waits:
+            labels = 'pipeline="{}",tenant="{}",priority="{}"'.format(_escape(pipeline), _escape(tenant), priority)
+            queue_wait.extend(self._histogram('pakkr_run_queue_wait_seconds', labels, metrics))
+
+        lines = ['# HELP pakkr_step_duration_seconds Time taken to execute pakkr steps.',
+                 '# TYPE pakkr_step_duration_seconds histogram'] + histogram
+        lines += ['# HELP pakkr_step_errors_total Executions of pakkr steps which raised an exception.',
+                  '# TYPE pakkr_step_errors_total counter'] + errors
+        lines += ['# HELP pakkr_step_cache_total Results of pakkr steps looked up in a cache, by outcome.',
+                  '# TYPE pakkr_step_cache_total counter'] + cache
+        lines += ['# HELP pakkr_run_queue_wait_seconds Time the steps of pakkr runs waited for resources.',
+                  '# TYPE pakkr_run_queue_wait_seconds histogram'] + queue_wait
+        return '\n'.join(lines) + '\n'
+
+    def _histogram(self, name: str, labels: str, metrics: _StepMetrics) -> List[str]:
+        with metrics.lock:
+            counts, total = list(metrics.counts), metrics.sum
+
+        lines, cumulative = [], 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else repr(bound)
+            lines.append('{}_bucket{{{},le="{}"}} {}'.format(name, labels, le, cumulative))
+        lines.append('{}_sum{{{}}} {!r}'.format(name, labels, total))
+        lines.append('{}_count{{{}}} {}'.format(name, labels, cumulative))
+        return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def current_registry() -> Optional[MetricsRegistry]:
+    """The registry observing the step executing on this thread, if any."""
+    current = getattr(_current, 'step', None)
+    return current[0] if current is not None else None
+
+
+def count_cache(hit: bool) -> None:
+    """Count a cache lookup, e.g. by an incremental or single-flight step, against the step
+    executing on this thread if a registry observes it."""
+    current = getattr(_current, 'step', None)
+    if current is not None:
+        current[1].count_cache(hit)
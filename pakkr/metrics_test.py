@@ -0,0 +1,91 @@
+import threading
+import pytest
+from pakkr import Pipeline, returns, single_flight
+from pakkr.exception import PakkrError
+from pakkr.metrics import count_cache, current_registry, MetricsRegistry, _StepMetrics
+
+
+def test_metrics():
+    registry = MetricsRegistry()
+
+    def fail(x):
+        if x < 0:
+            raise ValueError("negative")
+        return x
+
+    inner = Pipeline(lambda x: x * 2, _name="double")
+    pipeline = Pipeline(fail, inner, _name="main", _metrics=registry)
+    for x in range(5):
+        pipeline(x)
+    with pytest.raises(PakkrError):
+        pipeline(-1)
+
+    snapshot = registry.snapshot()
+    assert set(snapshot) == {'main', 'double'}
+    assert set(snapshot['main']) == {'"fail"<function>', '"double"<Pipeline>'}
+    assert snapshot['main']['"fail"<function>']['count'] == 6
+    assert snapshot['main']['"fail"<function>']['errors'] == 1
+    assert snapshot['main']['"double"<Pipeline>']['count'] == 5
+    assert snapshot['double']['"<lambda>"<function>']['count'] == 5
+    assert 0 < snapshot['double']['"<lambda>"<function>']['p50'] <= snapshot['double']['"<lambda>"<function>']['p99']
+    assert current_registry() is None
+
+
+def test_metrics_cache_counters():
+    registry = MetricsRegistry()
+    pipeline = Pipeline(returns(int)(lambda x: x + 1), _name="cached", _incremental=True, _metrics=registry)
+    pipeline(1)
+    pipeline(1)
+    pipeline(2)
+    metrics = registry.snapshot()['cached']['"<lambda>"<_Reusable>']
+    assert (metrics['cache_hits'], metrics['cache_misses']) == (1, 2)
+
+    release = threading.Event()
+
+    @single_flight()
+    def load(tenant):
+        release.wait(1)
+        return tenant
+
+    pipeline = Pipeline(load, _name="flights", _metrics=registry)
+    thread = threading.Thread(target=pipeline, args=('acme',))
+    thread.start()
+    thread.join(0.1)
+    threading.Timer(0.1, release.set).start()
+    assert pipeline('acme') == 'acme'
+    thread.join()
+    metrics = registry.snapshot()['flights']['"load"<_SingleFlight>']
+    assert (metrics['cache_hits'], metrics['cache_misses']) == (1, 1)
+
+    count_cache(True)  # ignored outside of an observed step
+
+
+def test_quantile():
+    metrics = _StepMetrics((1.0, 2.0, 4.0))
+    assert metrics.quantile(0.5) is None
+    for seconds in (0.5, 1.5, 1.5, 3.0):
+        metrics.observe(seconds, False)
+    assert metrics.quantile(0.25) == 1.0
+    assert metrics.quantile(0.5) == 1.5
+    assert metrics.quantile(1.0) == 4.0
+    metrics.observe(10.0, True)
+    assert metrics.quantile(1.0) == 4.0
+
+
+def test_render():
+    registry = MetricsRegistry(buckets=(0.1, 1.0))
+    pipeline = Pipeline(returns(int)(lambda x: x), _name='sc"ore', _incremental=True, _metrics=registry)
+    pipeline(1)
+    pipeline(1)
+
+    lines = registry.render().splitlines()
+    labels = 'pipeline="sc\\"ore",step="\\"<lambda>\\"<_Reusable>"'
+    assert lines[:2] == ['# HELP pakkr_step_duration_seconds Time taken to execute pakkr steps.',
+                         '# TYPE pakkr_step_duration_seconds histogram']
+    assert lines[2] == 'pakkr_step_duration_seconds_bucket{%s,le="0.1"} 2' % labels
+    assert lines[4] == 'pakkr_step_duration_seconds_bucket{%s,le="+Inf"} 2' % labels
+    assert lines[6] == 'pakkr_step_duration_seconds_count{%s} 2' % labels
+    assert 'pakkr_step_errors_total{%s} 0' % labels in lines
+    assert 'pakkr_step_cache_total{%s,result="hit"} 1' % labels in lines
+    assert 'pakkr_step_cache_total{%s,result="miss"} 1' % labels in lines
+    assert registry.quantile('sc"ore', '"<lambda>"<_Reusable>', 0.5) <= 0.1
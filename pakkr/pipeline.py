@@ -1,20 +1,30 @@
 import inspect
 import logging
+import threading
+import time
 from argparse import ArgumentParser
-from functools import partial, reduce
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from inspect import getfullargspec, Parameter as iParameter, signature
-from typing import Any, Callable, Dict, Optional, Tuple, Union
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple, Union
 from pakkr.cmd_args.cmd_args import ATTR_CMD_ARGS
+from pakkr.deadline import ATTR_TIMEOUT, Deadline, DEADLINE_KEY, step_deadline
 from pakkr.exception import (exception_handler,
                              exception_context,
                              PakkrError,
+                             PakkrTimeoutError,
                              pakkr_exchandler,
                              summarise_dictionary)
 from pakkr.logging import IndentationAdapter, log_timing
-from pakkr.returns.returns import collapse, _ReturnType
+from pakkr.metrics import current_registry, MetricsRegistry
+from pakkr.profiling import StepProfiler
+from pakkr.resources import ATTR_RESOURCES, ResourceScheduler
+from pakkr.returns.returns import assert_is_superset, collapse, _Meta, _NoReturn, _Return, _ReturnType
 
 ATTR_RETURNS = "__pakkr_returns__"
 
+_thread_state = threading.local()
+
 pakkr_logger = logging.getLogger('pakkr')
 
 _ARGS_META = Tuple[Tuple, Dict]
@@ -30,7 +40,8 @@ class Pipeline:
 
     def __init__(self, *steps: Tuple[Callable], **kwargs) -> None:
         super().__init__()
-        self._meta: Dict = {}
+        self.__local = threading.local()
+        self._meta = {}
         self._steps = steps
 
         self.__steps_returns = self._collect_steps_returns()
@@ -38,34 +49,267 @@ class Pipeline:
 
         self.__set_pakkr_cmd_args(self._add_steps_arguments)
 
+        if "_history" in kwargs and "_name" not in kwargs:
+            raise RuntimeError("A Pipeline recording its history should be given a _name.")
+        if "_recorder" in kwargs and "_name" not in kwargs:
+            raise RuntimeError("A Pipeline capturing its steps' inputs should be given a _name.")
+        if getattr(kwargs.get("_incremental"), "persistent", False) and "_name" not in kwargs:
+            raise RuntimeError("An incremental Pipeline with a persistent store should be given a _name.")
         self._name = kwargs.pop("_name") if "_name" in kwargs else "unnamed_" + str(id(self))
         self._suppress_timing_logs = "_suppress_timing_logs" in kwargs and bool(kwargs.pop("_suppress_timing_logs"))
+        self._timeout = kwargs.pop("_timeout") if "_timeout" in kwargs else None
+        self._spill = kwargs.pop("_spill") if "_spill" in kwargs else None
+        self._scheduler = kwargs.pop("_scheduler") if "_scheduler" in kwargs else None
+        self._profiler = kwargs.pop("_profiler") if "_profiler" in kwargs else None
+        self._metrics = kwargs.pop("_metrics") if "_metrics" in kwargs else None
+        self._history = kwargs.pop("_history") if "_history" in kwargs else None
+        self._journal = kwargs.pop("_journal") if "_journal" in kwargs else None
+        self._recorder = kwargs.pop("_recorder") if "_recorder" in kwargs else None
+        if self._journal is not None and type(self)._run_steps is not Pipeline._run_steps:
+            raise RuntimeError("Only Pipelines executing their steps in sequence can be journaled.")
+
+        self._plan = self._steps
+        incremental = kwargs.pop("_incremental") if "_incremental" in kwargs else None
+        self._flat_plan = None
+        if kwargs.pop("_flatten") if "_flatten" in kwargs else False:
+            if incremental:
+                raise RuntimeError("An incremental Pipeline cannot be flattened.")
+            if self._journal is not None:
+                raise RuntimeError("A journaled Pipeline cannot be flattened.")
+            self._flat_plan = tuple(_flatten(self._steps, 0))
+        if incremental:
+            self._plan = self._reusable_steps(incremental)
 
     def __call__(self, *args, **meta) -> Any:
+        priority = meta.pop("_priority") if "_priority" in meta else None
+        tenant = meta.pop("_tenant") if "_tenant" in meta else None
         kwargs = meta.copy()  # shallow copy the original keyword arguments for error msg
         depth, return_meta = _get_pakkr_depth(self)
         logger = IndentationAdapter(pakkr_logger, {'indent': depth,
                                                    'identifier': _identifier(self)})
-        self._meta = {}
-
+        resumed = self.__local.__dict__.pop('resumed', None)
+        self._meta = {key: meta[key] for key in resumed.produced} if resumed is not None else {}
+        self.__local.reused = []
+        self.__local.spilling = self._spill.start() if self._spill is not None else None
+        self.__local.durations = [None] * len(self._steps) if self._history is not None else None
+        self.__local.captures = [None] * len(self._steps) if self._recorder is not None else None
+        journaling = None
+        if self._journal is not None:
+            journaling = self._journal.start(self._name, [_identifier(step) for step in self._steps],
+                                             self.__local.run_id if resumed is not None else None)
+            self.__local.run_id = journaling.run_id
+            return_meta = return_meta and resumed is None
+        self.__local.journaling = journaling
+
+        queue_wait = getattr(_thread_state, 'queue_wait', 0.0)
+        tags = None
+        deadline = None
         try:
-            with log_timing(logger, self._suppress_timing_logs):
-                partial_run_step = partial(self._run_step, indent=depth + 1)
-                new_arg, _ = reduce(partial_run_step, self._steps, (args, meta))
+            started = time.perf_counter()
+            with _tagged(priority, tenant) as tags, log_timing(logger, self._suppress_timing_logs):
+                if self._timeout is not None:
+                    deadline = meta[DEADLINE_KEY] = Deadline(self._timeout, parent=_get_deadline(meta))
+                new_arg, _ = self._run_steps((args, meta), indent=depth + 1)
                 new_arg, new_meta = self._filter_results((new_arg, self._meta))
         except PakkrError as e:
+            if journaling is not None:
+                journaling.failed(e)
+                e.append_stack('\twhen executing run {} of {}, which can be resumed'
+                               .format(journaling.run_id, _identifier(self)))
             with exception_handler(pakkr_exchandler):
                 raise e.append_stack(exception_context(_identifier(self), args, kwargs, None))
+        except Exception as e:  # e.g. a RuntimeError of @returns, the run can be resumed all the same
+            if journaling is not None:
+                journaling.failed(e)
+            raise
+        finally:
+            if deadline is not None:
+                deadline.detach()
+            self.__local.queue_wait = getattr(_thread_state, 'queue_wait', 0.0) - queue_wait
+            if self._metrics is not None and tags is not None:
+                self._metrics.observe_queue_wait(self._name, tags[1], tags[0], self.__local.queue_wait)
+            if self._recorder is not None:
+                self._recorder.record(self._name, self.__local.captures)
+
+        if journaling is not None:
+            journaling.succeeded()
+
+        if self._history is not None:
+            self._history.record(self._name, list(zip(map(_identifier, self._steps), self.__local.durations)),
+                                 time.perf_counter() - started)
+
+        return _returned(new_arg, new_meta, return_meta)
+
+    def __getstate__(self) -> Dict:
+        state = self.__dict__.copy()
+        del state['_Pipeline__local']
+        return state
+
+    def __setstate__(self, state: Dict) -> None:
+        self.__dict__.update(state)
+        self.__local = threading.local()
+        self._meta = {}
 
-        if return_meta and new_meta is not None:
-            if new_arg:
-                return tuple(new_arg) + (new_meta,)
-            else:
-                return new_meta or None
-        elif len(new_arg) == 1:
-            return new_arg[0]
-        else:
-            return tuple(new_arg) or None
+    def map(self, *iterables, **meta) -> List[Any]:
+        """
+        Execute this Pipeline once per item of `iterables`, as the builtin `map` does, on a
+        pool of threads; every run is given the same meta. Steps declaring `@resources`
+        are only admitted while the Pipeline's `_scheduler` has them available.
+
+        Parameters
+        ----------
+        _max_workers : int
+            number of runs executed concurrently, see ThreadPoolExecutor for the default
+        _priority : int
+            priority of the runs for the `_scheduler`, higher first, 0 by default
+        _tenant : str
+            tenant the runs are executed for, the `_scheduler` sharing resources fairly
+            between tenants
+
+        Returns
+        -------
+        List[Any]
+            results of the runs in the order of the items
+        """
+        max_workers = meta.pop("_max_workers") if "_max_workers" in meta else None
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(self, *args, **meta) for args in zip(*iterables)]
+            try:
+                return [future.result() for future in futures]
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+
+    def resume(self, run_id: str, **meta) -> Any:
+        """
+        Resume a failed run recorded by this Pipeline's `_journal`, executing the step the run
+        failed at, and the following ones, with the inputs and meta recorded before it.
+
+        Parameters
+        ----------
+        run_id : str
+            identifier of the failed run, as reported by the PakkrError it failed with
+        meta
+            meta overriding the recorded one, e.g. values which could not be recorded
+
+        Raises
+        ------
+        RuntimeError
+            when the run cannot be resumed, e.g. it did not fail or meta is missing
+        """
+        if self._journal is None:
+            raise RuntimeError("{} has no _journal to resume runs from.".format(_identifier(self)))
+        state = self._journal.load(run_id, self._name, [_identifier(step) for step in self._steps])
+        missing = sorted(key for key in state.missing if key not in meta)
+        if missing:
+            raise RuntimeError("Meta keys {} of run {} could not be recorded and should be given."
+                               .format(missing, run_id))
+
+        self.__local.resumed = state
+        self.__local.run_id = run_id
+        try:
+            return self(*state.args, **dict(state.meta, **meta))
+        finally:
+            self.__local.__dict__.pop('resumed', None)
+
+    def run_range(self, start: Union[int, str]=0, stop: Union[int, str, None]=None, args: Tuple=(),
+                  meta: Optional[Dict]=None) -> Any:
+        """
+        Execute the steps of this Pipeline from `start` up to, excluding, `stop`, as if the
+        steps before them had returned `args` and `meta`, e.g. to profile or debug late
+        steps without executing the earlier ones. Before executing anything, the signatures
+        and `@returns` of the steps are checked to be satisfied by the injected inputs.
+
+        Parameters
+        ----------
+        start : int or str
+            position, or identifier or name, of the first step to execute
+        stop : int or str
+            position, or identifier or name, of the step to stop before, the end by default
+        args : Tuple
+            positional inputs of the first step
+        meta : Dict
+            meta available to the steps
+
+        Returns
+        -------
+        Any
+            what the last step of the range returned, as a run of this Pipeline would
+
+        Raises
+        ------
+        RuntimeError
+            when a step cannot be found or the inputs do not satisfy the steps
+        """
+        begin = self._position(start, 0)
+        end = self._position(stop, len(self._steps))
+        steps = self._steps[begin:end]
+        if not steps:
+            raise RuntimeError("No step of {} between {} and {}.".format(_identifier(self), start, stop))
+
+        meta = dict(meta or {})
+        problems = _unsatisfied(steps, len(args), set(meta))
+        if problems:
+            raise RuntimeError("Cannot run steps {} to {} of {}: {}."
+                               .format(begin, end, _identifier(self), '; '.join(problems)))
+
+        sliced = Pipeline(*steps, _name='{}[{}:{}]'.format(self._name, begin, end),
+                          _suppress_timing_logs=self._suppress_timing_logs, _scheduler=self._scheduler,
+                          _profiler=self._profiler, _metrics=self._metrics, _spill=self._spill)
+        return _run(sliced, args, meta)
+
+    def _position(self, step: Union[int, str, None], default: int) -> int:
+        """Position of a step given by position, identifier or name, as a slice bound."""
+        if step is None:
+            return default
+        if isinstance(step, int):
+            return min(max(step + len(self._steps) if step < 0 else step, 0), len(self._steps))
+
+        positions = [position for position, candidate in enumerate(self._steps)
+                     if step in (_identifier(candidate), _identifier(candidate)[1:].split('"<')[0])]
+        if not positions:
+            raise RuntimeError("No step {} in {}.".format(step, _identifier(self)))
+        if len(positions) > 1:
+            raise RuntimeError("Step {} of {} is ambiguous, at positions {}."
+                               .format(step, _identifier(self), positions))
+        return positions[0]
+
+    @property
+    def last_run_id(self) -> Optional[str]:
+        """Identifier of the last run recorded by this Pipeline's `_journal` on this thread."""
+        return getattr(self.__local, 'run_id', None)
+
+    @property
+    def last_queue_wait(self) -> float:
+        """Seconds the steps of the last run of this Pipeline on this thread waited for the
+        resources they declare, see ResourceScheduler. The queue waits of all runs, e.g.
+        those of `map`, are reported by the `_metrics` registry per tenant and priority."""
+        return getattr(self.__local, 'queue_wait', 0.0)
+
+    @property
+    def _meta(self) -> Dict:
+        """Meta produced by the steps of the current run; kept per thread so that the same
+        Pipeline can be executed concurrently."""
+        return self.__local.meta
+
+    @_meta.setter
+    def _meta(self, meta: Dict) -> None:
+        self.__local.meta = meta
+
+    @property
+    def reused_steps(self) -> Tuple[str, ...]:
+        """Identifiers of the steps whose outputs of the previous run were reused, instead of
+        executing them, during the last run of an incremental Pipeline on this thread."""
+        return tuple(getattr(self.__local, 'reused', ()))
+
+    def _reusable_steps(self, store: Any) -> Tuple[Callable, ...]:
+        from pakkr.incremental import MemoryStore, _Reusable
+
+        store = MemoryStore() if store is True else store
+        return tuple(_Reusable(step, store, '{}/{}/{}'.format(self._name, position, _identifier(step)),
+                               lambda step: self.__local.reused.append(_identifier(step)))
+                     for position, step in enumerate(self._steps))
 
     def _filter_results(self, results: _ARGS_META) -> _FILTERED_ARGS_META:
         if self.__custom_returns is None:
@@ -73,47 +317,109 @@ class Pipeline:
 
         return self.__custom_returns.downcast_result(results)
 
-    def _run_step(self, args_meta: _ARGS_META, step: Callable[..., _ARGS_META], indent: int) -> _ARGS_META:
+    def _run_steps(self, args_meta: _ARGS_META, indent: int) -> _ARGS_META:
+        if self._flat_plan is not None:
+            return self._run_flat_plan(args_meta, indent)
+
+        journaling = getattr(self.__local, 'journaling', None)
+        for position in range(journaling.resumed_at if journaling is not None else 0, len(self._plan)):
+            if journaling is not None:
+                journaling.checkpoint(position, args_meta[0], args_meta[1], self._meta)
+            args_meta = self._run_step(args_meta, self._plan[position], indent, position=position)
+        return args_meta
+
+    def _run_flat_plan(self, args_meta: _ARGS_META, indent: int) -> _ARGS_META:
+        """Execute the steps of this Pipeline and of its inlined nested Pipelines in one loop;
+        entering and exiting a nested Pipeline scopes the meta and downcasts the results as
+        executing the nested Pipeline as a step would, without its own call overhead."""
+        frames: List = []
+        position = 0  # of the step of this Pipeline being executed, inlined or not
+        try:
+            for kind, obj, offset in self._flat_plan:  # type: ignore
+                if kind is _STEP:
+                    owner = frames[-1][0] if frames else self
+                    args_meta = self._run_step(args_meta, obj, indent=indent + offset, owner=owner,
+                                               position=position if offset == 0 else None)
+                    position += offset == 0
+                elif kind is _ENTER:
+                    args, meta = args_meta
+                    frames.append((obj, args, meta, self._meta, time.perf_counter()))
+                    self._meta = {}
+                    args_meta = (args, meta.copy())
+                else:
+                    pipeline, _, outer_meta, outer_produced, started = frames[-1]
+                    new_arg, new_meta = pipeline._filter_results((args_meta[0], self._meta))
+                    frames.pop()
+                    outer_meta.update(new_meta or {})
+                    outer_produced.update(new_meta or {})
+                    self._meta = outer_produced
+                    args_meta = (tuple(new_arg), outer_meta)
+                    if offset == 0:
+                        self._record_duration(position, started)
+                        position += 1
+        except Exception as e:
+            error = e
+            if not isinstance(e, PakkrError):
+                if not frames:
+                    raise
+                # e.g. a RuntimeError of @returns, wrapped as executing the nested Pipeline as a step would
+                pipeline, args, kwargs, self._meta, _ = frames.pop()
+                error = PakkrError(str(e), exception_context(_identifier(pipeline), args, kwargs, kwargs))
+                error.__cause__ = e
+            while frames:
+                pipeline, args, kwargs, self._meta, _ = frames.pop()
+                error.append_stack(exception_context(_identifier(pipeline), args, kwargs, None))
+            raise error
+
+        return args_meta
+
+    def _run_step(self, args_meta: _ARGS_META, step: Callable[..., _ARGS_META], indent: int,
+                  owner: Optional["Pipeline"]=None, position: Optional[int]=None) -> _ARGS_META:
+        """Execute one step; `owner` is the inlined nested Pipeline the step belongs to, if
+        any, whose name labels the step's metrics, and `position` the position of the step
+        in this Pipeline, if it is one of its steps, under which its duration and inputs are
+        recorded."""
         assert callable(step), f"{type(step)} is not a Callable"
 
         args, meta = args_meta
+        parent = _get_deadline(meta)
+        deadline = step_deadline(step, parent)
         available = meta.copy()
 
-        sign = signature(step)
-        sign_params = tuple(sign.parameters.values())
-
         logger = IndentationAdapter(pakkr_logger, {'indent': indent,
                                                    'identifier': _identifier(step)})
         available.update(logger=logger)
-
-        try:
-            opts: Dict = {}
-            for param in sign_params[len(args):]:
-                if param.kind == iParameter.VAR_POSITIONAL:
-                    pass
-                elif param.kind == iParameter.VAR_KEYWORD and param.name == 'meta':
-                    opts.update(available)
-                elif param.default != iParameter.empty:
-                    opts[param.name] = available.get(param.name, param.default)
-                else:
-                    opts[param.name] = available[param.name]
-        except KeyError as e:
-            context = '\twhen executing {identifier}, available inputs/meta were {args}/{available}'
-            context = context.format(identifier=_identifier(step),
-                                     args=tuple(map(type, args)),
-                                     available=summarise_dictionary(available))
-            msg = "{} is required but not available.".format(str(e))
-            raise PakkrError(msg, context) from RuntimeError(msg)
-
+        if deadline is not None:
+            available[DEADLINE_KEY] = deadline
+            _enforce_deadline(deadline, step, '\tbefore executing {}'.format(_identifier(step)))
+
+        opts = _step_options(step, args, available)
+        captures = getattr(self.__local, 'captures', None)
+        if captures is not None and position is not None:
+            captures[position] = (_identifier(step), self._recorder.capture(args, opts))
+        spilling = getattr(self.__local, 'spilling', None)
+        if spilling is not None:
+            spilling.requested(opts)
+
+        started = time.perf_counter()
         try:
             suppress_timing_logs = self._suppress_timing_logs or isinstance(step, Pipeline)
-            with log_timing(logger, suppress_timing_logs):
+            labelled = owner if owner is not None else self
+            with _admitted(self._scheduler, step, deadline), log_timing(logger, suppress_timing_logs), \
+                    _profiled(self._profiler, step), _metered(self._metrics, labelled, step):
                 result = step(*args, **opts)
         except PakkrError as e:
             raise e
         except Exception as e:
             context = exception_context(_identifier(step), args, opts, meta)
             raise PakkrError(str(e), context) from e
+        finally:
+            if deadline is not parent:
+                deadline.detach()  # type: ignore
+
+        self._record_duration(position, started)
+        if deadline is not None:
+            _enforce_deadline(deadline, step, exception_context(_identifier(step), args, opts, meta))
 
         new_meta = {}
 
@@ -125,9 +431,17 @@ class Pipeline:
 
         self._meta.update(new_meta)
         meta.update(new_meta)
+        if spilling is not None:
+            spilling.produced(new_meta, meta, self._meta)
 
         return (_result, meta)
 
+    def _record_duration(self, position: Optional[int], started: float) -> None:
+        """Remember the duration of the step of this Pipeline at `position` for the run's history."""
+        durations = getattr(self.__local, 'durations', None)
+        if durations is not None and position is not None:
+            durations[position] = time.perf_counter() - started
+
     def _collect_steps_returns(self) -> _ReturnType:
         return collapse(getattr(step, ATTR_RETURNS) if hasattr(step, ATTR_RETURNS) else Any
                         for step in self._steps)
@@ -143,7 +457,7 @@ class Pipeline:
     def __set_pakkr_returns(self, _type: Optional[_ReturnType]):
         """Setting the return values' types in this context is mainly for removing the return
         values of the last step and/or reducing the number of meta values"""
-        self.__steps_returns.assert_is_superset(_type)
+        assert_is_superset(self.__steps_returns, _type)
         self.__custom_returns = _type
 
     __pakkr_returns__ = property(__get_pakkr_returns, __set_pakkr_returns)
@@ -175,7 +489,7 @@ def _get_pakkr_depth(instance) -> Tuple[int, bool]:
     used as Callables inside a step; meta should be returned in the former but not
     the later.
     '''
-    assert isinstance(instance, Pipeline), f"'{instance}' is not an instance of Pipeline"
+    assert callable(instance), f"'{instance}' is not a Callable"
     stack = inspect.stack()
 
     used_as_step = None
@@ -193,9 +507,235 @@ def _get_pakkr_depth(instance) -> Tuple[int, bool]:
         if count > -1:
             count += isinstance(obj, Pipeline) and frame_info.function == '__call__'
 
+    inherited = getattr(_thread_state, 'step', None)
+    if inherited is not None and count > -1:
+        pipeline, depth = inherited
+        if pipeline is instance:
+            return depth, True
+        return count + depth, bool(used_as_step)
+
     return count, bool(used_as_step)
 
 
+def _returned(new_arg: Tuple, new_meta: Optional[Dict], return_meta: bool) -> Any:
+    """What a run returns, given the values and meta returned by its last step."""
+    if return_meta and new_meta:
+        if new_arg:
+            return tuple(new_arg) + (new_meta,)
+        else:
+            return new_meta or None
+    elif len(new_arg) == 1:
+        return new_arg[0]
+    else:
+        return tuple(new_arg) or None
+
+
+def _run_as_step(pipeline: Pipeline, depth: int, *args, **meta) -> Any:
+    """Execute a Pipeline as a step nested at `depth` from any thread, e.g. a worker thread
+    of a step wrapper, where the calling Pipeline cannot be found on the call stack."""
+    previous = getattr(_thread_state, 'step', None)
+    _thread_state.step = (pipeline, depth)
+    try:
+        return pipeline(*args, **meta)
+    finally:
+        _thread_state.step = previous
+
+
+_ENTER, _STEP, _EXIT = 'enter', 'step', 'exit'
+
+
+_OWN_SETTINGS = ('_timeout', '_scheduler', '_spill', '_profiler', '_metrics', '_history', '_journal', '_recorder')
+
+
+def _flatten(steps: Tuple[Callable, ...], offset: int) -> Iterator[Tuple[str, Any, int]]:
+    """Inline nested Pipelines into a linear plan of steps delimited by enter/exit markers.
+    Only plain Pipelines are inlined, i.e. not subclasses, Pipelines declaring a timeout or
+    resources, or with their own incremental mode or any other setting applied when they
+    are called."""
+    for step in steps:
+        inline = (type(step) is Pipeline and
+                  step._plan is step._steps and
+                  all(getattr(step, setting) is None for setting in _OWN_SETTINGS) and
+                  not hasattr(step, ATTR_TIMEOUT) and
+                  not hasattr(step, ATTR_RESOURCES))
+        if inline:
+            yield _ENTER, step, offset
+            yield from _flatten(step._steps, offset + 1)
+            yield _EXIT, step, offset
+        else:
+            yield _STEP, step, offset
+
+
+def _step_options(step: Callable, args: Tuple, available: Dict) -> Dict:
+    """Resolve the keyword arguments of a step, i.e. parameters not given positionally, from
+    the available meta."""
+    sign = signature(step)
+    sign_params = tuple(sign.parameters.values())
+
+    try:
+        opts: Dict = {}
+        for param in sign_params[len(args):]:
+            if param.kind == iParameter.VAR_POSITIONAL:
+                pass
+            elif param.kind == iParameter.VAR_KEYWORD and param.name == 'meta':
+                opts.update(available)
+            elif param.default != iParameter.empty:
+                opts[param.name] = available.get(param.name, param.default)
+            else:
+                opts[param.name] = available[param.name]
+    except KeyError as e:
+        context = '\twhen executing {identifier}, available inputs/meta were {args}/{available}'
+        context = context.format(identifier=_identifier(step),
+                                 args=tuple(map(type, args)),
+                                 available=summarise_dictionary(available))
+        msg = "{} is required but not available.".format(str(e))
+        raise PakkrError(msg, context) from RuntimeError(msg)
+
+    return opts
+
+
+def _run(pipeline: Pipeline, args: Tuple, meta: Dict) -> Any:
+    """Execute a Pipeline as a run, rather than as a step of the Pipeline calling this."""
+    return pipeline(*args, **meta)
+
+
+def _unsatisfied(steps: Tuple[Callable, ...], positional: int, keys: Set[str]) -> List[str]:
+    """
+    Why executing `steps` given `positional` inputs and the meta `keys`
+    would fail to resolve their inputs, following their signatures as `_step_options` does
+    and what the `@returns` of the steps before them produce; nested Pipelines are checked
+    step by step.
+    """
+    problems = []
+    keys = set(keys) | {'logger'}
+    for step in steps:
+        if type(step) is Pipeline:
+            problems.extend(_unsatisfied(step._steps, positional, keys))
+        else:
+            problems.extend(_unsatisfied_params(step, tuple(signature(step).parameters.values()), positional, keys))
+
+        returns = getattr(step, ATTR_RETURNS, None)
+        if isinstance(returns, _Return):
+            positional = len(returns.values)
+            keys.update(returns.meta or ())
+        elif isinstance(returns, _Meta):
+            positional = 0
+            keys.update(returns)
+        elif isinstance(returns, _NoReturn):
+            positional = 0
+        else:
+            positional = 1
+    return problems
+
+
+def _unsatisfied_params(step: Callable, params: Tuple[iParameter, ...], positional: int,
+                        keys: Set[str]) -> List[str]:
+    problems = []
+    accepts = [param for param in params if param.kind in (iParameter.POSITIONAL_ONLY,
+                                                            iParameter.POSITIONAL_OR_KEYWORD)]
+    variadic = any(param.kind == iParameter.VAR_POSITIONAL for param in params)
+    if positional > len(accepts) and not variadic:
+        problems.append("{} takes {} positional inputs but would be given {}"
+                        .format(_identifier(step), len(accepts), positional))
+
+    available = keys | ({DEADLINE_KEY} if hasattr(step, ATTR_TIMEOUT) else set())
+    missing = []
+    for param in params[positional:]:
+        if param.kind == iParameter.VAR_POSITIONAL or (param.kind == iParameter.VAR_KEYWORD and param.name == 'meta'):
+            continue
+        if param.default == iParameter.empty and param.name not in available:
+            missing.append(param.name)
+    if missing:
+        problems.append("{} requires {} which would not be available".format(_identifier(step), missing))
+    return problems
+
+
+@contextmanager
+def _admitted(scheduler: Optional[ResourceScheduler], step: Callable,
+              deadline: Optional[Deadline]) -> Iterator[None]:
+    """Wait for the scheduler to admit a step declaring its resources; Pipelines executed
+    by the step, e.g. nested ones, inherit the scheduler unless they have their own."""
+    scheduler = scheduler if scheduler is not None else getattr(_thread_state, 'scheduler', None)
+    if scheduler is None:
+        yield
+        return
+
+    previous = getattr(_thread_state, 'scheduler', None)
+    _thread_state.scheduler = scheduler
+    try:
+        requirements = getattr(step, ATTR_RESOURCES, None)
+        if requirements is None and not isinstance(step, Pipeline):
+            requirements = scheduler.undeclared
+        if requirements is None:
+            yield
+        else:
+            priority, tenant = getattr(_thread_state, 'tags', (0, None))
+            with scheduler.admit(requirements, deadline, _identifier(step), priority, tenant) as waited:
+                _thread_state.queue_wait = getattr(_thread_state, 'queue_wait', 0.0) + waited
+                yield
+    finally:
+        _thread_state.scheduler = previous
+
+
+@contextmanager
+def _tagged(priority: Optional[int], tenant: Optional[str]) -> Iterator[Tuple[int, Optional[str]]]:
+    """Give the steps of a run, including those of the Pipelines it executes, a priority
+    and tenant for the scheduler; unless given, they are inherited from the enclosing run.
+    Yields the run's priority and tenant."""
+    previous = getattr(_thread_state, 'tags', (0, None))
+    if priority is None and tenant is None:
+        yield previous
+        return
+    _thread_state.tags = (previous[0] if priority is None else priority, previous[1] if tenant is None else tenant)
+    try:
+        yield _thread_state.tags
+    finally:
+        _thread_state.tags = previous
+
+
+@contextmanager
+def _profiled(profiler: Optional[StepProfiler], step: Callable) -> Iterator[None]:
+    """Profile a step; Pipelines executed by the step inherit the profiler unless they have
+    their own."""
+    profiler = profiler if profiler is not None else getattr(_thread_state, 'profiler', None)
+    if profiler is None:
+        yield
+        return
+
+    previous = getattr(_thread_state, 'profiler', None)
+    _thread_state.profiler = profiler
+    try:
+        with profiler.profile(_identifier(step)):
+            yield
+    finally:
+        _thread_state.profiler = previous
+
+
+@contextmanager
+def _metered(registry: Optional[MetricsRegistry], pipeline: Pipeline, step: Callable) -> Iterator[None]:
+    """Observe a step's latency; Pipelines executed by the step inherit the registry unless
+    they have their own."""
+    registry = registry if registry is not None else current_registry()
+    if registry is None:
+        yield
+        return
+
+    with registry.time(pipeline._name, _identifier(step)):
+        yield
+
+
+def _get_deadline(meta: Dict) -> Optional[Deadline]:
+    deadline = meta.get(DEADLINE_KEY)
+    return deadline if isinstance(deadline, Deadline) else None
+
+
+def _enforce_deadline(deadline: Deadline, step: Callable, context: str) -> None:
+    """Abort the run, cancelling any outstanding work, once the deadline has passed."""
+    if deadline.expired:
+        deadline.cancel()
+        raise PakkrTimeoutError(_identifier(step), deadline.budget, deadline.elapsed(), context)
+
+
 def _identifier(obj) -> str:
     attr = None
     if hasattr(obj, '_name'):
@@ -1,10 +1,22 @@
+import pickle
+import threading
+import time
 import pytest
 from mock import call, MagicMock, Mock, patch
 from pakkr import Pipeline, returns
+from pakkr.branching import When
 from pakkr.cmd_args.cmd_args import cmd_args
 from pakkr.cmd_args.argument import argument
 from pakkr.pipeline import _identifier, _get_pakkr_depth
-from pakkr.exception import PakkrError
+from pakkr.deadline import Deadline, timeout
+from pakkr.exception import PakkrError, PakkrTimeoutError
+from pakkr.history import RunHistory
+from pakkr.journal import RunJournal
+from pakkr.metrics import MetricsRegistry
+from pakkr.profiling import StepProfiler
+from pakkr.replay import StepRecorder
+from pakkr.resources import resources, ResourceScheduler
+from pakkr.spill import SpillPolicy
 from collections import namedtuple
 
 
@@ -54,7 +66,7 @@ def test_pipeline_run_step():
 
     with patch.object(pipeline, '_run_step', wraps=pipeline._run_step) as spy:
         pipeline()
-        spy.assert_called_with(((), {}), say_hello, indent=1)
+        spy.assert_called_with(((), {}), say_hello, 1, position=0)
 
 
 def test_pipeline_step_exception():
@@ -347,3 +359,319 @@ def test_get_pakkr_depth_1_as_callable_in_between(mock_inspect):
     depth, used_as_step = _get_pakkr_depth(pipeline_2)
     assert depth == 1
     assert used_as_step is False
+
+
+def test_pipeline_timeout():
+    def slow():
+        time.sleep(0.2)
+
+    def never_called():
+        raise Exception("should not be executed")  # pragma: no cover
+
+    pipeline = Pipeline(slow, never_called, _name="slow_pipeline", _timeout=0.1)
+    with pytest.raises(PakkrTimeoutError) as e:
+        pipeline()
+    assert e.value.identifier == '"slow"<function>'
+    assert e.value.budget == 0.1
+    assert 'inside "slow_pipeline"<Pipeline>' in str(e.value)
+
+
+def test_pipeline_deadline_injected():
+    @returns(float)
+    def remaining(deadline):
+        return deadline.remaining()
+
+    pipeline = Pipeline(remaining, _timeout=10)
+    assert 0 < pipeline() <= 10
+
+    pipeline = Pipeline(remaining)
+    assert 0 < pipeline(deadline=Deadline(5)) <= 5
+
+    pipeline = Pipeline(lambda deadline=None: deadline)
+    assert pipeline() is None
+
+
+def test_pipeline_deadlines_detached():
+    parent = Deadline(100)
+    pipeline = Pipeline(timeout(10)(lambda deadline: deadline), _timeout=10)
+    for _ in range(3):
+        assert pipeline(deadline=parent).remaining() <= 10
+    assert parent._callbacks == []
+
+
+def test_pipeline_expired_before_step():
+    def never_called():
+        raise Exception("should not be executed")  # pragma: no cover
+
+    deadline = Deadline(10)
+    deadline.cancel()
+    pipeline = Pipeline(never_called)
+    with pytest.raises(PakkrTimeoutError) as e:
+        pipeline(deadline=deadline)
+    assert 'before executing "never_called"<function>' in str(e.value)
+
+
+def test_step_timeout_cancels_workers():
+    cancelled = []
+
+    @timeout(0.01)
+    def slow(deadline):
+        deadline.add_cancel_callback(lambda: cancelled.append(True))
+        time.sleep(0.05)
+
+    pipeline = Pipeline(slow, lambda: "unreachable", _timeout=10)
+    with pytest.raises(PakkrTimeoutError) as e:
+        pipeline()
+    assert e.value.budget == 0.01
+    assert cancelled == [True]
+
+
+def test_nested_pipeline_timeout():
+    @returns(float)
+    def remaining(deadline):
+        return deadline.remaining()
+
+    inner = Pipeline(remaining, _timeout=1)
+    outer = Pipeline(inner, _timeout=10)
+    assert 0 < outer() <= 1
+
+    inner = timeout(1)(Pipeline(remaining))
+    outer = Pipeline(inner, lambda x: x, _timeout=10)
+    assert 0 < outer() <= 1
+
+
+def test_nested_untyped_pipeline():
+    pipeline = Pipeline(Pipeline(lambda x: x + 1), lambda y: y * 2)
+    assert pipeline(1) == 4
+
+
+def _nested_pipelines(**kwargs):
+    @returns(int, a=int, b=int)
+    def make(x):
+        return x + 1, {'a': 10, 'b': 20}
+
+    @returns(int, c=int)
+    def add_a(x, a):
+        return x + a, {'c': 30}
+
+    inner = returns(int, c=int)(Pipeline(make, add_a, _name="inner"))
+    middle = Pipeline(inner, returns(str)(lambda x, c, b=0: "{}-{}-{}".format(x, c, b)), _name="middle")
+    meta_only = returns(d=int)(Pipeline(returns(d=int, e=int)(lambda s: {'d': len(s), 'e': 2}), _name="meta_only"))
+    return Pipeline(middle, meta_only, lambda d, c, e=None: (d, c, e), _name="outer", **kwargs)
+
+
+def test_flattened_pipeline():
+    pipeline = _nested_pipelines(_flatten=True)
+    assert [kind for kind, _, _ in pipeline._flat_plan] == \
+        ['enter', 'enter', 'step', 'step', 'exit', 'step', 'exit', 'enter', 'step', 'exit', 'step']
+    assert pipeline(1) == _nested_pipelines()(1) == (7, 30, None)
+
+
+def test_flattened_pipeline_indentation():
+    pipeline = Pipeline(Pipeline(lambda: 1, _name="inner"), _flatten=True)
+    with patch.object(pipeline, '_run_step', wraps=pipeline._run_step) as spy:
+        pipeline()
+        assert spy.call_args[1] == {'indent': 2, 'owner': pipeline._steps[0], 'position': None}
+
+
+def test_flattened_pipeline_step_exception():
+    def throw(x):
+        raise Exception("something is wrong")
+
+    def run(pipeline):
+        with pytest.raises(PakkrError) as e:
+            pipeline(1)
+        return str(e.value)
+
+    def make(**kwargs):
+        inner = Pipeline(throw, _name="inner")
+        return Pipeline(Pipeline(inner, _name="middle"), _name="outer", **kwargs)
+
+    message = run(make(_flatten=True))
+    assert [line.split(' executed')[0] for line in message.splitlines()] == \
+        [line.split(' executed')[0] for line in run(make()).splitlines() if 'available meta' not in line]
+    assert message.index('inside "inner"<Pipeline>') < message.index('inside "middle"<Pipeline>') < \
+        message.index('inside "outer"<Pipeline>')
+
+
+def test_flattened_pipeline_returns_exception():
+    @returns(int)
+    def bad_type(x):
+        return 'x'
+
+    def run(pipeline):
+        with pytest.raises(PakkrError) as e:
+            pipeline(1)
+        assert isinstance(e.value.__cause__, RuntimeError)
+        return [line.split(' executed')[0] for line in str(e.value).splitlines() if 'available meta' not in line]
+
+    def make(inner, **kwargs):
+        return Pipeline(Pipeline(inner, _name="middle"), lambda x: x, _name="outer", **kwargs)
+
+    # a bad return type of a step, and results of a nested Pipeline failing to downcast
+    assert run(make(Pipeline(bad_type, _name="inner"), _flatten=True)) == \
+        run(make(Pipeline(bad_type, _name="inner")))
+    inner = Pipeline(lambda x: x, _name="inner")
+    with patch.object(inner, '_filter_results', side_effect=RuntimeError("Cannot downcast")):
+        assert run(make(inner, _flatten=True)) == run(make(inner))
+
+    # as a step of the Pipeline itself, the error is not wrapped in either mode
+    with pytest.raises(RuntimeError):
+        Pipeline(bad_type, _flatten=True)(1)
+
+
+def test_flattened_pipeline_keeps_opaque_steps():
+    timed = Pipeline(lambda: 1, _timeout=10)
+    decorated = timeout(10)(Pipeline(lambda x: x + 1))
+    incremental = Pipeline(lambda x: x + 1, _incremental=True)
+    when = When(lambda: True, lambda x: x - 2)
+    pipeline = Pipeline(timed, decorated, incremental, when, _flatten=True)
+    assert [kind for kind, _, _ in pipeline._flat_plan] == ['step'] * 4
+    assert pipeline() == 1
+
+
+@pytest.mark.parametrize('setting', ['_scheduler', '_spill', '_profiler', '_metrics', '_history', '_journal',
+                                     '_recorder'])
+def test_flattened_pipeline_keeps_pipelines_with_settings(setting, tmpdir):
+    values = {'_scheduler': ResourceScheduler(cores=1), '_spill': SpillPolicy(1 << 20, str(tmpdir)),
+              '_profiler': StepProfiler(), '_metrics': MetricsRegistry(), '_history': RunHistory(str(tmpdir)),
+              '_journal': RunJournal(str(tmpdir)), '_recorder': StepRecorder(str(tmpdir))}
+    inner = Pipeline(lambda x: x + 1, _name="inner", **{setting: values[setting]})
+    pipeline = Pipeline(inner, _flatten=True)
+    assert [kind for kind, _, _ in pipeline._flat_plan] == ['step']
+    assert pipeline(1) == 2
+
+
+def test_flattened_pipeline_keeps_pipelines_with_resources():
+    running, peak, lock = [0], [0], threading.Lock()
+
+    def count(x):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.01)
+        with lock:
+            running[0] -= 1
+        return x
+
+    inner = resources(exclusive=True)(Pipeline(count, _name="inner"))
+    pipeline = Pipeline(inner, _flatten=True, _scheduler=ResourceScheduler(cores=8))
+    assert [kind for kind, _, _ in pipeline._flat_plan] == ['step']
+    assert pipeline.map(range(8), _max_workers=8) == list(range(8))
+    assert peak[0] == 1
+
+
+def test_flattened_pipeline_metrics_labels():
+    registry = MetricsRegistry()
+    inner = Pipeline(lambda x: x + 1, _name="inner")
+    Pipeline(inner, lambda x: x, _name="outer", _flatten=True, _metrics=registry)(1)
+    assert sorted(registry.snapshot()) == ['inner', 'outer']
+
+
+def test_flattened_incremental_pipeline():
+    with pytest.raises(RuntimeError) as e:
+        Pipeline(lambda: 1, _flatten=True, _incremental=True)
+    assert str(e.value) == "An incremental Pipeline cannot be flattened."
+
+
+def _add_one(x):
+    return x + 1
+
+
+def test_pickle_pipeline():
+    pipeline = pickle.loads(pickle.dumps(Pipeline(_add_one, _name="pickled")))
+    assert pipeline._meta == {}
+    assert pipeline(1) == 2
+
+
+def test_map():
+    pipeline = Pipeline(lambda x, y, offset: x * y + offset)
+    assert pipeline.map([1, 2, 3], [4, 5, 6], offset=1, _max_workers=2) == [5, 11, 19]
+    assert pipeline.map([]) == []
+
+
+def test_map_exception():
+    def fail_on_two(x):
+        if x == 2:
+            raise ValueError("two")
+        return x
+
+    with pytest.raises(PakkrError) as e:
+        Pipeline(fail_on_two).map(range(100), _max_workers=1)
+    assert str(e.value).startswith("two")
+
+
+def test_run_range():
+    executed = []
+
+    @returns(str, rows=int)
+    def load(path):
+        executed.append('load')
+        return 'data', {'rows': 3}
+
+    @returns(list)
+    def parse(text, rows):
+        executed.append('parse')
+        return [text] * rows
+
+    @returns(int, scale=int)
+    def count(items, factor=1):
+        executed.append('count')
+        return len(items) * factor, {'scale': factor}
+
+    @timeout(10)
+    def report(total, scale, deadline, **meta):
+        executed.append('report')
+        return total, scale, sorted(meta)
+
+    pipeline = Pipeline(load, parse, Pipeline(count, _name='counting'), report, _name='report')
+    assert pipeline.run_range(1, 3, args=('x',), meta={'rows': 2}) == 2
+    assert executed == ['parse', 'count']
+    executed.clear()
+    assert pipeline.run_range('counting', args=(['a'],), meta={'factor': 3}) == (3, 3, ['factor', 'logger'])
+    assert pipeline.run_range('"report"<function>', args=(1,), meta={'scale': 2})[:2] == (1, 2)
+    assert pipeline.run_range(-1, args=(1,), meta={'scale': 2})[:2] == (1, 2)
+    assert pipeline.run_range(stop='parse', args=('data.csv',)) == 'data'
+    assert executed == ['count', 'report', 'report', 'report', 'load']
+
+    # inputs are checked before executing anything
+    executed.clear()
+    with pytest.raises(RuntimeError) as e:
+        pipeline.run_range(1, args=('x', 'y', 'z'))
+    assert str(e.value) == ('Cannot run steps 1 to 4 of "report"<Pipeline>: "parse"<function> takes 2 positional '
+                            'inputs but would be given 3.')
+    with pytest.raises(RuntimeError) as e:
+        pipeline.run_range('parse', 'report')
+    assert str(e.value) == ('Cannot run steps 1 to 3 of "report"<Pipeline>: "parse"<function> requires '
+                            "['text', 'rows'] which would not be available.")
+    with pytest.raises(RuntimeError) as e:
+        pipeline.run_range(2, args=([1], 2, 3))
+    assert str(e.value) == ('Cannot run steps 2 to 4 of "report"<Pipeline>: "count"<function> takes 2 positional '
+                            'inputs but would be given 3.')
+    with pytest.raises(RuntimeError) as e:
+        Pipeline(parse, report, _name='partial').run_range(args=('x',))
+    assert str(e.value) == ('Cannot run steps 0 to 2 of "partial"<Pipeline>: "parse"<function> requires [\'rows\'] '
+                            'which would not be available; "report"<function> requires [\'scale\'] which would not '
+                            'be available.')
+    assert executed == []
+
+    @returns(unit=str)
+    def unit():
+        return {'unit': 'm'}
+
+    @returns()
+    def log(unit):
+        executed.append(unit)
+
+    assert Pipeline(unit, log, lambda: 1).run_range() == 1
+    assert executed == ['m']
+
+    with pytest.raises(RuntimeError) as e:
+        pipeline.run_range('train')
+    assert str(e.value) == 'No step train in "report"<Pipeline>.'
+    with pytest.raises(RuntimeError) as e:
+        pipeline.run_range(3, 1)
+    assert str(e.value) == 'No step of "report"<Pipeline> between 3 and 1.'
+    with pytest.raises(RuntimeError) as e:
+        Pipeline(load, load).run_range('load')
+    assert str(e.value).endswith('Step load of "unnamed_{}"<Pipeline> is ambiguous, at positions [0, 1].'[-40:])
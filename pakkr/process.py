@@ -0,0 +1,306 @@
+import atexit
+import logging
+import mmap
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+import weakref
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from typing import Any, Callable, Dict, List, Optional
+
+from pakkr._wrapper import _StepWrapper
+from pakkr.deadline import Deadline, DEADLINE_KEY
+from pakkr.logging import IndentationAdapter
+from pakkr.pipeline import _identifier
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+_DEFAULT_MIN_SHARED_BYTES = 1 << 20
+
+_lock = threading.Lock()
+_segments: Dict[str, int] = {}
+_directory: Dict[int, str] = {}
+_worker_directory: Optional[str] = None
+_worker_created: List[str] = []
+
+
+def _segment_directory() -> str:
+    """Directory of this process' segments; on tmpfs when available so segments live in RAM.
+    Worker processes create segments in the directory of the process they work for."""
+    if _worker_directory is not None:
+        return _worker_directory
+
+    pid = os.getpid()
+    with _lock:
+        if pid not in _directory:
+            parent = '/dev/shm' if os.path.isdir('/dev/shm') else None
+            _directory[pid] = tempfile.mkdtemp(prefix='pakkr-', dir=parent)
+            atexit.register(_remove_directory, pid, _directory[pid])
+        return _directory[pid]
+
+
+def _remove_directory(pid: int, directory: str) -> None:
+    if os.getpid() == pid:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def _acquire(path: str) -> None:
+    with _lock:
+        _segments[path] = _segments.get(path, 0) + 1
+
+
+def _release(path: str) -> None:
+    """Drop a reference to a segment, removing its file once nothing refers to it; existing
+    mappings stay valid after the file is removed."""
+    with _lock:
+        _segments[path] -= 1
+        if _segments[path]:
+            return
+        del _segments[path]
+    try:
+        os.remove(path)
+    except FileNotFoundError:  # pragma: no cover
+        pass
+
+
+class SharedArray:
+    """
+    Picklable reference to a numpy array held in a memory-mapped segment file. Pickling it
+    only sends the segment's path and the array's layout, so handing it over to another
+    process does not copy the array.
+    """
+    __slots__ = ('path', 'dtype', 'shape', 'strides', 'offset')
+
+    def __init__(self, path: str, dtype: str, shape: tuple, strides: tuple, offset: int) -> None:
+        self.path = path
+        self.dtype = dtype
+        self.shape = shape
+        self.strides = strides
+        self.offset = offset
+
+    def __getstate__(self):
+        return tuple(getattr(self, attr) for attr in self.__slots__)
+
+    def __setstate__(self, state):
+        for attr, value in zip(self.__slots__, state):
+            setattr(self, attr, value)
+
+    def attach(self, mode: str='r+') -> Any:
+        """Map the segment and return the array as a view of it."""
+        segment = np.memmap(self.path, dtype=np.uint8, mode=mode)
+        return np.ndarray(self.shape, np.dtype(self.dtype), buffer=segment,
+                          offset=self.offset, strides=self.strides)
+
+
+def shared_array(shape, dtype=float) -> Any:
+    """Allocate an array in a new segment so it can be handed over to worker processes, and
+    returned from them, without being copied. The segment is removed once the array, and
+    every view of it, is garbage collected; in a worker process, the segment is owned by
+    the calling process instead."""
+    path = os.path.join(_segment_directory(), uuid.uuid4().hex)
+    segment = np.memmap(path, dtype=dtype, mode='w+', shape=shape)
+    if _worker_directory is None:
+        _acquire(path)
+        weakref.finalize(segment, _release, path)
+    else:
+        _worker_created.append(path)
+    return segment
+
+
+def _segment_of(array: Any) -> Optional[SharedArray]:
+    """The SharedArray referring to `array` if it is a view of a writable segment created by
+    pakkr; memory-mapped files of users are copied rather than taken over."""
+    base = array
+    while base is not None and not (isinstance(base, np.memmap) and isinstance(base.base, mmap.mmap)):
+        base = base.base
+    if base is None or base.mode not in ('r+', 'w+') or base.filename is None:
+        return None
+    if os.path.dirname(os.path.abspath(base.filename)) != os.path.abspath(_segment_directory()):
+        return None
+
+    offset = array.__array_interface__['data'][0] - base.__array_interface__['data'][0] + base.offset
+    return SharedArray(base.filename, array.dtype.str, array.shape, array.strides, offset)
+
+
+def _adopt(handle: SharedArray) -> Any:
+    """Attach to a segment created by another process and take a reference to it."""
+    array = handle.attach()
+    _acquire(handle.path)
+    weakref.finalize(array.base, _release, handle.path)
+    return array
+
+
+class _Encoder:
+    """Replace large numpy arrays in (nested lists, tuples and dicts of) values by SharedArrays,
+    copying them into new segments unless they are held in one already."""
+
+    def __init__(self, min_shared_bytes: int) -> None:
+        self.min_shared_bytes = min_shared_bytes
+        self.created: List[str] = []
+
+    def encode(self, value: Any) -> Any:
+        if isinstance(value, (list, tuple)) and type(value) in (list, tuple):
+            return type(value)(self.encode(v) for v in value)
+        elif type(value) is dict:
+            return {k: self.encode(v) for k, v in value.items()}
+        elif isinstance(value, Deadline):
+            return _RemoteDeadline(value.remaining())
+        elif isinstance(value, IndentationAdapter):
+            return _RemoteLogger(value.logger.name, value.extra)
+        elif np is not None and isinstance(value, np.ndarray) and not value.dtype.hasobject:
+            return self._share(value)
+        return value
+
+    def _share(self, array: Any) -> Any:
+        handle = _segment_of(array)
+        if handle is not None:
+            return handle
+        if not array.nbytes or array.nbytes < self.min_shared_bytes:
+            return array
+
+        path = os.path.join(_segment_directory(), uuid.uuid4().hex)
+        segment = np.memmap(path, dtype=array.dtype, mode='w+', shape=array.shape)
+        segment[...] = array
+        segment.flush()
+        self.created.append(path)
+        return SharedArray(path, array.dtype.str, array.shape, segment.strides, 0)
+
+
+def _decode(value: Any, attach: Callable[[SharedArray], Any]) -> Any:
+    if isinstance(value, (list, tuple)) and type(value) in (list, tuple):
+        return type(value)(_decode(v, attach) for v in value)
+    elif type(value) is dict:
+        return {k: _decode(v, attach) for k, v in value.items()}
+    elif isinstance(value, SharedArray):
+        return attach(value)
+    elif isinstance(value, (_RemoteDeadline, _RemoteLogger)):
+        return value.restore()
+    return value
+
+
+class _RemoteDeadline:
+    def __init__(self, remaining: float) -> None:
+        self.remaining = remaining
+
+    def restore(self) -> Deadline:
+        return Deadline(self.remaining)
+
+
+class _RemoteLogger:
+    def __init__(self, name: str, extra: Dict) -> None:
+        self.name = name
+        self.extra = extra
+
+    def restore(self) -> IndentationAdapter:
+        return IndentationAdapter(logging.getLogger(self.name), self.extra)
+
+
+def _execute(step: Callable, args: tuple, kwargs: Dict, min_shared_bytes: int, directory: str) -> Any:
+    """Executed in the worker process: inputs are mapped copy-on-write, large outputs are
+    handed back in new segments which the calling process takes ownership of."""
+    global _worker_directory
+    _worker_directory = directory
+    del _worker_created[:]
+
+    returned: List[str] = []
+    try:
+        args = _decode(args, lambda handle: handle.attach(mode='c'))
+        kwargs = _decode(kwargs, lambda handle: handle.attach(mode='c'))
+        result = _Encoder(min_shared_bytes).encode(step(*args, **kwargs))
+        _decode(result, lambda handle: returned.append(handle.path))
+        return result
+    finally:
+        # segments allocated by the step but not returned are not owned by anyone
+        for path in set(_worker_created) - set(returned):
+            os.remove(path)
+        del _worker_created[:]
+
+
+class _InProcess(_StepWrapper):
+    """Step wrapper executing the step in a worker process."""
+
+    def __init__(self, step: Callable, executor: Optional[Any], max_workers: Optional[int],
+                 min_shared_bytes: int) -> None:
+        super().__init__(step)
+        self._executor = executor
+        self._max_workers = max_workers
+        self._min_shared_bytes = min_shared_bytes
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> Any:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self._max_workers)
+            return self._executor
+
+    def __call__(self, *args, **kwargs):
+        step = self._bind()
+        deadline = kwargs.get(DEADLINE_KEY)
+        deadline = deadline if isinstance(deadline, Deadline) else None
+
+        encoder = _Encoder(self._min_shared_bytes)
+        args, kwargs = encoder.encode(args), encoder.encode(kwargs)
+        for path in encoder.created:
+            _acquire(path)
+
+        try:
+            future = self.executor.submit(_execute, step, args, kwargs, self._min_shared_bytes,
+                                          _segment_directory())
+            if deadline is None:
+                result = future.result()
+            else:
+                deadline.add_cancel_callback(future.cancel)
+                try:
+                    result = future.result(timeout=deadline.remaining())
+                except TimeoutError:
+                    future.cancel()
+                    deadline.check(_identifier(self))
+                    raise  # pragma: no cover
+                finally:
+                    deadline.remove_cancel_callback(future.cancel)
+        finally:
+            for path in encoder.created:
+                _release(path)
+
+        return _decode(result, _adopt)
+
+
+def in_process(executor: Optional[Any]=None,
+               max_workers: Optional[int]=None,
+               min_shared_bytes: int=_DEFAULT_MIN_SHARED_BYTES):
+    """
+    Decorator to execute a step in a worker process, e.g. to work around the GIL. The step
+    has to be picklable, i.e. defined at module level. When the run's `deadline` expires
+    the step is cancelled if it has not started yet, otherwise its result is ignored.
+
+    numpy arrays of at least `min_shared_bytes` in the step's positional arguments, meta
+    and outputs (including inside lists, tuples and dicts) are handed over through
+    memory-mapped segments rather than pickled: inputs are copied into a segment once,
+    or not at all when they are held in one already (see `shared_array`), and mapped
+    copy-on-write by the worker; outputs are copied into a segment by the worker, or
+    not at all when allocated with `shared_array`, and mapped by the caller. Segments
+    are reference counted and removed once no array refers to them.
+
+    Parameters
+    ----------
+    executor : concurrent.futures.Executor
+        process pool to use, a pool of `max_workers` processes is created otherwise
+    max_workers : int
+        number of worker processes when no executor is given
+    min_shared_bytes : int
+        size from which arrays are handed over through segments
+
+    Returns
+    -------
+    Callable
+        decorator returning the step executed in a worker process
+    """
+    def decorated(step):
+        return _InProcess(step, executor, max_workers, min_shared_bytes)
+    return decorated
@@ -0,0 +1,229 @@
+import gc
+import os
+import pickle
+import time
+import numpy as np
+import pytest
+from concurrent.futures import ProcessPoolExecutor
+from pakkr import Pipeline, returns
+from pakkr.deadline import Deadline
+from pakkr.exception import PakkrError, PakkrTimeoutError
+import pakkr.process
+from pakkr.logging import IndentationAdapter
+from pakkr.process import (_decode,
+                           _Encoder,
+                           _execute,
+                           _segment_directory,
+                           _segment_of,
+                           _segments,
+                           in_process,
+                           shared_array,
+                           SharedArray)
+
+_executor = ProcessPoolExecutor(max_workers=1)
+
+
+@returns(np.ndarray, total=float)
+def double(features, offset):
+    features *= 2  # inputs are mapped copy-on-write
+    return features + offset, {'total': float(features.sum())}
+
+
+@returns(np.ndarray)
+def allocate_shared(n):
+    array = shared_array((n,), dtype=np.int64)
+    array[:] = np.arange(n)
+    return array
+
+
+@returns(dict)
+def describe(arrays, deadline, logger):
+    logger.info("describing")
+    return {'pid': os.getpid(), 'shapes': [a.shape for a in arrays], 'remaining': deadline.remaining()}
+
+
+def open_memmap(path):
+    return np.memmap(path, dtype=np.float64, mode='r+')  # pragma: no cover
+
+
+def allocate_dropped(n):
+    shared_array((n,))
+    return n
+
+
+def sleep(seconds, deadline):
+    time.sleep(seconds)  # pragma: no cover
+
+
+def fail():
+    raise ValueError("failed in a worker")  # pragma: no cover
+
+
+def test_in_process():
+    features = np.ones((100, 10))
+    pipeline = Pipeline(in_process(executor=_executor, min_shared_bytes=0)(double),
+                        lambda features, total: (features, total))
+
+    result, total = pipeline(features, offset=1)
+    assert np.array_equal(result, np.full((100, 10), 3.0))
+    assert total == 2000.0
+    assert np.array_equal(features, np.ones((100, 10)))
+    assert _segment_of(result) is not None
+
+
+def test_in_process_shared_outputs():
+    result = Pipeline(in_process(executor=_executor, min_shared_bytes=0)(allocate_shared))(5)
+    assert np.array_equal(result, np.arange(5))
+
+    handle = _segment_of(result)
+    assert _segments[handle.path] == 1
+    del result
+    gc.collect()
+    assert handle.path not in _segments
+    assert not os.path.exists(handle.path)
+
+
+def test_in_process_nested_values_and_meta():
+    step = in_process(executor=_executor, min_shared_bytes=0)(describe)
+    described = Pipeline(step)([np.zeros(3), np.zeros((2, 2))], deadline=Deadline(10))
+    assert described['pid'] != os.getpid()
+    assert described['shapes'] == [(3,), (2, 2)]
+    assert 0 < described['remaining'] <= 10
+
+
+def test_in_process_removes_input_segments():
+    before = set(os.listdir(_segment_directory()))
+    step = in_process(executor=_executor, min_shared_bytes=0)(describe)
+    Pipeline(step)([np.zeros(3)], deadline=Deadline(10))
+    assert set(os.listdir(_segment_directory())) == before
+
+
+def test_in_process_deadline():
+    step = in_process(executor=_executor)(sleep)
+    with pytest.raises(PakkrTimeoutError):
+        Pipeline(step)(0.3, deadline=Deadline(0.1))
+
+    deadline = Deadline(10)
+    assert Pipeline(step)(0, deadline=deadline) is None
+    assert deadline._callbacks == []
+
+
+def test_in_process_user_memmap(tmpdir):
+    # memory-mapped files of users are copied, not taken over and removed as segments
+    path = str(tmpdir.join("data.bin"))
+    np.arange(4, dtype=np.float64).tofile(path)
+    user = np.memmap(path, dtype=np.float64, mode='r+')
+    assert _segment_of(user) is None
+
+    step = in_process(executor=_executor, min_shared_bytes=0)(open_memmap)
+    result = Pipeline(step)(path)
+    assert np.array_equal(result, np.arange(4))
+    del result
+    gc.collect()
+    assert os.path.exists(path)
+
+
+def test_in_process_dropped_segments():
+    before = set(os.listdir(_segment_directory()))
+    assert Pipeline(in_process(executor=_executor)(allocate_dropped))(4) == 4
+    assert set(os.listdir(_segment_directory())) == before
+
+
+def test_in_process_exception():
+    with pytest.raises(PakkrError) as e:
+        Pipeline(in_process(executor=_executor)(fail))()
+    assert str(e.value).startswith("failed in a worker")
+
+
+def test_in_process_pipeline():
+    inner = Pipeline(double, _name="inner")
+    pipeline = Pipeline(in_process(max_workers=1)(inner), lambda features, total: total)
+    assert pipeline(np.ones(4), offset=0) == 8.0
+
+
+def test_encoder():
+    encoder = _Encoder(min_shared_bytes=100)
+    small, large, objects = np.zeros(2), np.zeros(100), np.array([None] * 100)
+    encoded = encoder.encode((small, {'large': large}, [objects]))
+    assert encoded[0] is small
+    assert isinstance(encoded[1]['large'], SharedArray)
+    assert encoded[2][0] is objects
+    assert len(encoder.created) == 1
+    os.remove(encoder.created[0])
+
+
+def test_shared_array_views():
+    array = shared_array((4, 4))
+    array[:] = np.arange(16).reshape(4, 4)
+
+    handle = _segment_of(array[1:, ::2])
+    handle = pickle.loads(pickle.dumps(handle))
+    assert np.array_equal(handle.attach(), array[1:, ::2])
+
+    assert _segment_of(np.zeros(3)) is None
+
+
+def test_in_process_shared_inputs():
+    features = shared_array((10,))
+    features[:] = 1.0
+    step = in_process(executor=_executor)(double)
+    result, total = Pipeline(step, lambda features, total: (features, total))(features, offset=0)
+    assert total == 20.0
+    assert np.array_equal(features, np.ones(10))
+
+
+def test_release_shared_segment():
+    array = shared_array((2,))
+    path = _segment_of(array).path
+    view = SharedArray(path, array.dtype.str, (2,), (8,), 0)
+    from pakkr.process import _adopt
+    adopted = _adopt(view)
+    assert _segments[path] == 2
+    del array
+    gc.collect()
+    assert os.path.exists(path)
+    del adopted
+    gc.collect()
+    assert not os.path.exists(path)
+
+
+def test_remove_directory(tmpdir):
+    from pakkr.process import _remove_directory
+    directory = tmpdir.mkdir("segments")
+    _remove_directory(os.getpid() + 1, str(directory))
+    assert directory.exists()
+    _remove_directory(os.getpid(), str(directory))
+    assert not directory.exists()
+
+
+def test_execute():
+    """What a worker process does, executed in this process."""
+    directory = _segment_directory()
+    encoder = _Encoder(0)
+    args = encoder.encode(([np.ones(3)],))
+    kwargs = encoder.encode({'deadline': Deadline(10),
+                             'logger': IndentationAdapter(__import__('logging').getLogger('pakkr'), {})})
+    try:
+        result = _execute(describe, args, kwargs, 0, directory)
+        assert result['shapes'] == [(3,)]
+        assert 0 < result['remaining'] <= 10
+
+        features = np.ones(3)
+        result, meta = _execute(double, encoder.encode((features, 1)), {}, 0, directory)
+        assert np.array_equal(_decode(result, lambda h: h.attach()), np.full(3, 3.0))
+        assert np.array_equal(features, np.ones(3))
+        os.remove(result.path)
+
+        handle = _execute(allocate_shared, (4,), {}, 0, directory)
+        assert isinstance(handle, SharedArray)
+        assert os.path.dirname(handle.path) == directory
+        assert np.array_equal(_decode(handle, lambda h: h.attach()), np.arange(4))
+        os.remove(handle.path)
+
+        before = set(os.listdir(directory))
+        assert _execute(allocate_dropped, (4,), {}, 0, directory) == 4
+        assert set(os.listdir(directory)) == before
+    finally:
+        pakkr.process._worker_directory = None
+        for path in encoder.created:
+            os.remove(path)
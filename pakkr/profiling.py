@@ -0,0 +1,130 @@
+import cProfile
+import hashlib
+import os
+import pstats
+import re
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Tuple
+
+
+class StepProfiler:
+    """
+    Profiles every step of a Pipeline separately with cProfile, aggregating the profiles of
+    a step across runs. Steps are keyed by the path of pakkr identifiers leading to them,
+    e.g. '"inner"<Pipeline>;"load"<function>' for a step of a nested Pipeline, so that the
+    time spent executing a nested Pipeline's steps is attributed to them rather than to
+    the nested Pipeline.
+
+    Only the thread executing a step is profiled, i.e. not the worker threads or processes
+    it hands work to.
+    """
+
+    def __init__(self) -> None:
+        self._stats: Dict[str, pstats.Stats] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def keys(self) -> List[str]:
+        """Keys of the steps profiled so far, in the order they first completed."""
+        with self._lock:
+            return list(self._stats)
+
+    def stats(self, key: str) -> pstats.Stats:
+        """Aggregated profile of the step `key`."""
+        with self._lock:
+            return self._stats[key]
+
+    @contextmanager
+    def profile(self, identifier: str) -> Iterator[None]:
+        """Profile the execution of a step, pausing the profile of the enclosing step."""
+        stack: List[Tuple[str, cProfile.Profile]] = self._local.__dict__.setdefault('stack', [])
+        key = stack[-1][0] + ';' + identifier if stack else identifier
+        if stack:
+            stack[-1][1].disable()
+
+        profile = cProfile.Profile()
+        stack.append((key, profile))
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            stack.pop()
+            self._add(key, profile)
+            if stack:
+                stack[-1][1].enable()
+
+    def _add(self, key: str, profile: cProfile.Profile) -> None:
+        with self._lock:
+            if key in self._stats:
+                self._stats[key].add(profile)
+            else:
+                self._stats[key] = pstats.Stats(profile)
+
+    def collapsed(self) -> str:
+        """
+        Aggregated profiles in the collapsed stack format of flamegraph.pl and compatible
+        tools, one line per stack prefixed with the step's key, weighted in microseconds.
+        Stacks are reconstructed from cProfile's caller/callee graph, splitting the time of
+        a function shared by several callers in proportion to each caller's share.
+        """
+        lines: List[str] = []
+        for key in self.keys():
+            weights: Dict[str, int] = {}
+            _collapse(self.stats(key), key, weights)
+            lines.extend('{} {}'.format(stack, weight) for stack, weight in weights.items() if weight > 0)
+        return '\n'.join(lines) + ('\n' if lines else '')
+
+    def dump(self, directory: str) -> List[str]:
+        """
+        Write the aggregated profile of every step as a pstats file, which `pstats.Stats`
+        or snakeviz can load, and the collapsed stacks of all steps as `collapsed.txt`.
+
+        Returns
+        -------
+        List[str]
+            paths of the files written
+        """
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+        for key in self.keys():
+            paths.append(os.path.join(directory, _filename(key) + '.pstats'))
+            self.stats(key).dump_stats(paths[-1])
+
+        paths.append(os.path.join(directory, 'collapsed.txt'))
+        with open(paths[-1], 'w') as f:
+            f.write(self.collapsed())
+        return paths
+
+
+def _filename(key: str) -> str:
+    readable = re.sub(r'[^A-Za-z0-9_.-]+', '_', key).strip('_')[:100]
+    return '{}-{}'.format(readable, hashlib.sha1(key.encode()).hexdigest()[:8])
+
+
+def _label(func: Tuple[str, int, str]) -> str:
+    filename, line, name = func
+    if filename == '~':  # builtins
+        return name
+    return '{}:{}({})'.format(os.path.basename(filename), line, name)
+
+
+def _collapse(stats: pstats.Stats, prefix: str, weights: Dict[str, int]) -> None:
+    entries = stats.stats  # type: ignore
+    callees: Dict = {}
+    for func, (_, _, _, _, callers) in entries.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, {})[func] = edge[3]
+
+    def visit(func, stack: str, path: frozenset, share: float) -> None:
+        stack = stack + ';' + _label(func)
+        weights[stack] = weights.get(stack, 0) + int(round(entries[func][2] * share * 1e6))
+        for callee, edge_time in callees.get(func, {}).items():
+            # stacks weighing less than a microsecond are pruned, recursion is cut short
+            if callee not in path and edge_time * share >= 1e-6:
+                visit(callee, stack, path | {callee}, share * edge_time / entries[callee][3])
+
+    for func, (_, _, _, _, callers) in entries.items():
+        if not callers:
+            visit(func, prefix, frozenset([func]), 1.0)
@@ -0,0 +1,45 @@
+import pstats
+from pakkr import Pipeline
+from pakkr.profiling import StepProfiler
+
+
+def _busy(n):
+    return sum(i * i for i in range(n))
+
+
+def load(n):
+    return _busy(n)
+
+
+def train(x):
+    return _busy(20000) + x
+
+
+def test_profiler(tmpdir):
+    profiler = StepProfiler()
+    inner = Pipeline(train, _name="fit")
+    pipeline = Pipeline(load, inner, _profiler=profiler)
+    for _ in range(3):
+        pipeline(20000)
+
+    assert profiler.keys() == ['"load"<function>', '"fit"<Pipeline>;"train"<function>', '"fit"<Pipeline>']
+    assert profiler.stats('"load"<function>').total_calls > 0
+    train_functions = [func[2] for func in profiler.stats('"fit"<Pipeline>;"train"<function>').stats]
+    assert 'train' in train_functions and '_busy' in train_functions
+    assert 'load' not in train_functions
+    assert 'train' not in [func[2] for func in profiler.stats('"fit"<Pipeline>').stats]
+
+    collapsed = profiler.collapsed()
+    assert any(line.startswith('"fit"<Pipeline>;"train"<function>;') and '(train);' in line and
+               '(_busy)' in line for line in collapsed.splitlines())
+    assert all(int(line.rsplit(' ', 1)[1]) > 0 for line in collapsed.splitlines())
+
+    paths = profiler.dump(str(tmpdir.join('profiles')))
+    assert len(paths) == 4
+    assert paths[-1].endswith('collapsed.txt')
+    assert open(paths[-1]).read() == collapsed
+    assert pstats.Stats(paths[0]).total_calls == profiler.stats('"load"<function>').total_calls
+
+
+def test_profiler_nothing_profiled():
+    assert StepProfiler().collapsed() == ''
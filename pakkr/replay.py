@@ -0,0 +1,148 @@
+import os
+import pickle
+import re
+import statistics
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from pakkr.deadline import DEADLINE_KEY
+from pakkr.pipeline import Pipeline, _identifier
+
+_NOT_RECORDED = ('logger', DEADLINE_KEY)
+_CAPTURE = Tuple[str, Optional[bytes]]
+
+
+class StepRecorder:
+    """
+    Captures the positional inputs of every step of the runs of named Pipelines given this
+    recorder as `_recorder`, and the meta each step was injected, to a pickle file per run
+    in a local directory, so that steps can be replayed in isolation with `replay`. Only
+    the last `max_runs` runs of a Pipeline are kept.
+
+    Inputs are pickled before the step is executed, so steps mutating their inputs are
+    captured as they were given them; steps whose inputs cannot be pickled are not captured.
+    """
+
+    def __init__(self, directory: str, max_runs: int=1) -> None:
+        if max_runs < 1:
+            raise RuntimeError("Number of runs kept should be at least 1, got {}.".format(max_runs))
+        self.directory = directory
+        self.max_runs = max_runs
+        self._lock = threading.Lock()
+
+    def _directory(self, pipeline: str) -> str:
+        return os.path.join(self.directory, re.sub(r'[^A-Za-z0-9_.-]+', '_', pipeline))
+
+    def capture(self, args: Tuple, opts: Dict) -> Optional[bytes]:
+        """Pickled inputs of a step, or None when they cannot be pickled."""
+        opts = {key: value for key, value in opts.items() if key not in _NOT_RECORDED}
+        try:
+            return pickle.dumps((tuple(args), opts), protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            return None
+
+    def record(self, pipeline: str, captures: Sequence[Optional[_CAPTURE]]) -> None:
+        """Persist the captures of a run, the identifier and pickled inputs of every step in
+        order, or None for steps which were not executed."""
+        directory = self._directory(pipeline)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(list(captures), f, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            runs = self._runs(directory)
+            os.replace(tmp_path, os.path.join(directory, '{:012d}.pkl'.format(runs[-1] + 1 if runs else 0)))
+            for run in runs[:len(runs) + 1 - self.max_runs]:
+                os.remove(os.path.join(directory, '{:012d}.pkl'.format(run)))
+
+    @staticmethod
+    def _runs(directory: str) -> List[int]:
+        return sorted(int(name[:-4]) for name in os.listdir(directory) if re.match(r'^\d+\.pkl$', name))
+
+    def captures(self, pipeline: str, run: int=-1) -> List[Optional[_CAPTURE]]:
+        """Captures of the `run`-th kept run of a Pipeline, the last one by default."""
+        directory = self._directory(pipeline)
+        runs = self._runs(directory) if os.path.isdir(directory) else []
+        if not runs:
+            raise RuntimeError("No run of '{}' was recorded.".format(pipeline))
+        with open(os.path.join(directory, '{:012d}.pkl'.format(runs[run])), 'rb') as f:
+            return pickle.load(f)
+
+
+class ReplayStats(NamedTuple):
+    """Durations, in seconds, of the repeated executions of a slice of steps."""
+    steps: Tuple[str, ...]
+    times: Tuple[float, ...]
+
+    @property
+    def mean(self) -> float:
+        return statistics.mean(self.times)
+
+    @property
+    def stdev(self) -> float:
+        return statistics.stdev(self.times) if len(self.times) > 1 else 0.0
+
+    @property
+    def median(self) -> float:
+        return statistics.median(self.times)
+
+    def __str__(self) -> str:
+        return '{}: {} runs, mean {:.6f}s, stdev {:.6f}s, min {:.6f}s, median {:.6f}s, max {:.6f}s'.format(
+            ' -> '.join(self.steps), len(self.times), self.mean, self.stdev, min(self.times), self.median,
+            max(self.times))
+
+
+def replay(pipeline: Pipeline,
+           start: int,
+           stop: Optional[int]=None,
+           repeat: int=10,
+           warmup: int=1,
+           recorder: Optional[StepRecorder]=None,
+           run: int=-1) -> ReplayStats:
+    """
+    Execute the steps of a Pipeline from position `start` up to, excluding, `stop`, the
+    single step `start` by default, `repeat` times against the inputs captured by
+    `recorder`, the Pipeline's own `_recorder` by default, and time every execution.
+
+    The slice is given the positional inputs captured for its first step and the meta
+    captured for all of its steps, the meta produced by a step of the slice overriding the
+    captured one as in a run. Inputs are unpickled afresh, outside of the timed section,
+    for every execution.
+
+    Raises
+    ------
+    RuntimeError
+        when the steps were not captured or were captured with other steps
+    """
+    if repeat < 1:
+        raise RuntimeError("Number of executions should be at least 1, got {}.".format(repeat))
+    recorder = recorder if recorder is not None else pipeline._recorder
+    if recorder is None:
+        raise RuntimeError("No recorder to replay {} from.".format(_identifier(pipeline)))
+    stop = start + 1 if stop is None else stop
+    steps = pipeline._steps[start:stop]
+    if not steps or start < 0:
+        raise RuntimeError("No step of {} between {} and {}.".format(_identifier(pipeline), start, stop))
+
+    captures = recorder.captures(pipeline._name, run)[start:stop]
+    for step, capture in zip(steps, captures):
+        if capture is None or capture[0] != _identifier(step) or capture[1] is None:
+            raise RuntimeError("Inputs of {} were not captured.".format(_identifier(step)))
+
+    def inputs() -> Tuple[Tuple, Dict]:
+        meta: Dict[str, Any] = {}
+        for _, data in reversed(captures):
+            meta.update(pickle.loads(data)[1])  # type: ignore
+        return pickle.loads(captures[0][1])[0], meta  # type: ignore
+
+    sliced = Pipeline(*steps, _name='{}[{}:{}]'.format(pipeline._name, start, stop), _suppress_timing_logs=True)
+    times = []
+    for iteration in range(warmup + repeat):
+        args, meta = inputs()
+        started = time.perf_counter()
+        sliced(*args, **meta)
+        if iteration >= warmup:
+            times.append(time.perf_counter() - started)
+    return ReplayStats(tuple(_identifier(step) for step in steps), tuple(times))
@@ -0,0 +1,126 @@
+import threading
+import pytest
+from pakkr import Pipeline, returns
+from pakkr.exception import PakkrError
+from pakkr.replay import replay, ReplayStats, StepRecorder
+
+
+class _Steps:
+    def __init__(self):
+        self.calls = []
+
+        @returns(list, scale=int)
+        def load(path, factor):
+            self.calls.append(('load', path))
+            return [1, 2, 3], {'scale': factor}
+
+        @returns(list)
+        def normalise(data, scale):
+            self.calls.append(('normalise', list(data), scale))
+            data.append(0)  # mutating the inputs does not change the capture
+            return [x * scale for x in data]
+
+        @returns(int)
+        def total(data, offset=0):
+            self.calls.append(('total', list(data), offset))
+            return sum(data) + offset
+
+        self.steps = (load, normalise, total)
+
+
+def test_record_and_replay(tmpdir):
+    steps = _Steps()
+    recorder = StepRecorder(str(tmpdir))
+    pipeline = Pipeline(*steps.steps, _name='nightly', _recorder=recorder)
+    assert pipeline('data.csv', factor=2, offset=1) == 13
+
+    steps.calls = []
+    stats = replay(pipeline, 1, repeat=3, warmup=2)
+    assert stats.steps == ('"normalise"<function>',)
+    assert len(stats.times) == 3 and all(t >= 0 for t in stats.times)
+    assert steps.calls == [('normalise', [1, 2, 3], 2)] * 5
+
+    # a slice is given the meta captured for all its steps, produced meta overriding it
+    steps.calls = []
+    stats = replay(pipeline, 0, 3, repeat=1, warmup=0)
+    assert stats.steps == ('"load"<function>', '"normalise"<function>', '"total"<function>')
+    assert steps.calls == [('load', 'data.csv'), ('normalise', [1, 2, 3], 2), ('total', [2, 4, 6, 0], 1)]
+
+    assert stats.stdev == 0.0
+    assert str(stats).startswith('"load"<function> -> "normalise"<function> -> "total"<function>: 1 runs, mean ')
+    assert ReplayStats(('s',), (1.0, 3.0)).stdev == pytest.approx(2 ** 0.5)
+    assert ReplayStats(('s',), (1.0, 3.0)).median == 2.0
+
+
+def test_record_repeated_steps(tmpdir):
+    calls = []
+
+    def inc(x):
+        calls.append(x)
+        return x + 1
+
+    pipeline = Pipeline(inc, inc, _name='twice', _recorder=StepRecorder(str(tmpdir)))
+    assert pipeline(1) == 3
+
+    calls.clear()
+    assert replay(pipeline, 0, repeat=1, warmup=0).steps == ('"inc"<function>',)
+    replay(pipeline, 1, repeat=1, warmup=0)
+    assert calls == [1, 2]
+
+
+def test_recorder_keeps_last_runs(tmpdir):
+    steps = _Steps()
+    recorder = StepRecorder(str(tmpdir), max_runs=2)
+    pipeline = Pipeline(*steps.steps, _name='nightly', _recorder=recorder)
+    for factor in (1, 2, 3):
+        pipeline('data.csv', factor=factor)
+    assert len(tmpdir.join('nightly').listdir()) == 2
+
+    steps.calls = []
+    replay(pipeline, 1, repeat=1, warmup=0, run=0)
+    replay(pipeline, 1, repeat=1, warmup=0)
+    assert [call[2] for call in steps.calls] == [2, 3]
+
+    # failed runs are captured too, including the inputs of the failed step
+    with pytest.raises(PakkrError):
+        pipeline('data.csv', factor=4, offset='x')
+    steps.calls = []
+    with pytest.raises(PakkrError):
+        replay(pipeline, 2, repeat=1, warmup=0)
+    assert steps.calls == [('total', [4, 8, 12, 0], 'x')]
+
+    with pytest.raises(RuntimeError) as e:
+        StepRecorder(str(tmpdir), max_runs=0)
+    assert str(e.value) == "Number of runs kept should be at least 1, got 0."
+
+
+def test_replay_errors(tmpdir):
+    steps = _Steps()
+    recorder = StepRecorder(str(tmpdir))
+
+    with pytest.raises(RuntimeError) as e:
+        Pipeline(*steps.steps, _recorder=recorder)
+    assert str(e.value) == "A Pipeline capturing its steps' inputs should be given a _name."
+
+    pipeline = Pipeline(*steps.steps, _name='nightly', _recorder=recorder)
+    with pytest.raises(RuntimeError) as e:
+        replay(pipeline, 0)
+    assert str(e.value) == "No run of 'nightly' was recorded."
+
+    locked = Pipeline(lambda lock: lock, _name='locked', _recorder=recorder)
+    locked(threading.Lock())
+    with pytest.raises(RuntimeError) as e:
+        replay(locked, 0)
+    assert str(e.value) == 'Inputs of "<lambda>"<function> were not captured.'
+
+    with pytest.raises(RuntimeError) as e:
+        replay(Pipeline(*steps.steps, _name='nightly'), 0)
+    assert str(e.value) == 'No recorder to replay "nightly"<Pipeline> from.'
+
+    with pytest.raises(RuntimeError) as e:
+        replay(pipeline, 3)
+    assert str(e.value) == 'No step of "nightly"<Pipeline> between 3 and 4.'
+
+    with pytest.raises(RuntimeError) as e:
+        replay(pipeline, 0, repeat=0)
+    assert str(e.value) == "Number of executions should be at least 1, got 0."
@@ -0,0 +1,199 @@
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional
+
+from pakkr.deadline import Deadline
+
+ATTR_RESOURCES = "__pakkr_resources__"
+
+
+class Resources(NamedTuple):
+    """Resources a step needs while executing; memory is in bytes."""
+    cores: float = 1
+    memory: int = 0
+    gpus: int = 0
+    exclusive: bool = False
+
+
+class _Ticket(NamedTuple):
+    """A step waiting for resources, on behalf of a run with the given priority and tenant."""
+    priority: int
+    tenant: Optional[str]
+    sequence: int
+
+
+def resources(cores: float=1, memory: int=0, gpus: int=0, exclusive: bool=False):
+    """
+    Decorator to add the __pakkr_resources__ attribute to the object being decorated,
+    declaring what it needs to a Pipeline's ResourceScheduler.
+
+    Parameters
+    ----------
+    cores : float
+        number of cores the step keeps busy
+    memory : int
+        peak memory, in bytes, the step allocates
+    gpus : int
+        number of GPUs the step uses
+    exclusive : bool
+        whether no other step may execute at the same time, e.g. a step using every GPU
+        or saturating the memory bandwidth
+    """
+    requirements = Resources(cores, memory, gpus, exclusive)
+    if min(cores, memory, gpus) < 0:
+        raise RuntimeError("Resources should not be negative, got {}.".format(requirements))
+
+    def decorated(obj):
+        setattr(obj, ATTR_RESOURCES, requirements)
+        return obj
+    return decorated
+
+
+class ResourceScheduler:
+    """
+    Admits steps declaring their resources with `@resources` only while the resources
+    they need are available, so that concurrent runs of Pipelines (e.g. `Pipeline.map`)
+    or concurrent steps cannot, say, run two memory heavy steps at once. Steps not
+    declaring resources are executed right away, unless `undeclared` is given.
+
+    Waiting steps are admitted one at a time, so a large step is not starved by smaller
+    ones, in order of the priority of their run, then of the number of steps of their
+    run's tenant executing, so that tenants share the resources fairly, then of arrival.
+    Runs are given a priority and a tenant with `_priority` and `_tenant`, e.g.
+    `pipeline(x, _priority=10, _tenant='alice')` or `pipeline.map(xs, _tenant='batch')`.
+
+    Parameters
+    ----------
+    cores : float
+        cores available to steps, the number of CPUs by default
+    memory : int
+        memory, in bytes, available to steps, the physical memory by default
+    gpus : int
+        GPUs available to steps
+    undeclared : Resources
+        resources of the steps not declaring any, e.g. `Resources(cores=1)` to bound and
+        prioritise every step; nested Pipelines are never admitted as a whole
+    """
+
+    def __init__(self, cores: Optional[float]=None, memory: Optional[int]=None, gpus: int=0,
+                 undeclared: Optional[Resources]=None) -> None:
+        cores = (os.cpu_count() or 1) if cores is None else cores
+        memory = _physical_memory() if memory is None else memory
+        self.capacity = Resources(cores, memory, gpus, False)
+        self.undeclared = undeclared
+        self._available = self.capacity
+        self._running = 0
+        self._exclusive = False
+        self._waiting: List[_Ticket] = []
+        self._sequence = itertools.count()
+        self._executing: Dict[Optional[str], int] = {}
+        self._stats: Dict[Optional[str], Dict[str, Any]] = {}
+        self._condition = threading.Condition()
+        self._local = threading.local()
+
+    @property
+    def available(self) -> Resources:
+        with self._condition:
+            return self._available
+
+    def stats(self) -> Dict[Optional[str], Dict[str, Any]]:
+        """Per tenant, None for runs without one: number of steps admitted, total and
+        longest seconds they waited to be."""
+        with self._condition:
+            return {tenant: dict(stats) for tenant, stats in self._stats.items()}
+
+    @contextmanager
+    def admit(self, requirements: Resources, deadline: Optional[Deadline]=None,
+              identifier: str="step", priority: int=0, tenant: Optional[str]=None) -> Iterator[float]:
+        """
+        Wait until `requirements` are available and hold them until the context exits.
+        Steps executed while holding resources, e.g. steps of a nested Pipeline, are
+        covered by them and admitted right away.
+
+        Returns
+        -------
+        float
+            seconds waited until the requirements were available, as the context's value
+
+        Raises
+        ------
+        RuntimeError
+            when the requirements exceed the scheduler's capacity
+        PakkrTimeoutError
+            when the deadline expires before the requirements are available
+        """
+        if getattr(self._local, 'holding', False):
+            yield 0.0
+            return
+
+        if any(need > total for need, total in zip(requirements[:3], self.capacity[:3])):
+            msg = "{} requires {} but the scheduler's capacity is {}."
+            raise RuntimeError(msg.format(identifier, requirements, self.capacity))
+
+        waited = self._acquire(requirements, deadline, identifier, priority, tenant)
+        self._local.holding = True
+        try:
+            yield waited
+        finally:
+            self._local.holding = False
+            self._release(requirements, tenant)
+
+    def _fits(self, requirements: Resources) -> bool:
+        if self._exclusive or (requirements.exclusive and self._running):
+            return False
+        return all(need <= free for need, free in zip(requirements[:3], self._available[:3]))
+
+    def _next(self) -> _Ticket:
+        return min(self._waiting, key=lambda ticket: (-ticket.priority, self._executing.get(ticket.tenant, 0),
+                                                      ticket.sequence))
+
+    def _acquire(self, requirements: Resources, deadline: Optional[Deadline], identifier: str,
+                 priority: int, tenant: Optional[str]) -> float:
+        started = time.perf_counter()
+        with self._condition:
+            ticket = _Ticket(priority, tenant, next(self._sequence))
+            self._waiting.append(ticket)
+            try:
+                while not (self._next() is ticket and self._fits(requirements)):
+                    if deadline is not None:
+                        deadline.check(identifier)
+                    self._condition.wait(None if deadline is None else deadline.remaining())
+            except BaseException:
+                self._waiting.remove(ticket)
+                self._condition.notify_all()
+                raise
+
+            self._waiting.remove(ticket)
+            self._available = Resources(*(free - need for free, need in zip(self._available[:3],
+                                                                            requirements[:3])), False)
+            self._running += 1
+            self._executing[tenant] = self._executing.get(tenant, 0) + 1
+            self._exclusive = requirements.exclusive
+            waited = time.perf_counter() - started
+            stats = self._stats.setdefault(tenant, {'admitted': 0, 'queue_wait': 0.0, 'max_queue_wait': 0.0})
+            stats['admitted'] += 1
+            stats['queue_wait'] += waited
+            stats['max_queue_wait'] = max(stats['max_queue_wait'], waited)
+            self._condition.notify_all()
+            return waited
+
+    def _release(self, requirements: Resources, tenant: Optional[str]) -> None:
+        with self._condition:
+            self._available = Resources(*(free + need for free, need in zip(self._available[:3],
+                                                                            requirements[:3])), False)
+            self._running -= 1
+            self._executing[tenant] -= 1
+            if not self._executing[tenant]:
+                del self._executing[tenant]
+            self._exclusive = False
+            self._condition.notify_all()
+
+
+def _physical_memory() -> int:
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (AttributeError, ValueError):  # pragma: no cover
+        return 1 << 62
@@ -0,0 +1,246 @@
+import threading
+import time
+import pytest
+from pakkr import Pipeline
+from pakkr.deadline import Deadline
+from pakkr.exception import PakkrError, PakkrTimeoutError
+from pakkr.metrics import MetricsRegistry
+from pakkr.resources import ATTR_RESOURCES, ResourceScheduler, Resources, resources
+
+
+class _Concurrency:
+    def __init__(self):
+        self.current = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, x):
+        with self._lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+        time.sleep(0.02)
+        with self._lock:
+            self.current -= 1
+        return x
+
+
+def test_resources():
+    step = resources(cores=2, memory=1024, exclusive=True)(lambda: None)
+    assert getattr(step, ATTR_RESOURCES) == Resources(2, 1024, 0, True)
+
+    with pytest.raises(RuntimeError) as e:
+        resources(memory=-1)
+    assert str(e.value) == "Resources should not be negative, got Resources(cores=1, memory=-1, gpus=0, exclusive=False)."
+
+
+def test_scheduler_memory():
+    concurrency = _Concurrency()
+    heavy = resources(memory=6)(concurrency)
+    pipeline = Pipeline(heavy, _scheduler=ResourceScheduler(cores=8, memory=10))
+
+    assert pipeline.map(range(4), _max_workers=4) == [0, 1, 2, 3]
+    assert concurrency.peak == 1
+    assert pipeline._scheduler.available == Resources(8, 10, 0, False)
+
+
+def test_scheduler_cores():
+    concurrency = _Concurrency()
+    pipeline = Pipeline(resources(cores=2)(concurrency), _scheduler=ResourceScheduler(cores=4))
+    assert pipeline.map(range(6), _max_workers=6) == list(range(6))
+    assert concurrency.peak == 2
+
+
+def test_scheduler_exclusive():
+    concurrency = _Concurrency()
+    overlaps = []
+
+    @resources(cores=0, exclusive=True)
+    def exclusive(x):
+        overlaps.append(concurrency.current)
+        return concurrency(x)
+
+    scheduler = ResourceScheduler(cores=4)
+    light_pipeline = Pipeline(resources(cores=0)(concurrency), _scheduler=scheduler)
+    exclusive_pipeline = Pipeline(exclusive, _scheduler=scheduler)
+
+    thread = threading.Thread(target=exclusive_pipeline.map, args=(range(3),))
+    thread.start()
+    assert light_pipeline.map(range(3)) == [0, 1, 2]
+    thread.join()
+    assert overlaps == [0, 0, 0]
+    assert concurrency.peak > 1
+
+
+def test_scheduler_undeclared_steps_are_not_throttled():
+    concurrency = _Concurrency()
+    pipeline = Pipeline(concurrency, _scheduler=ResourceScheduler(cores=1))
+    pipeline.map(range(4), _max_workers=4)
+    assert concurrency.peak > 1
+
+
+def test_scheduler_nested_pipeline():
+    concurrency = _Concurrency()
+    heavy = resources(memory=6)(concurrency)
+    inner = resources(memory=8)(Pipeline(heavy))
+    pipeline = Pipeline(inner, Pipeline(heavy), _scheduler=ResourceScheduler(memory=10))
+    assert pipeline.map(range(3), _max_workers=3) == [0, 1, 2]
+    assert concurrency.peak == 1
+
+
+def test_scheduler_capacity_exceeded():
+    pipeline = Pipeline(resources(gpus=2)(lambda: 1), _scheduler=ResourceScheduler(gpus=1))
+    with pytest.raises(PakkrError) as e:
+        pipeline()
+    assert str(e.value).startswith('"<lambda>"<function> requires Resources(cores=1, memory=0, gpus=2, '
+                                   'exclusive=False) but the scheduler\'s capacity is')
+
+
+def test_scheduler_deadline():
+    scheduler = ResourceScheduler(cores=1)
+    started = threading.Event()
+
+    release = threading.Event()
+
+    @resources(cores=1)
+    def slow():
+        started.set()
+        release.wait(1)
+
+    @resources(cores=1)
+    def waiting():
+        raise Exception("should not be executed")  # pragma: no cover
+
+    thread = threading.Thread(target=Pipeline(slow, _scheduler=scheduler))
+    thread.start()
+    started.wait()
+    with pytest.raises(PakkrTimeoutError):
+        Pipeline(waiting, _scheduler=scheduler)(deadline=Deadline(0.1))
+    release.set()
+    thread.join()
+    assert scheduler._waiting == type(scheduler._waiting)()
+    assert scheduler.available == scheduler.capacity
+
+
+def _wait_for(condition):
+    for _ in range(200):
+        if condition():
+            return
+        time.sleep(0.005)
+    raise AssertionError("timed out")  # pragma: no cover
+
+
+def test_scheduler_priority_and_queue_wait():
+    scheduler = ResourceScheduler(cores=1)
+    release = threading.Event()
+    started = threading.Event()
+    order = []
+
+    @resources(cores=1)
+    def hold():
+        started.set()
+        release.wait(1)
+
+    @resources(cores=1)
+    def work(name):
+        order.append(name)
+        return name
+
+    pipeline = Pipeline(work, _scheduler=scheduler)
+    waited = {}
+
+    def run(name, **tags):
+        assert pipeline(name, **tags) == name
+        waited[name] = pipeline.last_queue_wait
+
+    holder = threading.Thread(target=Pipeline(hold, _scheduler=scheduler))
+    holder.start()
+    started.wait()
+    threads = [threading.Thread(target=run, args=('batch',), kwargs={'_tenant': 'batch'}),
+               threading.Thread(target=run, args=('interactive',), kwargs={'_priority': 10, '_tenant': 'api'})]
+    for index, thread in enumerate(threads):
+        thread.start()
+        _wait_for(lambda: len(scheduler._waiting) == index + 1)
+    time.sleep(0.05)
+    release.set()
+    for thread in threads + [holder]:
+        thread.join()
+
+    assert order == ['interactive', 'batch']
+    assert waited['batch'] > waited['interactive'] >= 0.05
+    stats = scheduler.stats()
+    assert stats['batch']['admitted'] == stats['api']['admitted'] == 1
+    assert stats['batch']['queue_wait'] == stats['batch']['max_queue_wait'] == pytest.approx(waited['batch'])
+    assert stats[None]['admitted'] == 1
+    assert pipeline('again') == 'again' and pipeline.last_queue_wait < waited['interactive']
+
+
+def test_queue_wait_metrics():
+    # queue waits of runs in other threads, e.g. those of map, are reported per tenant and priority
+    registry = MetricsRegistry(buckets=(0.001, 1.0))
+
+    @resources(cores=1)
+    def work(item):
+        time.sleep(0.02)
+        return item
+
+    pipeline = Pipeline(work, _name='scored', _scheduler=ResourceScheduler(cores=1), _metrics=registry)
+    assert pipeline.map(range(4), _max_workers=4, _tenant='batch', _priority=1) == [0, 1, 2, 3]
+    assert pipeline(4) == 4
+
+    waits = registry.queue_waits()['scored']
+    assert set(waits) == {('batch', 1), ('', 0)}
+    assert waits[('batch', 1)]['count'] == 4 and waits[('batch', 1)]['sum'] >= 0.02 * (1 + 2 + 3) * 0.9
+    assert waits[('', 0)]['count'] == 1 and waits[('', 0)]['p50'] <= 0.001
+    lines = registry.render().splitlines()
+    assert 'pakkr_run_queue_wait_seconds_count{pipeline="scored",tenant="batch",priority="1"} 4' in lines
+    assert 'pakkr_run_queue_wait_seconds_count{pipeline="scored",tenant="",priority="0"} 1' in lines
+
+
+def test_scheduler_fair_share():
+    scheduler = ResourceScheduler(cores=2)
+    releases = {name: threading.Event() for name in ('batch-1', 'batch-2', 'batch-3', 'api')}
+    order = []
+
+    @resources(cores=1)
+    def work(name):
+        order.append(name)
+        releases[name].wait(1)
+
+    # the batch tenant holds both cores, and submitted first, but the next core goes to api
+    pipeline = Pipeline(work, _scheduler=scheduler)
+    batch = threading.Thread(target=pipeline.map, args=(['batch-1', 'batch-2', 'batch-3'],),
+                             kwargs={'_tenant': 'batch', '_max_workers': 3})
+    batch.start()
+    _wait_for(lambda: len(order) == 2 and len(scheduler._waiting) == 1)
+    api = threading.Thread(target=pipeline, args=('api',), kwargs={'_tenant': 'api'})
+    api.start()
+    _wait_for(lambda: len(scheduler._waiting) == 2)
+    releases[order[0]].set()
+    _wait_for(lambda: len(order) == 3)
+    assert order[2] == 'api'
+    for release in releases.values():
+        release.set()
+    batch.join()
+    api.join()
+    assert sorted(order) == sorted(releases)
+
+
+def test_scheduler_undeclared_steps():
+    concurrency = _Concurrency()
+    tags = []
+
+    def tenant(x):
+        from pakkr.pipeline import _thread_state
+        tags.append(_thread_state.tags)
+        return x
+
+    scheduler = ResourceScheduler(cores=1, undeclared=Resources(cores=1))
+    pipeline = Pipeline(Pipeline(concurrency, tenant), _scheduler=scheduler)
+    assert pipeline.map(range(4), _max_workers=4, _tenant='batch') == list(range(4))
+    assert concurrency.peak == 1
+    assert scheduler.stats()['batch']['admitted'] == 8
+    assert tags == [(0, 'batch')] * 4
+
+    Pipeline(Pipeline(tenant), _scheduler=scheduler)(0, _tenant='api', _priority=2)
+    Pipeline(Pipeline(tenant), _scheduler=scheduler)(0, _priority=3)
+    assert tags[-2:] == [(2, 'api'), (3, None)]
@@ -1,7 +1,11 @@
 from typing import Dict, Optional, Tuple
-import typing
 
 from ._return_type import _ReturnType
+from .validation import validators
+
+
+def _immutable(self, *args, **kwargs):
+    raise TypeError("_Meta is immutable.")
 
 
 class _Meta(dict, _ReturnType):
@@ -9,6 +13,9 @@ class _Meta(dict, _ReturnType):
     Class that interprets the return value(s) of a Callable as metadata.
     Return values are mapped to metadata using a dictionary containing the
     types of the return values keyed by the metadata key name.
+
+    Instances are immutable and hashable, so that they can be interned and
+    used as cache keys, see `pakkr.returns.returns.intern`.
     """
 
     def __init__(self, *args, **kwargs) -> None:
@@ -18,9 +25,20 @@ class _Meta(dict, _ReturnType):
         super().__init__(*args, **kwargs)
 
         for value in kwargs.values():
-            if not (hasattr(value, '__module__') and value.__module__ == 'typing'):
+            if not (hasattr(value, '__module__') and value.__module__ == 'typing' or hasattr(value, '__origin__')):
                 assert isinstance(value, type), f"Value '{value}' is not a type nor in typing types"
 
+        self._intern_key = (_Meta, tuple(self.items()))
+        self._checks = None
+
+    __setitem__ = __delitem__ = __ior__ = clear = pop = popitem = setdefault = update = _immutable
+
+    def __hash__(self):  # type: ignore
+        return hash(frozenset(self.items()))
+
+    def __reduce__(self):
+        return _from_items, (tuple(self.items()),)
+
     def parse_result(self, result: Dict) -> Tuple[Tuple, Dict]:
         """
         Verify the return value of a Callable matches what this instance describes.
@@ -51,16 +69,9 @@ class _Meta(dict, _ReturnType):
             msg += "Unexpected meta keys {}.".format(extra) if extra else ""
             raise RuntimeError(msg)
 
-        def _check_t(k, t):
-            if hasattr(t, '__origin__') and t.__origin__:
-                if t.__origin__ == typing.Union:
-                    return isinstance(result[k], t.__args__)
-                else:
-                    return isinstance(result[k], t.__origin__)  # i.e. List[int]
-            else:
-                return isinstance(result[k], t)
-
-        wrong_types = [(k, t, type(result[k])) for k, t in self.items() if not _check_t(k, t)]
+        self._checks = validators(self.values(), self._checks)
+        checks = self._checks[1]
+        wrong_types = [(k, t, type(result[k])) for check, (k, t) in zip(checks, self.items()) if not check(result[k])]
 
         if wrong_types:
             template = "key '{}' should be type {} but {} was returned"
@@ -126,3 +137,7 @@ class _Meta(dict, _ReturnType):
 
             meta[key] = item
         return (), meta
+
+
+def _from_items(items: Tuple) -> _Meta:
+    return _Meta(**dict(items))
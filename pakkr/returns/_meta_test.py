@@ -1,3 +1,4 @@
+import pickle
 from typing import Any, Callable, Dict, List, Optional, Tuple, Union, Generator
 
 import pytest
@@ -166,3 +167,19 @@ def test_meta_downcast_result():
     with pytest.raises(RuntimeError) as e:
         m.downcast_result(((), {'x': 'hello'}))
     assert str(e.value) == "'hello' is not of type <class 'int'>."
+
+
+def test_meta_immutable_and_hashable():
+    m = _Meta(x=int, y=str)
+    assert hash(m) == hash(_Meta(y=str, x=int))
+    assert {m: 1}[_Meta(x=int, y=str)] == 1
+
+    for mutate in (lambda: m.__setitem__('z', int), lambda: m.__delitem__('x'), lambda: m.update(z=int),
+                   lambda: m.pop('x'), lambda: m.popitem(), lambda: m.clear(), lambda: m.setdefault('z', int)):
+        with pytest.raises(TypeError) as e:
+            mutate()
+        assert str(e.value) == "_Meta is immutable."
+    assert m == {'x': int, 'y': str}
+
+    copied = pickle.loads(pickle.dumps(m))
+    assert copied == m and list(copied) == ['x', 'y']
@@ -70,5 +70,12 @@ class _NoReturn(_ReturnType):
     def __eq__(self, other):
         return isinstance(other, _NoReturn)
 
+    def __hash__(self):
+        return hash(_NoReturn)
+
+    @property
+    def _intern_key(self):
+        return (_NoReturn,)
+
     def __bool__(self):
         return False
@@ -45,3 +45,8 @@ def test_no_return_downcast_result():
     assert n.downcast_result(int) == ((), {})
     assert n.downcast_result(((1, "str"), {'x': True})) == ((), {})
     assert n.downcast_result({'x': True}) == ((), {})
+
+
+def test_no_return_hashable():
+    assert hash(_NoReturn()) == hash(_NoReturn())
+    assert len({_NoReturn(), _NoReturn()}) == 1
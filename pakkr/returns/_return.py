@@ -1,17 +1,18 @@
-from typing import Dict, Iterable, List, Optional, Tuple, Union
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 from ._meta import _Meta
 from ._no_return import _NoReturn
 from ._return_type import _ReturnType
+from .validation import validators
 
 
 class _Return(_ReturnType):
     """
     Class that describes how to interpret the return value(s) of a Callable.
     Positional arguments are treated as types of return value(s) and keyword
-    arguments are treated as metadata and their types.
+    arguments are treated as metadata and their types. Instances are immutable.
     """
-    __slots__ = ('values', 'meta', '_types')
+    __slots__ = ('values', 'meta', '_types', '_intern_key', '_checks')
 
     def __init__(self, values: Tuple, meta: Optional[_Meta]=None) -> None:
         if not values:
@@ -24,11 +25,14 @@ class _Return(_ReturnType):
             assert isinstance(meta, _Meta), f"meta '{meta}' is not an instance of _Meta"
 
         super().__init__()
-        self.values = tuple(values)
-        self.meta = meta
-        self._types = list(values)
+        _types = list(values)
         if meta:
-            self._types.append(meta)
+            _types.append(meta)
+        object.__setattr__(self, 'values', tuple(values))
+        object.__setattr__(self, 'meta', meta)
+        object.__setattr__(self, '_types', tuple(_types))
+        object.__setattr__(self, '_intern_key', (_Return, self.values, meta._intern_key if meta else None))
+        object.__setattr__(self, '_checks', None)
 
     def parse_result(self, result: Tuple[Tuple, Dict]) -> Tuple[Tuple, Dict]:
         """
@@ -61,23 +65,17 @@ class _Return(_ReturnType):
         else:
             _result = result
 
+        checks = validators(self.values, self._checks)
+        object.__setattr__(self, '_checks', checks)
         args: List = []
         meta: Dict = {}
         wrong_type_args = []
-        for item, _type in zip(_result, self._types):
+        for item, _type, check in zip(_result, self._types, checks[1] + (None,)):
             if hasattr(_type, "parse_result"):
                 sub_args, sub_meta = _type.parse_result(item)
                 args += sub_args
                 meta.update(sub_meta)
-            elif hasattr(_type, '__origin__') and _type.__origin__:
-                if (
-                        _type.__origin__ == Union and
-                        isinstance(item, _type.__args__)
-                ):
-                    args.append(item)
-                elif isinstance(item, _type.__origin__):
-                    args.append(item)
-            elif isinstance(item, _type):
+            elif check(item):
                 args.append(item)
             else:
                 wrong_type_args.append((item, _type))
@@ -153,7 +151,7 @@ class _Return(_ReturnType):
         new_values = []
         new_meta = None
         for value, _type in zip(values, self.values):
-            if isinstance(value, _type):
+            if _type is Any or isinstance(value, _type):
                 new_values.append(value)
             else:
                 raise RuntimeError("Cannot downcast {} to {}".format(values, self.values))
@@ -170,3 +168,12 @@ class _Return(_ReturnType):
         if isinstance(other, _Return):
             return self.values == other.values and self.meta == other.meta
         return False
+
+    def __hash__(self):
+        return hash((self.values, self.meta))
+
+    def __setattr__(self, name, value):
+        raise TypeError("_Return is immutable.")
+
+    def __reduce__(self):
+        return _Return, (self.values, self.meta)
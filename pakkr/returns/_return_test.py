@@ -1,4 +1,5 @@
-from typing import Callable, Generator, List, Optional, Union
+import pickle
+from typing import Any, Callable, Generator, List, Optional, Union
 
 import pytest
 
@@ -130,3 +131,21 @@ def test_return_downcast_result():
     with pytest.raises(RuntimeError) as e:
         r.downcast_result(([1, 2], {}))
     assert str(e.value) == "Cannot downcast [1, 2] to (<class 'int'>, <class 'str'>)"
+
+
+def test_any_values():
+    r = _Return([Any], _Meta(x=int))
+    assert r.parse_result(((1, 2), {'x': 1})) == (((1, 2),), {'x': 1})
+    assert r.downcast_result((("a",), {'x': 1})) == (("a",), {'x': 1})
+
+
+def test_return_immutable_and_hashable():
+    r = _Return([int], _Meta(x=str))
+    assert hash(r) == hash(_Return((int,), _Meta(x=str)))
+    assert hash(_Return([int])) == hash(_Return([int], None))
+
+    with pytest.raises(TypeError) as e:
+        r.values = (str,)
+    assert str(e.value) == "_Return is immutable."
+
+    assert pickle.loads(pickle.dumps(r)) == r
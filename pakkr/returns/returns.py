@@ -1,9 +1,90 @@
-from typing import Any
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Iterable, Optional, Tuple
 from pakkr.returns._meta import _Meta
 from pakkr.returns._no_return import _NoReturn
 from pakkr.returns._return import _Return
 from pakkr.returns._return_type import _ReturnType
 
+_MAX_ENTRIES = 4096
+
+
+class _LRU:
+    """Thread-safe mapping keeping its `max_entries` most recently used entries; raises
+    TypeError for unhashable keys as a dict does."""
+
+    def __init__(self, max_entries: int=_MAX_ENTRIES) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Any:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def setdefault(self, key: Hashable, value: Any) -> Any:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+            self._entries[key] = value
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return value
+
+
+# Descriptors are immutable, so equal ones are shared and what is derived from them is
+# computed once, as long as it is among the most recently used. Keys preserve the order
+# of meta keys, which equality ignores.
+_interned = _LRU()
+_collapsed = _LRU()
+_intersected = _LRU()
+_supersets = _LRU()
+
+
+def _key(ret) -> Hashable:
+    return getattr(ret, '_intern_key', ret)
+
+
+def intern(ret):
+    """The canonical instance of the return type descriptor `ret`, i.e. the first instance
+    interned which is equal to it; descriptors holding unhashable types are not interned."""
+    try:
+        return _interned.setdefault(_key(ret), ret)
+    except TypeError:
+        return ret
+
+
+def _memoised(cache: _LRU, function: Callable, returns: Iterable):
+    returns = tuple(returns)
+    key = tuple(_key(ret) for ret in returns)
+    try:
+        result = cache.get(key)
+    except TypeError:
+        return function(returns)
+    if result is None:
+        result = cache.setdefault(key, intern(function(returns)))
+    return result
+
+
+def assert_is_superset(ret: _ReturnType, _type: Optional[_ReturnType]) -> None:
+    """`ret.assert_is_superset(_type)`, remembering the pairs of types which passed."""
+    key: Optional[Tuple] = (_key(ret), _key(_type))
+    try:
+        known = _supersets.get(key) is not None
+    except TypeError:  # unhashable types
+        known, key = False, None
+    if not known:
+        ret.assert_is_superset(_type)
+        if key is not None:
+            _supersets.setdefault(key, True)
+
 
 def returns(*args, **kwargs):
     """Decorator to add the __pakkr_returns__ attribute to the object being decorated"""
@@ -13,6 +94,7 @@ def returns(*args, **kwargs):
         return_obj = _Meta(**kwargs)
     elif args:
         return_obj = _Return(args, _Meta(**kwargs) if kwargs else None)
+    return_obj = intern(return_obj)
 
     def decorated(obj):
         obj.__pakkr_returns__ = return_obj
@@ -22,6 +104,10 @@ def returns(*args, **kwargs):
 
 def collapse(returns):
     """Collapse or roll-up a sequence of "return" types into one"""
+    return _memoised(_collapsed, _collapse, returns)
+
+
+def _collapse(returns):
     final_args = [Any]
     final_meta = {}
 
@@ -45,3 +131,46 @@ def collapse(returns):
         return _Meta(**final_meta)
     else:
         return _NoReturn()
+
+
+def intersect(returns):
+    """Intersect a sequence of alternative "return" types into what all of them return"""
+    return _memoised(_intersected, _intersect, returns)
+
+
+def _intersect(returns):
+    if not returns or any(ret is Any for ret in returns):
+        return _Return([Any])
+
+    final_args = None
+    final_meta: dict = {}
+
+    for ret in returns:
+        if isinstance(ret, _Meta):
+            args, meta = (), dict(ret)
+        elif isinstance(ret, _Return):
+            args, meta = tuple(ret.values), dict(ret.meta or {})
+        elif isinstance(ret, _NoReturn):
+            args, meta = (), {}
+        else:
+            raise RuntimeError("Unexpected return type {}".format(ret))
+
+        if final_args is None:
+            final_args, final_meta = args, meta
+            continue
+
+        if final_args != args:
+            raise RuntimeError("Return values are not the same '{}' vs '{}'.".format(final_args, args))
+
+        conflicts = sorted(key for key in final_meta if key in meta and final_meta[key] != meta[key])
+        if conflicts:
+            raise RuntimeError("Meta keys {} are returned with different types.".format(conflicts))
+
+        final_meta = {key: _type for key, _type in final_meta.items() if key in meta}
+
+    if final_args:
+        return _Return(final_args, _Meta(**final_meta) if final_meta else None)
+    elif final_meta:
+        return _Meta(**final_meta)
+    else:
+        return _NoReturn()
@@ -2,7 +2,8 @@ import pytest
 from pakkr.returns._meta import _Meta
 from pakkr.returns._no_return import _NoReturn
 from pakkr.returns._return import _Return
-from pakkr.returns.returns import collapse, returns
+from pakkr.returns.returns import (_interned, _LRU, _MAX_ENTRIES, assert_is_superset, collapse, intern, intersect,
+                                   returns)
 from typing import Any
 
 
@@ -37,3 +38,75 @@ def test_collapse():
     with pytest.raises(RuntimeError) as e:
         collapse([int])
     assert str(e.value) == "Unexpected return type <class 'int'>"
+
+
+def test_intersect():
+    assert intersect([]) == _Return([Any])
+    assert intersect([_Meta(x=int), Any]) == _Return([Any])
+    assert intersect([_Meta(x=int)]) == _Meta(x=int)
+    assert intersect([_Meta(x=int, y=str), _Meta(x=int)]) == _Meta(x=int)
+    assert intersect([_Meta(x=int), _Meta(y=int)]) == _NoReturn()
+    assert intersect([_NoReturn(), _NoReturn()]) == _NoReturn()
+    assert intersect([_Return([int], _Meta(x=int, y=str)), _Return([int], _Meta(x=int))]) == \
+        _Return([int], _Meta(x=int))
+    assert intersect([_Return([int], _Meta(y=str)), _Return([int])]) == _Return([int])
+
+    with pytest.raises(RuntimeError) as e:
+        intersect([_Return([int]), _Meta(x=int)])
+    assert str(e.value) == "Return values are not the same '(<class 'int'>,)' vs '()'."
+
+    with pytest.raises(RuntimeError) as e:
+        intersect([_Meta(x=int, y=str), _Meta(x=str, y=str)])
+    assert str(e.value) == "Meta keys ['x'] are returned with different types."
+
+    with pytest.raises(RuntimeError) as e:
+        intersect([int])
+    assert str(e.value) == "Unexpected return type <class 'int'>"
+
+
+def test_interning():
+    assert returns(int, x=str)(lambda: 1).__pakkr_returns__ is returns(int, x=str)(lambda: 2).__pakkr_returns__
+    assert returns(x=int)(lambda: 1).__pakkr_returns__ is returns(x=int)(lambda: 1).__pakkr_returns__
+    assert intern(_NoReturn()) is intern(_NoReturn())
+
+    # meta keys in a different order are equal but not interned together, to preserve reprs
+    assert intern(_Meta(x=int, y=str)) is not intern(_Meta(y=str, x=int))
+    assert str(intern(_Meta(y=str, x=int))) == "{'y': <class 'str'>, 'x': <class 'int'>}"
+
+    unhashable = _Return([[int]])
+    assert intern(unhashable) is unhashable
+
+
+def test_memoised():
+    steps = [_Return([int], _Meta(x=int)), _Meta(y=str)]
+    assert collapse(steps) is collapse(iter(steps))
+    assert intersect(steps[:1] * 2) is intersect(steps[:1] * 2)
+
+    unhashable = [_Return([[int]])]
+    assert collapse(unhashable) == _Return([[int]])
+    assert collapse(unhashable) is not collapse(unhashable)
+
+    assert_is_superset(collapse(steps), _Meta(y=str))
+    assert_is_superset(collapse(steps), _Meta(y=str))
+    assert_is_superset(_Return([[int]]), _Return([[int]]))
+    for _ in range(2):
+        with pytest.raises(RuntimeError) as e:
+            assert_is_superset(collapse(steps), _Meta(z=str))
+        assert str(e.value) == "{'x': <class 'int'>, 'y': <class 'str'>} is not a superset of {'z': <class 'str'>}."
+
+
+def test_caches_are_bounded():
+    cache = _LRU(max_entries=2)
+    assert cache.setdefault('a', 1) == 1
+    assert cache.setdefault('b', 2) == 2
+    assert cache.setdefault('a', 3) == 1  # now the most recently used
+    cache.setdefault('c', 4)
+    assert (cache.get('a'), cache.get('b'), cache.get('c')) == (1, None, 4)
+    assert len(cache) == 2
+
+    with pytest.raises(TypeError):
+        cache.get([])
+
+    for n in range(_MAX_ENTRIES + 10):
+        intern(_Meta(**{'key_{}'.format(n): int}))
+    assert len(_interned) == _MAX_ENTRIES
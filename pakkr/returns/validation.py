@@ -0,0 +1,212 @@
+import collections.abc
+import typing
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+SHALLOW = 'shallow'
+FIRST = 'first'
+SAMPLED = 'sampled'
+FULL = 'full'
+_STRATEGIES = (SHALLOW, FIRST, SAMPLED, FULL)
+
+_Validator = Callable[[Any], bool]
+_Settings = Tuple[str, int]
+
+_settings: _Settings = (SHALLOW, 8)
+_validators: Dict[Hashable, _Validator] = {}
+_Literal = getattr(typing, 'Literal', None)
+
+
+def set_validation(strategy: str=SHALLOW, sample_size: int=8) -> None:
+    """
+    Set how values returned by steps are checked against parameterised typing annotations
+    of `@returns`, e.g. `List[int]`, for the whole process.
+
+    Parameters
+    ----------
+    strategy : str
+        'shallow', the default, only checks the container, e.g. that a `List[int]` is a list;
+        'first' also checks its first element, 'sampled' `sample_size` elements evenly spaced
+        over sequences, or the first ones of other collections, and 'full' all of them
+    sample_size : int
+        number of elements checked per container by the 'sampled' strategy
+
+    Raises
+    ------
+    RuntimeError
+        when the strategy is unknown or the sample size is not positive
+    """
+    global _settings
+    if strategy not in _STRATEGIES:
+        raise RuntimeError("Unknown validation strategy '{}', expecting one of {}.".format(strategy, _STRATEGIES))
+    if sample_size < 1:
+        raise RuntimeError("Sample size should be at least 1, got {}.".format(sample_size))
+    _settings = (strategy, sample_size)
+
+
+def get_validation() -> _Settings:
+    """The current validation strategy and sample size."""
+    return _settings
+
+
+def is_instance(value: Any, annotation: Any) -> bool:
+    """Whether `value` is of type `annotation`, a type or a typing annotation, following the
+    current validation strategy."""
+    return validator(annotation)(value)
+
+
+def validator(annotation: Any) -> _Validator:
+    """
+    A predicate checking values against `annotation` following the current validation
+    strategy. Predicates are built once per annotation and strategy, so checking a value
+    only costs the elements the strategy looks at.
+    """
+    settings = _settings
+    key: Hashable = (settings, annotation)
+    try:
+        found = _validators.get(key)
+    except TypeError:  # unhashable annotation
+        return _build(annotation, settings)
+    if found is None:
+        found = _validators.setdefault(key, _build(annotation, settings))
+    return found
+
+
+def _elements(strategy: str, sample_size: int) -> Callable[[Any], Iterable]:
+    """Elements of a collection a strategy checks."""
+    if strategy == FULL:
+        return iter
+    if strategy == FIRST:
+        sample_size = 1
+
+    def sample(values):
+        size = len(values)
+        if size <= sample_size:
+            return values
+        if isinstance(values, collections.abc.Sequence):
+            if sample_size == 1:
+                return values[:1]
+            return [values[index * (size - 1) // (sample_size - 1)] for index in range(sample_size)]
+        iterator = iter(values)
+        return [next(iterator) for _ in range(sample_size)]
+    return sample
+
+
+def _build(annotation: Any, settings: _Settings) -> _Validator:
+    strategy, sample_size = settings
+    if annotation is Any or isinstance(annotation, (str, typing.TypeVar, typing.ForwardRef)):
+        return lambda value: True
+
+    origin = getattr(annotation, '__origin__', None)
+    args = getattr(annotation, '__args__', None) or ()
+    if origin is typing.Union:
+        return _build_union([_build(arg, settings) for arg in args], args)
+    if origin is None:
+        if strategy != SHALLOW and isinstance(annotation, type) and issubclass(annotation, tuple) \
+                and hasattr(annotation, '_fields') and getattr(annotation, '__annotations__', None):
+            return _build_named_tuple(annotation, settings)
+        return lambda value: isinstance(value, annotation)
+    if _Literal is not None and origin is _Literal:
+        return lambda value: value in args
+    if not isinstance(origin, type):  # pragma: no cover
+        return lambda value: True
+
+    if strategy == SHALLOW or not args:
+        return lambda value: isinstance(value, origin)
+    if np is not None and issubclass(origin, np.ndarray):
+        return _build_array(args)
+    if issubclass(origin, tuple):
+        return _build_tuple(args, settings)
+    if issubclass(origin, collections.abc.Mapping) and len(args) == 2:
+        return _build_mapping(origin, args, settings)
+    if issubclass(origin, collections.abc.Collection) and len(args) == 1:
+        return _build_collection(origin, args[0], settings)
+    # e.g. Iterator[int] or Callable[[int], str], whose elements cannot be checked without
+    # consuming or calling them
+    return lambda value: isinstance(value, origin)
+
+
+def _build_union(checks, args) -> _Validator:
+    types = tuple(args)
+    if all(isinstance(arg, type) for arg in types):
+        return lambda value: isinstance(value, types)
+    return lambda value: any(check(value) for check in checks)
+
+
+def _build_named_tuple(annotation: type, settings: _Settings) -> _Validator:
+    fields = [(index, _build(annotation.__annotations__[field], settings))
+              for index, field in enumerate(annotation._fields) if field in annotation.__annotations__]  # type: ignore
+
+    def check(value):
+        return isinstance(value, annotation) and all(check(value[index]) for index, check in fields)
+    return check
+
+
+def _build_tuple(args: Tuple, settings: _Settings) -> _Validator:
+    if len(args) == 2 and args[1] is Ellipsis:
+        return _build_collection(tuple, args[0], settings)
+    checks = [_build(arg, settings) for arg in args if arg != ()]  # Tuple[()] has args ((),) before 3.11
+
+    def check(value):
+        return isinstance(value, tuple) and len(value) == len(checks) and \
+            all(check(item) for check, item in zip(checks, value))
+    return check
+
+
+def _build_collection(origin: type, arg: Any, settings: _Settings) -> _Validator:
+    if arg is Any:
+        return lambda value: isinstance(value, origin)
+    element = _build(arg, settings)
+    elements = _elements(*settings)
+
+    def check(value):
+        return isinstance(value, origin) and all(element(item) for item in elements(value))
+    return check
+
+
+def _build_mapping(origin: type, args: Tuple, settings: _Settings) -> _Validator:
+    key, val = _build(args[0], settings), _build(args[1], settings)
+    elements = _elements(*settings)
+
+    def check(value):
+        return isinstance(value, origin) and all(key(k) and val(value[k]) for k in elements(value.keys()))
+    return check
+
+
+def _build_array(args: Tuple) -> _Validator:
+    """`np.ndarray[shape, np.dtype[scalar]]` or `numpy.typing.NDArray[scalar]`, checked by
+    their dtype and number of dimensions, or sizes given as `Literal`, in constant time."""
+    shape = args[0]
+    dimensions = None
+    if getattr(shape, '__origin__', None) is tuple:
+        sizes = shape.__args__
+        if not (len(sizes) == 2 and sizes[1] is Ellipsis):
+            dimensions = [size.__args__ if getattr(size, '__origin__', None) is _Literal else None
+                          for size in sizes]
+
+    scalar = getattr(args[1], '__args__', (Any,))[0] if len(args) > 1 else Any
+
+    def check(value):
+        if not isinstance(value, np.ndarray):
+            return False
+        if scalar is not Any and not np.issubdtype(value.dtype, scalar):
+            return False
+        if dimensions is None:
+            return True
+        return value.ndim == len(dimensions) and \
+            all(sizes is None or size in sizes for size, sizes in zip(value.shape, dimensions))
+    return check
+
+
+def validators(annotations: Iterable, cached: Optional[Tuple[_Settings, Tuple[_Validator, ...]]]=None
+               ) -> Tuple[_Settings, Tuple[_Validator, ...]]:
+    """The predicates for `annotations` under the current validation strategy, or `cached`,
+    the result of a previous call, as it is unless the strategy was changed since."""
+    settings = _settings
+    if cached is not None and cached[0] is settings:
+        return cached
+    return settings, tuple(validator(annotation) for annotation in annotations)
@@ -0,0 +1,151 @@
+import sys
+import typing
+from collections import deque
+from typing import Any, Callable, Dict, FrozenSet, Iterator, List, NamedTuple, Optional, Sequence, Tuple, TypeVar, Union
+
+import numpy as np
+import pytest
+from pakkr.returns._meta import _Meta
+from pakkr.returns._return import _Return
+from pakkr.returns.validation import get_validation, is_instance, set_validation, validator, validators
+
+T = TypeVar('T')
+
+
+class Point(NamedTuple):
+    x: int
+    y: float
+
+
+@pytest.fixture
+def strategy():
+    def set_strategy(name, sample_size=8):
+        set_validation(name, sample_size)
+    yield set_strategy
+    set_validation()
+
+
+def test_shallow_by_default():
+    assert get_validation() == ('shallow', 8)
+    assert is_instance(['a'], List[int])
+    assert is_instance((1.0, 0.0, 2.0), Tuple[float])
+    assert is_instance(Point('a', 'b'), Point)
+    assert not is_instance((1,), List[int])
+    assert is_instance(None, Optional[int])
+    assert not is_instance('1', Union[int, float])
+
+
+def test_full(strategy):
+    strategy('full')
+    assert is_instance([1, 2, 3], List[int])
+    assert not is_instance([1, 2, 'a'], List[int])
+    assert is_instance({'a': [1]}, Dict[str, List[int]])
+    assert not is_instance({'a': [1.0]}, Dict[str, List[int]])
+    assert not is_instance({1: [1]}, Dict[str, List[int]])
+    assert is_instance(frozenset({1, 2}), FrozenSet[int])
+    assert is_instance(deque([1]), Sequence[int])
+    assert is_instance([1, None], List[Optional[int]])
+    assert not is_instance([1, 'a'], List[Optional[int]])
+    assert is_instance([1, [2]], List[Union[int, List[int]]])
+    assert not is_instance([1, ['a']], List[Union[int, List[int]]])
+    assert is_instance(['a', 1], List[Any]) and is_instance([1], List[T]) and is_instance([1], List['int'])
+
+    assert is_instance((1, 'a'), Tuple[int, str])
+    assert not is_instance((1, 'a', 2), Tuple[int, str])
+    assert not is_instance([1, 'a'], Tuple[int, str])
+    assert is_instance((1, 2, 3), Tuple[int, ...])
+    assert not is_instance((1.0, 0.0, 2.0), Tuple[float])
+    assert is_instance((), Tuple[()])
+
+    assert is_instance(Point(1, 2.0), Point)
+    assert not is_instance(Point(1, 'b'), Point)
+    assert not is_instance((1, 2.0), Point)
+
+    # iterators and callables are not consumed nor called
+    iterator = iter([1, 'a'])
+    assert is_instance(iterator, Iterator[int]) and next(iterator) == 1
+    assert is_instance(len, Callable[[Any], int])
+
+
+def test_first_and_sampled(strategy):
+    values = list(range(100))
+    values[-1] = 'last'
+    values[50] = 'middle'
+
+    strategy('first')
+    assert is_instance(values, List[int])
+    assert not is_instance(['a', 1], List[int])
+    assert is_instance({1: 'a', 'b': 2}, Dict[int, str])
+
+    strategy('sampled', 3)
+    assert not is_instance(values, List[int])  # the first, middle and last elements
+    values[-1] = 99
+    values[50] = 50
+    values[10] = 'skipped'
+    assert is_instance(values, List[int])
+    assert is_instance([1, 2], List[int])
+    assert is_instance(set(range(100)), typing.Set[int])
+    assert not is_instance({str(i): i for i in range(100)}, Dict[str, str])
+
+    strategy('sampled', 1)
+    assert not is_instance(['a'] + values, List[int])
+
+
+@pytest.mark.skipif(sys.version_info < (3, 9), reason="numpy generic aliases")
+def test_arrays(strategy):
+    Literal = typing.Literal  # type: ignore
+    strategy('first')
+    matrix = np.zeros((3, 2), dtype=np.float64)
+    assert is_instance(matrix, np.ndarray[Tuple[int, int], np.dtype[np.floating]])
+    assert not is_instance(matrix, np.ndarray[Tuple[int], np.dtype[np.floating]])
+    assert not is_instance(matrix, np.ndarray[Tuple[int, int], np.dtype[np.integer]])
+    assert is_instance(matrix, np.ndarray[Tuple[Literal[3], int], np.dtype[Any]])
+    assert not is_instance(matrix, np.ndarray[Tuple[int, Literal[3, 4]], np.dtype[Any]])
+    assert is_instance(matrix, np.ndarray[Tuple[int, ...], np.dtype[np.float64]])
+    assert not is_instance([[0.0]], np.ndarray[Tuple[int, ...], np.dtype[np.float64]])
+    assert is_instance(matrix, np.ndarray[Any, Any])
+
+    import numpy.typing as npt
+    assert is_instance(matrix, npt.NDArray[np.float64])
+    assert not is_instance(matrix.astype(np.int32), npt.NDArray[np.float64])
+    assert is_instance('b', Literal['a', 'b']) and not is_instance('c', Literal['a', 'b'])
+
+
+def test_validators_cached(strategy):
+    assert validator(List[int]) is validator(List[int])
+    cached = validators([List[int], int])
+    assert validators([List[int], int], cached) is cached
+
+    strategy('full')
+    assert validator(List[int]) is not cached[1][0]
+    assert validators([List[int], int], cached) != cached
+    assert not validators([List[int], int], cached)[1][0](['a'])
+
+    class Unhashable(type):
+        __hash__ = None  # type: ignore
+
+    kind = Unhashable('Kind', (), {})
+    assert validator(kind)(kind())
+
+    with pytest.raises(RuntimeError) as e:
+        set_validation('deep')
+    assert str(e.value) == ("Unknown validation strategy 'deep', expecting one of "
+                            "('shallow', 'first', 'sampled', 'full').")
+    with pytest.raises(RuntimeError) as e:
+        set_validation('sampled', 0)
+    assert str(e.value) == "Sample size should be at least 1, got 0."
+
+
+def test_descriptors_follow_strategy(strategy):
+    ret = _Return([List[int]], _Meta(x=Dict[str, int]))
+    assert ret.parse_result((['a'], {'x': {'a': 'b'}})) == ((['a'],), {'x': {'a': 'b'}})
+
+    strategy('full')
+    with pytest.raises(RuntimeError) as e:
+        ret.parse_result((['a'], {'x': {'a': 1}}))
+    assert str(e.value) == "Values error: '['a']' is not of type typing.List[int]."
+    with pytest.raises(RuntimeError) as e:
+        ret.parse_result(([1], {'x': {'a': 'b'}}))
+    assert str(e.value) == ("Meta error: key 'x' should be type typing.Dict[str, int] "
+                            "but <class 'dict'> was returned.")
+    assert ret.parse_result(([1], {'x': {'a': 1}})) == (([1],), {'x': {'a': 1}})
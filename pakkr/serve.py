@@ -0,0 +1,214 @@
+import http.client
+import json
+import os
+import socket
+import stat
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn, UnixStreamServer
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+from pakkr.exception import PakkrError
+from pakkr.pipeline import Pipeline, pakkr_logger
+
+
+class Response(NamedTuple):
+    """Result of a run executed by a server, with the seconds the request waited for a free
+    slot and the seconds the run took."""
+    result: Any
+    queued: float
+    run: float
+
+
+class PipelineService:
+    """
+    Executes requests on a Pipeline constructed once, at most `max_concurrency` of them at
+    a time; a request waiting longer than `queue_timeout` for a free slot is rejected.
+    Every run is given `meta`, e.g. parsed from the command line, updated with the meta
+    of the request.
+    """
+
+    def __init__(self,
+                 pipeline: Pipeline,
+                 max_concurrency: int=1,
+                 queue_timeout: Optional[float]=None,
+                 meta: Optional[Dict]=None) -> None:
+        if max_concurrency < 1:
+            raise RuntimeError("Concurrency limit should be at least 1, got {}.".format(max_concurrency))
+        self.pipeline = pipeline
+        self.meta = dict(meta or {})
+        self._queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+
+    def handle(self, args: list, meta: Dict) -> Tuple[int, Dict]:
+        """Execute one request, returning the HTTP status and body of the response."""
+        received = time.monotonic()
+        if not self._slots.acquire(timeout=self._queue_timeout):
+            body: Dict = {'error': "No slot available after {:.3f}s.".format(time.monotonic() - received)}
+            return 503, dict(body, timing={'queued': time.monotonic() - received, 'run': 0.0})
+
+        started = time.monotonic()
+        try:
+            status, body = 200, {'result': self.pipeline(*args, **dict(self.meta, **meta))}
+        except Exception as e:
+            status, body = 500, {'error': str(e), 'type': type(e).__name__}
+        finally:
+            self._slots.release()
+
+        body['timing'] = {'queued': started - received, 'run': time.monotonic() - started}
+        return status, body
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Serves `POST /run` with a JSON body of the form {"args": [...], "meta": {...}} and
+    `GET /health`."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        if self.path != '/health':
+            return self._reply(404, {'error': "Unknown path {}.".format(self.path)})
+        self._reply(200, {'status': 'ok'})
+
+    def do_POST(self):
+        if self.path != '/run':
+            return self._reply(404, {'error': "Unknown path {}.".format(self.path)})
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            args, meta = list(request.get('args', [])), dict(request.get('meta', {}))
+        except (ValueError, TypeError, AttributeError) as e:
+            return self._reply(400, {'error': "Invalid request: {}".format(e)})
+        self._reply(*self.server.service.handle(args, meta))
+
+    def _reply(self, status: int, body: Dict) -> None:
+        try:
+            payload = json.dumps(body, default=_jsonable).encode()
+        except (TypeError, ValueError) as e:
+            status = 500
+            payload = json.dumps({'error': "Result cannot be serialised: {}".format(e),
+                                  'timing': body.get('timing')}).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def address_string(self):
+        return self.client_address[0] if self.client_address else 'unix'
+
+    def log_message(self, format, *args):
+        pakkr_logger.debug("%s - %s", self.address_string(), format % args)
+
+
+def _jsonable(obj: Any) -> Any:
+    if hasattr(obj, 'tolist'):  # numpy arrays and scalars
+        return obj.tolist()
+    raise TypeError("Object of type {} is not JSON serializable".format(type(obj).__name__))
+
+
+class _HTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], service: PipelineService) -> None:
+        self.service = service
+        super().__init__(address, _Handler)
+
+
+class _UnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str, service: PipelineService) -> None:
+        self.service = service
+        if os.path.exists(path):
+            if not stat.S_ISSOCK(os.stat(path).st_mode):
+                raise RuntimeError("Cannot listen on {}, which exists and is not a socket.".format(path))
+            os.remove(path)  # left behind by a server which did not close
+        super().__init__(path, _Handler)
+
+    def server_close(self) -> None:
+        super().server_close()
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address)
+
+
+def make_server(service: PipelineService,
+                socket_path: Optional[str]=None,
+                host: str='127.0.0.1',
+                port: Optional[int]=None) -> Any:
+    """
+    Create a server executing requests with `service`, listening on the Unix domain socket
+    `socket_path` or on `host`:`port` otherwise. Call `serve_forever()` to serve requests,
+    and `shutdown()` and `server_close()` to stop.
+    """
+    if socket_path is not None:
+        return _UnixHTTPServer(socket_path, service)
+    if port is None:
+        raise RuntimeError("Either a socket path or a port is required.")
+    return _HTTPServer((host, port), service)
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path: str, timeout: Optional[float]) -> None:
+        super().__init__('localhost', timeout=timeout)
+        self._path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self._path)
+
+
+class Client:
+    """
+    Client of a server started with `pakkr serve`, over its Unix domain socket or HTTP port.
+    Arguments and meta are sent, and results received, as JSON.
+    """
+
+    def __init__(self,
+                 socket_path: Optional[str]=None,
+                 host: str='127.0.0.1',
+                 port: Optional[int]=None,
+                 timeout: Optional[float]=None) -> None:
+        if socket_path is None and port is None:
+            raise RuntimeError("Either a socket path or a port is required.")
+        self._socket_path = socket_path
+        self._host = host
+        self._port = port
+        self._timeout = timeout
+
+    def __call__(self, *args, **meta) -> Any:
+        return self.invoke(*args, **meta).result
+
+    def invoke(self, *args, **meta) -> Response:
+        """
+        Execute the served Pipeline with the given arguments and meta.
+
+        Raises
+        ------
+        PakkrError
+            when the run failed or was rejected by the server
+        """
+        status, body = self._request('POST', '/run', {'args': list(args), 'meta': meta})
+        if status != 200:
+            raise PakkrError("Server responded {}: {}".format(status, body.get('error')))
+        return Response(body['result'], body['timing']['queued'], body['timing']['run'])
+
+    def health(self) -> bool:
+        try:
+            return self._request('GET', '/health', None)[0] == 200
+        except OSError:
+            return False
+
+    def _request(self, method: str, path: str, payload: Optional[Dict]) -> Tuple[int, Dict]:
+        if self._socket_path is not None:
+            connection: http.client.HTTPConnection = _UnixHTTPConnection(self._socket_path, self._timeout)
+        else:
+            connection = http.client.HTTPConnection(self._host, self._port, timeout=self._timeout)
+        try:
+            body = json.dumps(payload, default=_jsonable).encode() if payload is not None else None
+            connection.request(method, path, body, {'Content-Type': 'application/json'})
+            response = connection.getresponse()
+            return response.status, json.loads(response.read())
+        finally:
+            connection.close()
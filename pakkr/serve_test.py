@@ -0,0 +1,129 @@
+import os
+import socket
+import threading
+import time
+import numpy as np
+import pytest
+from pakkr import Pipeline, returns
+from pakkr.exception import PakkrError
+from pakkr.serve import Client, make_server, PipelineService
+
+
+@pytest.fixture
+def serving(tmpdir):
+    servers = []
+
+    def start(pipeline, unix=True, **kwargs):
+        service = PipelineService(pipeline, **kwargs)
+        if unix:
+            path = str(tmpdir.join('pakkr.sock'))
+            server, client = make_server(service, socket_path=path), Client(socket_path=path, timeout=5)
+        else:
+            server = make_server(service, port=0)
+            client = Client(port=server.server_address[1], timeout=5)
+        threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+        servers.append(server)
+        return client
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_serve_unix_socket(serving, tmpdir):
+    @returns(np.ndarray)
+    def scale(values, factor):
+        return np.array(values) * factor
+
+    client = serving(Pipeline(scale), meta={'factor': 2})
+    assert client.health()
+    assert client([1, 2]) == [2, 4]
+    assert client([1, 2], factor=3) == [3, 6]
+
+    response = client.invoke([1])
+    assert response.result == [2]
+    assert response.queued >= 0 and response.run >= 0
+
+
+def test_serve_http(serving):
+    client = serving(Pipeline(lambda x: x + 1), unix=False)
+    assert client.health()
+    assert client(1) == 2
+
+    status, body = client._request('GET', '/missing', None)
+    assert status == 404 and body == {'error': "Unknown path /missing."}
+    status, body = client._request('POST', '/missing', {})
+    assert status == 404
+
+
+def test_serve_errors(serving):
+    def fail(x):
+        raise ValueError("failed")
+
+    client = serving(Pipeline(fail))
+    with pytest.raises(PakkrError) as e:
+        client(1)
+    assert str(e.value).startswith("Server responded 500: failed")
+
+    client = serving(Pipeline(lambda: object()))
+    with pytest.raises(PakkrError) as e:
+        client()
+    assert "Result cannot be serialised: Object of type object is not JSON serializable" in str(e.value)
+
+    status, body = client._request('POST', '/run', [1])
+    assert status == 400 and body['error'].startswith("Invalid request:")
+
+
+def test_serve_concurrency_limit(serving):
+    release = threading.Event()
+
+    def wait(x):
+        release.wait()
+        return x
+
+    client = serving(Pipeline(wait), max_concurrency=1, queue_timeout=0.05)
+    results = []
+    thread = threading.Thread(target=lambda: results.append(client.invoke(1)))
+    thread.start()
+    time.sleep(0.1)
+
+    with pytest.raises(PakkrError) as e:
+        client(2)
+    assert str(e.value).startswith("Server responded 503: No slot available after")
+
+    release.set()
+    thread.join()
+    assert results[0].result == 1 and results[0].run > 0
+
+
+def test_service_invalid_concurrency():
+    with pytest.raises(RuntimeError) as e:
+        PipelineService(Pipeline(lambda: 1), max_concurrency=0)
+    assert str(e.value) == "Concurrency limit should be at least 1, got 0."
+
+
+def test_client_and_server_require_an_address(tmpdir):
+    with pytest.raises(RuntimeError):
+        Client()
+    with pytest.raises(RuntimeError):
+        make_server(PipelineService(Pipeline(lambda: 1)))
+    assert not Client(socket_path=str(tmpdir.join('missing.sock'))).health()
+
+
+def test_server_socket_path(tmpdir):
+    # a socket left behind is replaced, anything else is kept
+    path = str(tmpdir.join('pakkr.sock'))
+    stale = socket.socket(socket.AF_UNIX)
+    stale.bind(path)
+    stale.close()
+    server = make_server(PipelineService(Pipeline(lambda: 1)), socket_path=path)
+    server.server_close()
+    assert not os.path.exists(path)
+
+    data = tmpdir.join('data.csv')
+    data.write('a,b')
+    with pytest.raises(RuntimeError) as e:
+        make_server(PipelineService(Pipeline(lambda: 1)), socket_path=str(data))
+    assert str(e.value) == "Cannot listen on {}, which exists and is not a socket.".format(data)
+    assert data.read() == 'a,b'
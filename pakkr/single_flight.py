@@ -0,0 +1,109 @@
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from pakkr._wrapper import _StepWrapper
+from pakkr.deadline import Deadline, DEADLINE_KEY
+from pakkr.exception import PakkrError, PakkrTimeoutError
+from pakkr.fingerprint import inputs_fingerprint
+from pakkr.metrics import count_cache
+from pakkr.pipeline import _identifier
+
+
+class _Flight:
+    """One in-flight execution of a step, shared by the runs giving it the same inputs."""
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class _SingleFlight(_StepWrapper):
+    """
+    Step wrapper making concurrent executions of the step with the same inputs wait for
+    the one already in flight and share its result, rather than each executing the step.
+    """
+
+    def __init__(self, step: Callable) -> None:
+        super().__init__(step)
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        self._stats = {'calls': 0, 'executions': 0, 'shared': 0}
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Number of calls, of executions of the step and of calls sharing an execution."""
+        with self._lock:
+            return dict(self._stats)
+
+    def __call__(self, *args, **kwargs):
+        key = inputs_fingerprint(args, kwargs)
+        with self._lock:
+            self._stats['calls'] += 1
+            flight = self._flights.get(key) if key is not None else None
+            leader = flight is None
+            if leader:
+                self._stats['executions'] += 1
+                flight = _Flight()
+                if key is not None:
+                    self._flights[key] = flight
+            else:
+                self._stats['shared'] += 1
+
+        if key is not None:
+            count_cache(not leader)
+        if leader:
+            self._execute(flight, key, args, kwargs)
+        else:
+            deadline = kwargs.get(DEADLINE_KEY)
+            deadline = deadline if isinstance(deadline, Deadline) else None
+            if not flight.done.wait(None if deadline is None else deadline.remaining()):
+                deadline.check(_identifier(self))  # type: ignore
+                flight.done.wait()  # pragma: no cover
+
+        if flight.error is not None:
+            if leader:
+                raise flight.error
+            raise self._shared_error(flight.error) from flight.error
+        return flight.result
+
+    def _shared_error(self, error: BaseException) -> PakkrError:
+        """A fresh error for a run which shared a failed execution, so that runs raising it
+        concurrently do not rewrite each other's traceback and context."""
+        context = '\twhen sharing the failed execution of {} in flight'.format(_identifier(self))
+        if isinstance(error, PakkrTimeoutError):
+            return PakkrTimeoutError(error.identifier, error.budget, error.elapsed, context)
+        message = error._message if isinstance(error, PakkrError) else str(error)
+        return PakkrError(message, context)
+
+    def _execute(self, flight: _Flight, key: Optional[str], args, kwargs) -> None:
+        try:
+            flight.result = self._bind()(*args, **kwargs)
+        except BaseException as e:
+            flight.error = e
+        finally:
+            with self._lock:
+                if key is not None:
+                    del self._flights[key]
+            flight.done.set()
+
+
+def single_flight():
+    """
+    Decorator to deduplicate concurrent executions of an expensive step, e.g. loading a
+    model artifact or a tenant's config during a traffic spike. A run executing the step
+    with the same inputs (by content fingerprint, ignoring `logger` and `deadline`) as an
+    execution in flight waits for it and shares its result, including its `@returns`
+    meta, instead of executing the step again; if the execution fails, each waiting run
+    raises its own PakkrError caused by the error. Results are shared, not copied, so
+    they should not be modified by later steps. Steps given inputs which cannot be
+    fingerprinted are always executed.
+
+    Returns
+    -------
+    Callable
+        decorator returning the deduplicated step; its `stats` reports the executions shared
+    """
+    def decorated(step):
+        return _SingleFlight(step)
+    return decorated
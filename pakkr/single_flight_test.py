@@ -0,0 +1,108 @@
+import threading
+from functools import wraps
+import pytest
+from pakkr import Pipeline, returns, single_flight
+from pakkr.deadline import Deadline
+from pakkr.exception import PakkrError, PakkrTimeoutError
+
+
+def _blocking(fn):
+    """Step blocked until released, so concurrent runs overlap."""
+    release = threading.Event()
+    calls = []
+
+    @wraps(fn)
+    def step(*args, **kwargs):
+        calls.append(args)
+        release.wait()
+        return fn(*args, **kwargs)
+    step.release = release
+    step.calls = calls
+    return step
+
+
+def test_single_flight():
+    load = _blocking(lambda tenant: ({'name': tenant}, {'version': 1}))
+    load = single_flight()(returns(dict, version=int)(load))
+    pipeline = Pipeline(load, lambda config, version: (config['name'], version))
+
+    threads = []
+    results = []
+    for _ in range(3):
+        threads.append(threading.Thread(target=lambda: results.append(pipeline('acme'))))
+        threads[-1].start()
+    threads[0].join(0.1)
+    load.release.set()
+    for thread in threads:
+        thread.join()
+
+    assert results == [('acme', 1)] * 3
+    assert len(load.calls) == 1
+    assert load.stats == {'calls': 3, 'executions': 1, 'shared': 2}
+
+    assert pipeline('other') == ('other', 1)
+    assert len(load.calls) == 2
+
+
+def test_single_flight_different_inputs():
+    step = single_flight()(lambda x: x * 2)
+    assert Pipeline(step).map(range(4), _max_workers=4) == [0, 2, 4, 6]
+    assert step.stats['executions'] == 4
+
+
+def test_single_flight_unfingerprintable_inputs():
+    step = single_flight()(lambda lock: 1)
+    lock = threading.Lock()
+    assert Pipeline(step)(lock=lock) == 1
+    assert Pipeline(step)(lock=lock) == 1
+    assert step.stats == {'calls': 2, 'executions': 2, 'shared': 0}
+    assert step._flights == {}
+
+
+def test_single_flight_error():
+    def fail(x):
+        raise ValueError("failed")
+
+    step = single_flight()(_blocking(fail))
+    errors = []
+
+    def run():
+        try:
+            Pipeline(step)(1)
+        except PakkrError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    threads[0].join(0.1)
+    step.release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(errors) == 2 and all(str(e).startswith("failed") for e in errors)
+    assert step.stats['shared'] == 1
+    leader, follower = sorted(errors, key=lambda e: 'sharing' in str(e))
+    assert isinstance(leader.__cause__, ValueError)
+    assert follower is not leader and follower.__cause__ is leader.__cause__
+    assert 'when sharing the failed execution of' in str(follower)
+
+
+def test_single_flight_shared_timeout():
+    step = single_flight()(lambda x: x)
+    timeout = PakkrTimeoutError('"slow"<function>', 1, 2)
+    shared = step._shared_error(timeout)
+    assert type(shared) is PakkrTimeoutError and shared is not timeout
+    assert (shared.identifier, shared.budget, shared.elapsed) == ('"slow"<function>', 1, 2)
+
+
+def test_single_flight_deadline():
+    step = single_flight()(_blocking(lambda x, deadline: x))
+    leader = threading.Thread(target=Pipeline(step), args=(1,), kwargs={'deadline': Deadline(10)})
+    leader.start()
+    leader.join(0.1)
+
+    with pytest.raises(PakkrTimeoutError):
+        Pipeline(step)(1, deadline=Deadline(0.05))
+    step.release.set()
+    leader.join()
@@ -0,0 +1,113 @@
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+
+class SpillPolicy:
+    """
+    Policy bounding the memory held by the meta a Pipeline's steps produce. Once the numpy
+    arrays produced as meta during a run add up to more than `budget_bytes`, the least
+    recently used ones are written to `directory` as .npy files and replaced in the meta
+    by copy-on-write memory maps of those files, which are paged back in lazily when later
+    steps use them.
+
+    Spill files are removed as soon as they are mapped; the disk space is released once
+    nothing refers to the mapped arrays any more.
+
+    Parameters
+    ----------
+    budget_bytes : int
+        total size of the arrays produced as meta to keep in memory
+    directory : str
+        where to write spilled arrays, the temporary directory by default
+    """
+
+    def __init__(self, budget_bytes: int, directory: Optional[str]=None) -> None:
+        if budget_bytes < 0:
+            raise RuntimeError("Spill budget should not be negative, got {}.".format(budget_bytes))
+        self.budget_bytes = budget_bytes
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._stats = {'spills': 0, 'spilled_bytes': 0, 'reloads': 0, 'reloaded_bytes': 0}
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Number and total size of the arrays spilled, and of the spilled arrays used by steps."""
+        with self._lock:
+            return dict(self._stats)
+
+    def _count(self, count_key: str, bytes_key: str, nbytes: int) -> None:
+        with self._lock:
+            self._stats[count_key] += 1
+            self._stats[bytes_key] += nbytes
+
+    def _spill(self, array: Any) -> Any:
+        if self.directory is not None:
+            os.makedirs(self.directory, exist_ok=True)
+        fd, path = tempfile.mkstemp(dir=self.directory, prefix='pakkr-', suffix='.npy')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, array, allow_pickle=False)
+            spilled = np.load(path, mmap_mode='c')
+        finally:
+            os.remove(path)
+
+        self._count('spills', 'spilled_bytes', array.nbytes)
+        return spilled
+
+    def start(self) -> '_SpillRun':
+        return _SpillRun(self)
+
+
+def _size(value: Any) -> int:
+    """Size of the memory a value would release if spilled; 0 if it cannot be spilled."""
+    if (np is None or not isinstance(value, np.ndarray) or isinstance(value, np.memmap) or
+            value.dtype.hasobject):
+        return 0
+    return value.nbytes
+
+
+class _SpillRun:
+    """Bookkeeping of the arrays produced as meta during one run of a Pipeline."""
+
+    def __init__(self, policy: SpillPolicy) -> None:
+        self.policy = policy
+        self.resident: 'OrderedDict[str, int]' = OrderedDict()
+        self.spilled: Dict[str, Any] = {}
+        self.total = 0
+
+    def requested(self, opts: Dict) -> None:
+        """Record the meta a step is about to use, keeping resident arrays in memory longer."""
+        for key, value in opts.items():
+            if key in self.resident:
+                self.resident.move_to_end(key)
+            elif self.spilled.get(key) is value:
+                self.policy._count('reloads', 'reloaded_bytes', value.nbytes)
+
+    def produced(self, new_meta: Dict, *scopes: Dict) -> None:
+        """Track the meta a step produced, then spill the least recently used arrays of the
+        `scopes`, i.e. the dictionaries holding the meta, until they fit in the budget."""
+        for key, value in new_meta.items():
+            self.total -= self.resident.pop(key, 0)
+            self.spilled.pop(key, None)
+            size = _size(value)
+            if size:
+                self.resident[key] = size
+                self.total += size
+
+        while self.total > self.policy.budget_bytes:
+            key, size = self.resident.popitem(last=False)
+            self.total -= size
+            array = scopes[0][key]
+            spilled = self.policy._spill(array)
+            for scope in scopes:
+                if scope.get(key) is array:
+                    scope[key] = spilled
+            self.spilled[key] = spilled
@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+from pakkr import Pipeline, returns
+from pakkr.spill import SpillPolicy
+
+
+@returns(frames=np.ndarray)
+def load():
+    return {'frames': np.ones((100, 10))}
+
+
+@returns(encoded=np.ndarray)
+def encode(frames):
+    return {'encoded': frames * 2}
+
+
+@returns(folds=np.ndarray)
+def split(encoded):
+    return {'folds': np.arange(50)}
+
+
+def test_spill(tmpdir):
+    policy = SpillPolicy(budget_bytes=16000, directory=str(tmpdir))
+    seen = {}
+
+    @returns(float)
+    def train(frames, folds):
+        seen['frames'] = frames
+        return float(frames.sum() + folds.sum())
+
+    pipeline = Pipeline(load, encode, split, train, _spill=policy)
+    assert pipeline() == 1000.0 + 1225.0
+
+    assert isinstance(seen['frames'], np.memmap)
+    assert policy.stats == {'spills': 1, 'spilled_bytes': 8000, 'reloads': 1, 'reloaded_bytes': 8000}
+    assert tmpdir.listdir() == []
+
+
+def test_spill_least_recently_used():
+    policy = SpillPolicy(budget_bytes=16000)
+
+    def use(frames, encoded, folds):
+        return [isinstance(value, np.memmap) for value in (frames, encoded, folds)]
+
+    touch = returns()(lambda frames: None)
+    split_only = returns(folds=np.ndarray)(lambda: {'folds': np.arange(50)})
+    pipeline = Pipeline(load, encode, touch, split_only, use, _spill=policy)
+    assert pipeline() == [False, True, False]
+
+
+def test_spill_returned_meta():
+    @returns(np.ndarray, frames=np.ndarray)
+    def load_with(x):
+        return x, {'frames': np.ones((100, 10))}
+
+    @returns(np.ndarray, frames=np.ndarray)
+    def forward(x, frames):
+        frames[0, 0] = 5
+        return x, {'frames': frames}
+
+    policy = SpillPolicy(budget_bytes=0)
+    pipeline = Pipeline(Pipeline(load_with, forward, _spill=policy), lambda x, frames: frames)
+    frames = pipeline(np.zeros(3))
+    assert isinstance(frames, np.memmap)
+    assert frames[0, 0] == 5 and frames.sum() == 1004
+    assert policy.stats['spills'] == policy.stats['reloads'] == 1
+
+
+def test_spill_only_arrays():
+    policy = SpillPolicy(budget_bytes=0)
+    pipeline = Pipeline(returns(names=list, counts=np.ndarray)(lambda: {'names': ['a'] * 1000,
+                                                                         'counts': np.array([], dtype=int)}),
+                        lambda names, counts: (len(names), len(counts)),
+                        _spill=policy)
+    assert pipeline() == (1000, 0)
+    assert policy.stats['spills'] == 0
+
+
+def test_spill_invalid_budget():
+    with pytest.raises(RuntimeError) as e:
+        SpillPolicy(budget_bytes=-1)
+    assert str(e.value) == "Spill budget should not be negative, got -1."
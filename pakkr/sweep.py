@@ -0,0 +1,154 @@
+import itertools
+import threading
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from inspect import Parameter as iParameter, signature
+from typing import Any, Callable, Deque, Dict, FrozenSet, List, NamedTuple, Optional, Sequence, Tuple
+
+from pakkr.exception import exception_context, PakkrError
+from pakkr.pipeline import Pipeline, _identifier, _returned
+
+
+class SweepRun(NamedTuple):
+    """Result of the run of one combination of a sweep, or the error it failed with."""
+    params: Dict[str, Any]
+    result: Any
+    error: Optional[PakkrError]
+
+
+def _consumed(step: Callable, keys: FrozenSet[str]) -> FrozenSet[str]:
+    """Keys among `keys` a step may be injected; all of them for a step taking **meta or
+    whose signature is unknown, the keys its steps consume for a nested Pipeline."""
+    if type(step) is Pipeline:
+        return frozenset().union(*(_consumed(s, keys) for s in step._steps))  # type: ignore
+    try:
+        params = signature(step).parameters.values()
+    except (TypeError, ValueError):
+        return keys
+
+    consumed = set()
+    for param in params:
+        if param.kind == iParameter.VAR_KEYWORD and param.name == 'meta':
+            return keys
+        if param.name in keys:
+            consumed.add(param.name)
+    return frozenset(consumed)
+
+
+class Sweep:
+    """
+    Executes a Pipeline once per combination of a grid of meta values, e.g. of options
+    declared with `cmd_args`, as a tree of runs: the steps which are not injected any of
+    the swept keys, nor follow a step which is, are executed once for all combinations,
+    and the runs fork, in parallel, at the first step each key is injected into.
+
+    Steps are assumed to be deterministic and not to mutate their inputs, which are shared
+    by the branches forking after them. Run level options of the Pipeline, e.g. `_timeout`
+    or `_history`, are not applied.
+
+    Parameters
+    ----------
+    pipeline : Pipeline
+        Pipeline executing its steps in sequence, i.e. not a Switch
+    grid : Dict[str, Sequence]
+        values of every swept meta key; combinations are enumerated as itertools.product does
+    max_workers : int
+        number of branches executed concurrently, see ThreadPoolExecutor for the default
+    """
+
+    def __init__(self, pipeline: Pipeline, grid: Dict[str, Sequence], max_workers: Optional[int]=None) -> None:
+        if type(pipeline)._run_steps is not Pipeline._run_steps:
+            raise RuntimeError("Only Pipelines executing their steps in sequence can be swept.")
+        empty = sorted(key for key, values in grid.items() if not len(values))
+        if empty:
+            raise RuntimeError("No value to sweep for keys {}.".format(empty))
+
+        self.pipeline = pipeline
+        self.grid = OrderedDict((key, list(values)) for key, values in grid.items())
+        self._max_workers = max_workers
+        keys = frozenset(self.grid)
+        axes = list(self.grid)
+        self._consumed = [tuple(axes.index(key) for key in sorted(_consumed(step, keys), key=axes.index))
+                          for step in pipeline._plan]
+        self._lock = threading.Lock()
+        self._stats = {'runs': 0, 'executed': 0}
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Number of runs and of step executions, which would be the number of runs times
+        the number of steps without sharing."""
+        with self._lock:
+            return dict(self._stats)
+
+    def __call__(self, *args, **meta) -> List[SweepRun]:
+        """
+        Execute every combination of the grid, with the given arguments and meta.
+
+        Returns
+        -------
+        List[SweepRun]
+            one row per combination, in the order of itertools.product of the grid's values;
+            a combination whose run failed has its error instead of a result
+        """
+        axes = list(self.grid)
+        combinations = list(itertools.product(*(range(len(values)) for values in self.grid.values())))
+        rows: List[Optional[SweepRun]] = [None] * len(combinations)
+        with self._lock:
+            self._stats['runs'] += len(combinations)
+
+        with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+            pending: Deque = deque()
+            root = (0, tuple(args), dict(meta), {}, list(range(len(combinations))))
+            pending.append(executor.submit(self._execute, executor, pending, combinations, rows, *root))
+            while pending:
+                pending.popleft().result()
+
+        params = [{axis: self.grid[axis][index] for axis, index in zip(axes, combination)}
+                  for combination in combinations]
+        return [row._replace(params=param) for row, param in zip(rows, params)]  # type: ignore
+
+    def _execute(self, executor: ThreadPoolExecutor, pending: Deque, combinations: List[Tuple[int, ...]],
+                 rows: List, depth: int, args: Tuple, meta: Dict, produced: Dict, runs: List[int]) -> None:
+        """Execute the steps from `depth` for the `runs` sharing the given state, forking the
+        combinations which differ in the values of the keys the next step is injected into
+        new branches executed by other workers."""
+        pipeline = self.pipeline
+        plan = pipeline._plan
+        try:
+            while depth < len(plan):
+                axes = self._consumed[depth]
+                groups: Dict[Tuple, List[int]] = OrderedDict()
+                for run in runs:
+                    groups.setdefault(tuple(combinations[run][axis] for axis in axes), []).append(run)
+
+                branches = list(groups.values())
+                for branch in branches[1:]:
+                    state = (depth, args, self._values(meta.copy(), combinations[branch[0]], axes),
+                             produced.copy(), branch)
+                    pending.append(executor.submit(self._execute, executor, pending, combinations, rows, *state))
+                runs = branches[0]
+                self._values(meta, combinations[runs[0]], axes)
+
+                pipeline._meta = produced
+                args, meta = pipeline._run_step((args, meta), plan[depth], indent=1)
+                with self._lock:
+                    self._stats['executed'] += 1
+                depth += 1
+
+            new_arg, new_meta = pipeline._filter_results((args, produced))
+            row = SweepRun({}, _returned(new_arg, new_meta, False), None)
+        except PakkrError as e:
+            e.append_stack(exception_context(_identifier(pipeline), args, meta, None))
+            row = SweepRun({}, None, e)
+        except Exception as e:  # e.g. a RuntimeError of @returns, not wrapped by the Pipeline
+            error = PakkrError(str(e), exception_context(_identifier(pipeline), args, meta, None))
+            error.__cause__ = e
+            row = SweepRun({}, None, error)
+
+        for run in runs:
+            rows[run] = row
+
+    def _values(self, meta: Dict, combination: Tuple[int, ...], axes: Tuple[int, ...]) -> Dict:
+        keys = list(self.grid)
+        meta.update((keys[axis], self.grid[keys[axis]][combination[axis]]) for axis in axes)
+        return meta
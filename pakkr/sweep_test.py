@@ -0,0 +1,100 @@
+import threading
+import pytest
+from mock import patch
+from pakkr import Pipeline, returns, Switch
+from pakkr.cmd_args.argument import argument
+from pakkr.cmd_args.cmd_args import cmd_args
+from pakkr.exception import PakkrError
+from pakkr.sweep import Sweep
+
+
+class _Calls:
+    def __init__(self):
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def add(self, *call):
+        with self.lock:
+            self.calls.append(call)
+
+
+def _pipeline(calls):
+    @returns(list, rows=int)
+    def load(path):
+        calls.add('load', path)
+        return list(range(10)), {'rows': 10}
+
+    @cmd_args(argument('--scale', type=int, default=1))
+    @returns(list)
+    def features(data, scale):
+        calls.add('features', scale)
+        return [x * scale for x in data]
+
+    @returns(float)
+    def train(data, rows, alpha):
+        calls.add('train', alpha)
+        return sum(data) / rows * alpha
+
+    return Pipeline(load, features, train)
+
+
+def test_sweep():
+    calls = _Calls()
+    sweep = Sweep(_pipeline(calls), {'scale': [1, 2], 'alpha': [0.5, 1.0, 2.0]}, max_workers=3)
+    rows = sweep('data.csv')
+
+    assert [(row.params, row.result, row.error) for row in rows] == [
+        ({'scale': 1, 'alpha': 0.5}, 2.25, None),
+        ({'scale': 1, 'alpha': 1.0}, 4.5, None),
+        ({'scale': 1, 'alpha': 2.0}, 9.0, None),
+        ({'scale': 2, 'alpha': 0.5}, 4.5, None),
+        ({'scale': 2, 'alpha': 1.0}, 9.0, None),
+        ({'scale': 2, 'alpha': 2.0}, 18.0, None),
+    ]
+    # load once, features once per scale, train once per combination
+    assert sorted(calls.calls, key=str) == sorted([('load', 'data.csv'), ('features', 1), ('features', 2)] +
+                                                  [('train', alpha) for alpha in (0.5, 1.0, 2.0)] * 2, key=str)
+    assert sweep.stats == {'runs': 6, 'executed': 9}
+
+
+def test_sweep_forks_at_first_use():
+    calls = _Calls()
+    sweep = Sweep(_pipeline(calls), {'path': ['a', 'b'], 'alpha': [1.0]})
+    rows = sweep(**{'scale': 3})
+    assert [row.result for row in rows] == [13.5, 13.5]
+    assert sweep.stats == {'runs': 2, 'executed': 6}
+
+    # a nested Pipeline consumes what its steps do, a step taking **meta every key
+    def everything(data, **meta):
+        return data
+
+    nested = Sweep(Pipeline(Pipeline(_pipeline(calls)), everything), {'alpha': [1.0, 2.0]})
+    assert [row.result for row in nested('a', scale=1)] == [4.5, 9.0]
+    assert nested.stats == {'runs': 2, 'executed': 4}
+    assert Sweep(Pipeline(everything), {'alpha': [1, 2]})._consumed == [(0,)]
+    assert Sweep(Pipeline(max), {'alpha': [1, 2]})._consumed == [(0,)]
+
+
+def test_sweep_errors():
+    calls = _Calls()
+    rows = Sweep(_pipeline(calls), {'alpha': [1.0, 'x']})('a', scale=1)
+    assert rows[0].result == 4.5 and rows[0].error is None
+    assert rows[1].result is None and isinstance(rows[1].error, PakkrError)
+
+    # errors which the Pipeline does not wrap, e.g. of @returns, are recorded too
+    rows = Sweep(Pipeline(returns(int)(lambda alpha: alpha)), {'alpha': [1, 'x']})()
+    assert rows[0].result == 1
+    assert isinstance(rows[1].error, PakkrError) and isinstance(rows[1].error.__cause__, RuntimeError)
+
+    pipeline = _pipeline(calls)
+    with patch.object(pipeline, '_filter_results', side_effect=RuntimeError("Cannot downcast")):
+        rows = Sweep(pipeline, {'alpha': [1.0, 2.0]})('a', scale=1)
+    assert [str(row.error).split('\n')[0] for row in rows] == ["Cannot downcast"] * 2
+
+    with pytest.raises(RuntimeError) as e:
+        Sweep(Switch(lambda: 'a', {'a': max}), {'alpha': [1]})
+    assert str(e.value) == "Only Pipelines executing their steps in sequence can be swept."
+
+    with pytest.raises(RuntimeError) as e:
+        Sweep(_pipeline(calls), {'alpha': [], 'scale': [1]})
+    assert str(e.value) == "No value to sweep for keys ['alpha']."
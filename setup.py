@@ -22,4 +22,6 @@ setup(
         'Topic :: Utilities'
     ],
     python_requires='>=3.6',
+    extras_require={'numpy': ['numpy'], 'xxhash': ['xxhash']},
+    entry_points={'console_scripts': ['pakkr=pakkr.cli:main']},
 )